@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Negotiated gzip/brotli response compression
+"""
+
+import asyncio
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import config
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+# Bodies at least this large are compressed off the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+# Already compressed or streamed event by event
+SKIP_CONTENT_TYPES = ('text/event-stream', 'application/gzip', 'application/zip')
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br (when brotli is installed) or gzip from Accept-Encoding"""
+    if not accept_encoding:
+        return None
+
+    accepted = set()
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:] or 0) == 0:
+                    continue
+            except ValueError:
+                continue  # Malformed quality: ignore the token
+        accepted.add(name.strip().lower())
+
+    if brotli is not None and config.BROTLI_QUALITY > 0 and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def _compressor(encoding: str):
+    """Streaming compressor for an encoding"""
+    if encoding == 'br':
+        return brotli.Compressor(quality=config.BROTLI_QUALITY)
+    return zlib.compressobj(config.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _feed(compressor, encoding: str, body: bytes, final: bool) -> bytes:
+    """Compress a chunk, flushing so the client can decode it right away"""
+    if encoding == 'br':
+        out = compressor.process(body)
+        return out + (compressor.finish() if final else compressor.flush())
+    out = compressor.compress(body)
+    return out + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body"""
+    return _feed(_compressor(encoding), encoding, body, final=True)
+
+
+async def compress_off_loop(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body, in a thread if it is large"""
+    if len(body) >= THREAD_MINIMUM_SIZE:
+        return await asyncio.to_thread(compress, body, encoding)
+    return compress(body, encoding)
+
+
+class CompressionMiddleware:
+    """Compress responses of at least minimum_size bytes.
+
+    Responses that already carry a Content-Encoding (such as cached,
+    precompressed mailbox listings) are passed through untouched;
+    streamed responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding'))
+        responder = _Responder(self.app, encoding, self.minimum_size, send)
+        await responder(scope, receive)
+
+
+class _Responder:
+    """Per-request state of CompressionMiddleware"""
+
+    def __init__(self, app: ASGIApp, encoding: Optional[str], minimum_size: int,
+                 send: Send):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = send
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive) -> None:
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            headers = Headers(raw=message['headers'])
+            media_type = headers.get('content-type', '').partition(';')[0].strip()
+            self.passthrough = ('content-encoding' in headers
+                                or message['status'] in (204, 206, 304)
+                                or media_type in SKIP_CONTENT_TYPES)
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Hold the headers until the first body chunk shows the size
+                self.start = message
+            return
+
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start['headers'])
+            headers.add_vary_header('Accept-Encoding')
+
+            small = not more_body and len(body) < self.minimum_size
+            if self.encoding is None or small:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = _compressor(self.encoding)
+            message['body'] = await self._compress(body, not more_body)
+            headers['Content-Encoding'] = self.encoding
+            if more_body:
+                del headers['Content-Length']
+            else:
+                headers['Content-Length'] = str(len(message['body']))
+            await self.send(start)
+            await self.send(message)
+            return
+
+        message['body'] = await self._compress(body, not more_body)
+        await self.send(message)
+
+    async def _compress(self, body: bytes, final: bool) -> bytes:
+        # Only reached once an encoding was negotiated
+        encoding = self.encoding
+        assert encoding is not None
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await asyncio.to_thread(
+                _feed, self.compressor, encoding, body, final)
+        return _feed(self.compressor, encoding, body, final)
+
+
+class CompressedResponseCache:
+    """LRU of compressed response bodies, each valid for one ETag.
+
+    Lets unchanged mailboxes be served without serializing or
+    compressing them again; a new ETag simply replaces the entry.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = (max_entries if max_entries is not None
+                            else config.COMPRESSION_CACHE_ENTRIES)
+        self._entries: 'OrderedDict[Hashable, Tuple[str, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, etag: str) -> Optional[bytes]:
+        """Cached body for key if it was stored under this ETag"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, etag: str, body: bytes) -> None:
+        """Store a compressed body"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            size = sum(len(body) for _, body in self._entries.values())
+            return {
+                'brotli_available': brotli is not None,
+                'entries': len(self._entries),
+                'bytes': size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Global instance
+compressed_responses = CompressedResponseCache()
@@ -18,9 +18,16 @@ class Config:
 
     # Email settings
     DOMAIN: str = os.getenv('MAIL_DOMAIN', 'test-mail.example.com')
+    # Additional domains, comma separated; '*.example.org' accepts subdomains
+    EXTRA_DOMAINS: list[str] = [
+        domain.strip() for domain in os.getenv('MAIL_DOMAINS', '').split(',')
+        if domain.strip()]
     RETENTION_HOURS: int = int(os.getenv('RETENTION_HOURS', 4))
     MAX_EMAILS_PER_ADDRESS: int = int(os.getenv('MAX_EMAILS_PER_ADDRESS', 100))
 
+    # Node id (0-1023) embedded in message ids; give each instance its own
+    NODE_ID: int = int(os.getenv('NODE_ID', 0))
+
     # Authentication
     API_KEY: Optional[str] = os.getenv('API_KEY', None)
 
@@ -29,8 +36,82 @@ class Config:
     DEBUG: bool = os.getenv('DEBUG', 'false').lower() == 'true'
 
     # Cleanup settings
+    # Emails expire at their deadline; the interval caps how long the
+    # cleanup loop sleeps, and expired emails are removed in batches
     CLEANUP_INTERVAL_MINUTES: int = int(
         os.getenv('CLEANUP_INTERVAL_MINUTES', 30))
+    CLEANUP_BATCH_SIZE: int = int(os.getenv('CLEANUP_BATCH_SIZE', 500))
+
+    # Where the in-process SMTP server runs: 'thread' (aiosmtpd controller
+    # thread) or 'loop' (the application event loop, lock-free storage)
+    SMTP_RUN_MODE: str = os.getenv('SMTP_RUN_MODE', 'thread').lower()
+
+    # LMTP (RFC 2033) listener on a Unix socket, next to the SMTP port
+    LMTP_SOCKET: Optional[str] = os.getenv('LMTP_SOCKET', None)
+
+    # SMTP worker processes sharing the port via SO_REUSEPORT (0 = in-process)
+    SMTP_WORKERS: int = int(os.getenv('SMTP_WORKERS', 0))
+
+    # ESMTP extensions
+    SMTP_PIPELINING: bool = os.getenv(
+        'SMTP_PIPELINING', 'true').lower() == 'true'
+    SMTP_CHUNKING: bool = os.getenv('SMTP_CHUNKING', 'true').lower() == 'true'
+
+    # Message size limit (advertised as SIZE) and spill-to-disk threshold
+    MAX_MESSAGE_SIZE: int = int(os.getenv('MAX_MESSAGE_SIZE', 33554432))
+    SPILL_THRESHOLD_BYTES: int = int(
+        os.getenv('SPILL_THRESHOLD_BYTES', 1048576))
+    SPILL_DIR: Optional[str] = os.getenv('SPILL_DIR', None)
+
+    # Batched writes from the SMTP handler to storage (1 = no batching)
+    INGEST_BATCH_SIZE: int = int(os.getenv('INGEST_BATCH_SIZE', 64))
+    INGEST_BATCH_MS: float = float(os.getenv('INGEST_BATCH_MS', 0))
+
+    # Duplicate suppression per recipient by Message-ID or content digest
+    DEDUPE_ENABLED: bool = os.getenv('DEDUPE_ENABLED', 'false').lower() == 'true'
+    DEDUPE_MAX_ENTRIES: int = int(os.getenv('DEDUPE_MAX_ENTRIES', 10000))
+    DEDUPE_TTL_SECONDS: int = int(os.getenv('DEDUPE_TTL_SECONDS', 3600))
+
+    # Token-bucket rate limits on deliveries (one per recipient)
+    RATE_LIMIT_ENABLED: bool = os.getenv(
+        'RATE_LIMIT_ENABLED', 'false').lower() == 'true'
+    RATE_LIMIT_PEER_PER_SECOND: float = float(
+        os.getenv('RATE_LIMIT_PEER_PER_SECOND', 50))
+    RATE_LIMIT_PEER_BURST: float = float(os.getenv('RATE_LIMIT_PEER_BURST', 200))
+    RATE_LIMIT_SENDER_PER_SECOND: float = float(
+        os.getenv('RATE_LIMIT_SENDER_PER_SECOND', 20))
+    RATE_LIMIT_SENDER_BURST: float = float(
+        os.getenv('RATE_LIMIT_SENDER_BURST', 100))
+    RATE_LIMIT_MAX_BUCKETS: int = int(os.getenv('RATE_LIMIT_MAX_BUCKETS', 100000))
+
+    # Ingest backpressure high-water marks (0 disables a mark)
+    BACKPRESSURE_STORAGE_BYTES: int = int(
+        os.getenv('BACKPRESSURE_STORAGE_BYTES', 536870912))
+    BACKPRESSURE_IN_FLIGHT: int = int(os.getenv('BACKPRESSURE_IN_FLIGHT', 256))
+
+    # Message parsing (inline, thread or process)
+    PARSE_WORKER_MODE: str = os.getenv('PARSE_WORKER_MODE', 'thread').lower()
+    PARSE_WORKERS: int = int(os.getenv('PARSE_WORKERS', 2))
+    LAZY_BODY_PARSING: bool = os.getenv(
+        'LAZY_BODY_PARSING', 'false').lower() == 'true'
+
+    # API response compression (COMPRESSION_MIN_SIZE=0 disables it;
+    # brotli is used when installed and BROTLI_QUALITY > 0)
+    COMPRESSION_MIN_SIZE: int = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    GZIP_LEVEL: int = int(os.getenv('GZIP_LEVEL', 6))
+    BROTLI_QUALITY: int = int(os.getenv('BROTLI_QUALITY', 4))
+    COMPRESSION_CACHE_ENTRIES: int = int(os.getenv('COMPRESSION_CACHE_ENTRIES', 256))
+
+    # How long /status, /stats and /services reuse one snapshot
+    STATUS_CACHE_MS: int = int(os.getenv('STATUS_CACHE_MS', 1000))
+
+    # Log API requests slower than this (0 = off)
+    SLOW_REQUEST_MS: int = int(os.getenv('SLOW_REQUEST_MS', 1000))
+
+    # On-demand profiling endpoints under /api/v1/debug (off by default)
+    PROFILING_ENABLED: bool = os.getenv(
+        'PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_MAX_SECONDS: int = int(os.getenv('PROFILE_MAX_SECONDS', 60))
 
     # Logging
     LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -77,6 +158,10 @@ class Config:
         if not cls.DOMAIN:
             errors.append("DOMAIN cannot be empty")
 
+        for domain in cls.EXTRA_DOMAINS:
+            if '*' in domain.removeprefix('*.') or domain in ('*.', '*'):
+                errors.append(f"Invalid domain pattern in MAIL_DOMAINS: {domain}")
+
         if cls.RETENTION_HOURS < 1:
             errors.append(
                 f"RETENTION_HOURS must be >= 1: {cls.RETENTION_HOURS}")
@@ -85,8 +170,110 @@ class Config:
             errors.append(
                 f"MAX_EMAILS_PER_ADDRESS must be >= 1: {cls.MAX_EMAILS_PER_ADDRESS}")
 
+        if cls.CLEANUP_INTERVAL_MINUTES < 1:
+            errors.append(
+                "CLEANUP_INTERVAL_MINUTES must be >= 1: "
+                f"{cls.CLEANUP_INTERVAL_MINUTES}")
+
+        if cls.CLEANUP_BATCH_SIZE < 1:
+            errors.append(
+                f"CLEANUP_BATCH_SIZE must be >= 1: {cls.CLEANUP_BATCH_SIZE}")
+
+        if not 0 <= cls.NODE_ID <= 1023:
+            errors.append(f"NODE_ID must be between 0 and 1023: {cls.NODE_ID}")
+
+        if cls.SMTP_WORKERS < 0:
+            errors.append(f"SMTP_WORKERS must be >= 0: {cls.SMTP_WORKERS}")
+
+        if cls.SMTP_RUN_MODE not in ('thread', 'loop'):
+            errors.append(f"Invalid SMTP_RUN_MODE: {cls.SMTP_RUN_MODE}")
+        elif cls.SMTP_RUN_MODE == 'loop' and cls.SMTP_WORKERS > 0:
+            errors.append("SMTP_RUN_MODE=loop cannot be combined with SMTP_WORKERS")
+
+        if cls.MAX_MESSAGE_SIZE < 0:
+            errors.append(
+                f"MAX_MESSAGE_SIZE must be >= 0: {cls.MAX_MESSAGE_SIZE}")
+
+        if cls.SPILL_THRESHOLD_BYTES < 0:
+            errors.append(
+                f"SPILL_THRESHOLD_BYTES must be >= 0: {cls.SPILL_THRESHOLD_BYTES}")
+
+        if cls.SPILL_DIR and not os.path.isdir(cls.SPILL_DIR):
+            errors.append(f"SPILL_DIR does not exist: {cls.SPILL_DIR}")
+
+        if cls.INGEST_BATCH_SIZE < 1:
+            errors.append(
+                f"INGEST_BATCH_SIZE must be >= 1: {cls.INGEST_BATCH_SIZE}")
+
+        if cls.INGEST_BATCH_MS < 0:
+            errors.append(f"INGEST_BATCH_MS must be >= 0: {cls.INGEST_BATCH_MS}")
+
+        if cls.DEDUPE_MAX_ENTRIES < 1:
+            errors.append(
+                f"DEDUPE_MAX_ENTRIES must be >= 1: {cls.DEDUPE_MAX_ENTRIES}")
+
+        if cls.DEDUPE_TTL_SECONDS < 1:
+            errors.append(
+                f"DEDUPE_TTL_SECONDS must be >= 1: {cls.DEDUPE_TTL_SECONDS}")
+
+        for name in ('RATE_LIMIT_PEER_PER_SECOND', 'RATE_LIMIT_PEER_BURST',
+                     'RATE_LIMIT_SENDER_PER_SECOND', 'RATE_LIMIT_SENDER_BURST'):
+            if getattr(cls, name) <= 0:
+                errors.append(f"{name} must be > 0: {getattr(cls, name)}")
+
+        if cls.RATE_LIMIT_MAX_BUCKETS < 1:
+            errors.append(
+                f"RATE_LIMIT_MAX_BUCKETS must be >= 1: {cls.RATE_LIMIT_MAX_BUCKETS}")
+
+        if cls.BACKPRESSURE_STORAGE_BYTES < 0:
+            errors.append(
+                "BACKPRESSURE_STORAGE_BYTES must be >= 0: "
+                f"{cls.BACKPRESSURE_STORAGE_BYTES}")
+
+        if cls.BACKPRESSURE_IN_FLIGHT < 0:
+            errors.append(
+                f"BACKPRESSURE_IN_FLIGHT must be >= 0: {cls.BACKPRESSURE_IN_FLIGHT}")
+
+        if cls.PARSE_WORKER_MODE not in ('inline', 'thread', 'process'):
+            errors.append(
+                f"Invalid PARSE_WORKER_MODE: {cls.PARSE_WORKER_MODE}")
+
+        if cls.PARSE_WORKERS < 1:
+            errors.append(f"PARSE_WORKERS must be >= 1: {cls.PARSE_WORKERS}")
+
+        if cls.COMPRESSION_MIN_SIZE < 0:
+            errors.append(
+                f"COMPRESSION_MIN_SIZE must be >= 0: {cls.COMPRESSION_MIN_SIZE}")
+
+        if not 1 <= cls.GZIP_LEVEL <= 9:
+            errors.append(f"GZIP_LEVEL must be between 1 and 9: {cls.GZIP_LEVEL}")
+
+        if not 0 <= cls.BROTLI_QUALITY <= 11:
+            errors.append(
+                f"BROTLI_QUALITY must be between 0 and 11: {cls.BROTLI_QUALITY}")
+
+        if cls.COMPRESSION_CACHE_ENTRIES < 0:
+            errors.append(
+                "COMPRESSION_CACHE_ENTRIES must be >= 0: "
+                f"{cls.COMPRESSION_CACHE_ENTRIES}")
+
+        if cls.SLOW_REQUEST_MS < 0:
+            errors.append(f"SLOW_REQUEST_MS must be >= 0: {cls.SLOW_REQUEST_MS}")
+
+        if cls.STATUS_CACHE_MS < 0:
+            errors.append(f"STATUS_CACHE_MS must be >= 0: {cls.STATUS_CACHE_MS}")
+
+        if cls.PROFILE_MAX_SECONDS < 1:
+            errors.append(
+                f"PROFILE_MAX_SECONDS must be >= 1: {cls.PROFILE_MAX_SECONDS}")
+
         return errors
 
+    @classmethod
+    def get_domains(cls) -> list[str]:
+        """Get all accepted domains, primary domain first"""
+        return [cls.DOMAIN] + cls.EXTRA_DOMAINS
+
     @classmethod
     def display_config(cls) -> dict[str, any]:
         """Display current configuration"""
@@ -94,11 +281,45 @@ class Config:
             'smtp_port': cls.SMTP_PORT,
             'api_port': cls.API_PORT,
             'domain': cls.DOMAIN,
+            'extra_domains': cls.EXTRA_DOMAINS,
             'retention_hours': cls.RETENTION_HOURS,
             'max_emails_per_address': cls.MAX_EMAILS_PER_ADDRESS,
+            'node_id': cls.NODE_ID,
             'host': cls.HOST,
             'debug': cls.DEBUG,
             'cleanup_interval_minutes': cls.CLEANUP_INTERVAL_MINUTES,
+            'cleanup_batch_size': cls.CLEANUP_BATCH_SIZE,
+            'smtp_run_mode': cls.SMTP_RUN_MODE,
+            'lmtp_socket': cls.LMTP_SOCKET,
+            'smtp_workers': cls.SMTP_WORKERS,
+            'smtp_pipelining': cls.SMTP_PIPELINING,
+            'smtp_chunking': cls.SMTP_CHUNKING,
+            'max_message_size': cls.MAX_MESSAGE_SIZE,
+            'spill_threshold_bytes': cls.SPILL_THRESHOLD_BYTES,
+            'spill_dir': cls.SPILL_DIR,
+            'ingest_batch_size': cls.INGEST_BATCH_SIZE,
+            'ingest_batch_ms': cls.INGEST_BATCH_MS,
+            'dedupe_enabled': cls.DEDUPE_ENABLED,
+            'dedupe_max_entries': cls.DEDUPE_MAX_ENTRIES,
+            'dedupe_ttl_seconds': cls.DEDUPE_TTL_SECONDS,
+            'rate_limit_enabled': cls.RATE_LIMIT_ENABLED,
+            'rate_limit_peer_per_second': cls.RATE_LIMIT_PEER_PER_SECOND,
+            'rate_limit_peer_burst': cls.RATE_LIMIT_PEER_BURST,
+            'rate_limit_sender_per_second': cls.RATE_LIMIT_SENDER_PER_SECOND,
+            'rate_limit_sender_burst': cls.RATE_LIMIT_SENDER_BURST,
+            'backpressure_storage_bytes': cls.BACKPRESSURE_STORAGE_BYTES,
+            'backpressure_in_flight': cls.BACKPRESSURE_IN_FLIGHT,
+            'parse_worker_mode': cls.PARSE_WORKER_MODE,
+            'parse_workers': cls.PARSE_WORKERS,
+            'lazy_body_parsing': cls.LAZY_BODY_PARSING,
+            'compression_min_size': cls.COMPRESSION_MIN_SIZE,
+            'gzip_level': cls.GZIP_LEVEL,
+            'brotli_quality': cls.BROTLI_QUALITY,
+            'compression_cache_entries': cls.COMPRESSION_CACHE_ENTRIES,
+            'status_cache_ms': cls.STATUS_CACHE_MS,
+            'slow_request_ms': cls.SLOW_REQUEST_MS,
+            'profiling_enabled': cls.PROFILING_ENABLED,
+            'profile_max_seconds': cls.PROFILE_MAX_SECONDS,
             'log_level': cls.LOG_LEVEL,
             'api_key_set': bool(cls.API_KEY),
             'app_dir': str(cls.APP_DIR),
@@ -15,10 +15,13 @@ from fastapi.responses import RedirectResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from .compression import CompressionMiddleware
 from .config import config
 from .models import ErrorResponse
 from .services import smtp_service, cleanup_service
-from .routers import auth_router, emails_router, health_router
+from .request_metrics import RequestMetricsMiddleware, request_metrics
+from .routers import (auth_router, debug_router, emails_router, health_router,
+                      metrics_router)
 from . import __version__, __description__
 
 
@@ -56,8 +59,12 @@ async def lifespan(app: FastAPI):
     # Start services
     logger.info("Starting services...")
 
-    # Start SMTP server
-    if not smtp_service.start():
+    # Start SMTP server, on this loop or in aiosmtpd's controller thread
+    if config.SMTP_RUN_MODE == 'loop':
+        smtp_started = await smtp_service.start_on_loop()
+    else:
+        smtp_started = smtp_service.start()
+    if not smtp_started:
         logger.error("Failed to start SMTP server")
         sys.exit(1)
 
@@ -106,6 +113,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add response compression (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MIN_SIZE)
+
+# Add per-route request latency, percentiles and the slow request log
+# (outermost, so it times everything)
+app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
+
 
 # Exception handlers
 @app.exception_handler(StarletteHTTPException)
@@ -158,6 +172,8 @@ async def general_exception_handler(request: Request, exc: Exception):
 app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(emails_router)
+app.include_router(metrics_router)
+app.include_router(debug_router)
 
 
 # Root redirect
@@ -50,6 +50,7 @@ class AddressInfo(BaseModel):
     address: str = Field(..., description="Email address")
     emailCount: int = Field(...,
                             description="Number of emails for this address", ge=0)
+    bytes: int = Field(0, description="Approximate memory used by this address", ge=0)
 
 
 class AddressListResponse(BaseResponse):
@@ -107,6 +108,8 @@ class HealthResponse(BaseResponse):
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
     version: str = Field(..., description="Application version")
     services: Dict[str, str] = Field(..., description="Service statuses")
+    backpressure: Optional[Dict[str, Any]] = Field(
+        None, description="Ingest backpressure state")
 
 
 class SMTPStatus(BaseModel):
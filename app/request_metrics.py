@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-route API request latency, percentiles and slow request log
+"""
+
+import logging
+import time
+from typing import Dict, Any, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import config
+from .services.metrics import Histogram, LogHistogram, LATENCY_BUCKETS_MS
+
+
+logger = logging.getLogger(__name__)
+
+# Query parameters never written to the slow request log
+REDACTED_PARAMS = frozenset({'api_key'})
+
+
+class RequestMetrics:
+    """Request latency histograms, percentiles and response counts per
+    route template"""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.percentiles: Dict[Tuple[str, str], LogHistogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.total_slow = 0
+
+    def observe(self, method: str, route: str, status: int, duration_ms: float) -> None:
+        """Record one finished request"""
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency.setdefault(key, Histogram(LATENCY_BUCKETS_MS))
+        histogram.observe(duration_ms)
+
+        estimator = self.percentiles.get(key)
+        if estimator is None:
+            estimator = self.percentiles.setdefault(key, LogHistogram())
+        estimator.observe(duration_ms)
+
+        response_key = (method, route, status)
+        self.responses[response_key] = self.responses.get(response_key, 0) + 1
+
+    def reset(self) -> None:
+        """Drop all observations"""
+        self.latency.clear()
+        self.percentiles.clear()
+        self.responses.clear()
+        self.total_slow = 0
+
+    def get_percentiles(self) -> Dict[str, Any]:
+        """Get count, p50, p95, p99 and max (ms) per route"""
+        return {
+            f'{method} {route}': estimator.summary()
+            for (method, route), estimator in sorted(self.percentiles.items())
+        }
+
+
+class RequestMetricsMiddleware:
+    """Time each HTTP request, labelled by the route it matched.
+
+    Labels use the route template (/api/v1/email/{address}), never the
+    raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            self.metrics.observe(scope['method'], route, status, duration_ms)
+
+            if 0 < config.SLOW_REQUEST_MS <= duration_ms:
+                self.metrics.total_slow += 1
+                self._log_slow(scope, route, status, duration_ms)
+
+    @staticmethod
+    def _log_slow(scope: Scope, route: str, status: int, duration_ms: float) -> None:
+        """Log a slow request with its path and query parameters"""
+        query = {name: value for name, value in
+                 parse_qsl(scope.get('query_string', b'').decode('latin-1'))
+                 if name not in REDACTED_PARAMS}
+        logger.warning(
+            f"Slow request: {scope['method']} {route} took {duration_ms:.1f} ms "
+            f"(status {status}, path params {scope.get('path_params', {})}, "
+            f"query {query})")
+
+
+# Global instance
+request_metrics = RequestMetrics()
@@ -3,7 +3,11 @@ API routers package
 """
 
 from .auth import router as auth_router
+from .debug import router as debug_router
 from .emails import router as emails_router
 from .health import router as health_router
+from .metrics import router as metrics_router
 
-__all__ = ["auth_router", "emails_router", "health_router"]
+__all__ = [
+    "auth_router", "debug_router", "emails_router", "health_router", "metrics_router"
+]
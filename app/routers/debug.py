@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+On-demand profiling router (enabled with PROFILING_ENABLED)
+"""
+
+import time
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from ..config import config
+from ..models import ErrorResponse
+from ..services import profiling_service, ProfilingError
+from .auth import verify_api_key
+
+
+router = APIRouter(prefix="/api/v1/debug", tags=["Debug"])
+
+ERROR_RESPONSES = {
+    401: {"model": ErrorResponse, "description": "API key required"},
+    403: {"model": ErrorResponse, "description": "Invalid API key"},
+    404: {"model": ErrorResponse, "description": "Profiling is disabled"}
+}
+
+
+def _require_enabled() -> None:
+    """Hide the endpoints unless profiling is enabled"""
+    if not config.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+def _attachment(content: bytes, media_type: str, name: str, extension: str) -> Response:
+    """Response downloaded as a timestamped file"""
+    filename = f"{name}-{time.strftime('%Y%m%dT%H%M%S')}.{extension}"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post(
+    "/profile",
+    response_class=Response,
+    responses={
+        200: {"description": "pstats file or text report"},
+        409: {"model": ErrorResponse, "description": "A profile is already running"},
+        422: {"model": ErrorResponse, "description": "Invalid duration"},
+        **ERROR_RESPONSES
+    },
+    summary="Capture a cProfile",
+    description="Profile the API event loop and the SMTP controller thread "
+                "for the next N seconds"
+)
+async def capture_profile(
+    seconds: float = Query(5, gt=0, description="Capture duration in seconds"),
+    format: Literal["pstats", "text"] = Query(
+        "pstats", description="pstats (for pstats/snakeviz) or a text report"),
+    sort: Literal["cumulative", "tottime", "calls"] = Query(
+        "cumulative", description="Sort order of the text report"),
+    limit: int = Query(100, ge=1, description="Functions in the text report"),
+    verified: bool = Depends(verify_api_key)
+):
+    """Capture a cProfile of the next N seconds"""
+    _require_enabled()
+    if seconds > config.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"seconds must be <= {config.PROFILE_MAX_SECONDS}"
+        )
+
+    try:
+        stats = await profiling_service.profile(seconds)
+    except ProfilingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "text":
+        report = profiling_service.format_stats(stats, sort, limit)
+        return _attachment(report.encode(), "text/plain; charset=utf-8",
+                           "profile", "txt")
+    return _attachment(profiling_service.dump_stats(stats),
+                       "application/octet-stream", "profile", "prof")
+
+
+@router.post(
+    "/tracemalloc/start",
+    responses={200: {"description": "tracemalloc status"}, **ERROR_RESPONSES},
+    summary="Start tracemalloc",
+    description="Start tracing memory allocations (slows the server down while tracing)"
+)
+async def start_tracemalloc(
+    frames: int = Query(10, ge=1, le=100, description="Frames kept per allocation"),
+    verified: bool = Depends(verify_api_key)
+):
+    """Start tracing allocations"""
+    _require_enabled()
+    return profiling_service.start_tracemalloc(frames)
+
+
+@router.post(
+    "/tracemalloc/snapshot",
+    response_class=Response,
+    responses={
+        200: {"description": "Text report or snapshot file"},
+        409: {"model": ErrorResponse, "description": "tracemalloc is not tracing"},
+        **ERROR_RESPONSES
+    },
+    summary="Take a tracemalloc snapshot",
+    description="Top allocations, diffed against the previous snapshot "
+                "when there is one"
+)
+async def tracemalloc_snapshot(
+    format: Literal["text", "snapshot"] = Query(
+        "text", description="text report or a file for tracemalloc.Snapshot.load"),
+    key_type: Literal["lineno", "filename", "traceback"] = Query(
+        "lineno", description="How allocations are grouped in the text report"),
+    limit: int = Query(50, ge=1, description="Entries in the text report"),
+    verified: bool = Depends(verify_api_key)
+):
+    """Take a snapshot and report or download it"""
+    _require_enabled()
+    try:
+        if format == "snapshot":
+            return _attachment(profiling_service.snapshot_dump(),
+                               "application/octet-stream", "tracemalloc", "snapshot")
+        report = profiling_service.snapshot_report(key_type, limit)
+    except ProfilingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _attachment(report.encode(), "text/plain; charset=utf-8",
+                       "tracemalloc", "txt")
+
+
+@router.post(
+    "/tracemalloc/stop",
+    responses={200: {"description": "tracemalloc status"}, **ERROR_RESPONSES},
+    summary="Stop tracemalloc",
+    description="Stop tracing memory allocations and drop the baseline snapshot"
+)
+async def stop_tracemalloc(verified: bool = Depends(verify_api_key)):
+    """Stop tracing allocations"""
+    _require_enabled()
+    return profiling_service.stop_tracemalloc()
+
+
+@router.get(
+    "/stacks",
+    response_class=Response,
+    responses={200: {"description": "Stacks as text"}, **ERROR_RESPONSES},
+    summary="Dump stacks",
+    description="Current stacks of all threads and of the tasks on each event loop"
+)
+async def dump_stacks(verified: bool = Depends(verify_api_key)):
+    """Dump the stacks of all threads and event loop tasks"""
+    _require_enabled()
+    return _attachment(profiling_service.dump_stacks().encode(),
+                       "text/plain; charset=utf-8", "stacks", "txt")
@@ -3,32 +3,64 @@
 Email management router
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from typing import List, Optional
 
+from ..compression import compress_off_loop, compressed_responses, negotiate_encoding
+from ..config import config
 from ..models import EmailListResponse, AddressListResponse, MessageResponse, ErrorResponse
-from ..services import email_storage_service
+from ..services import email_storage_service, status_snapshot_service
+from ..services.email_storage import EMAIL_FIELDS, SUMMARY_FIELDS
 from .auth import verify_api_key
 
 
 router = APIRouter(prefix="/api/v1", tags=["Email Management"])
 
 
+def _etag(version: int) -> str:
+    """Weak ETag for a storage change counter"""
+    return f'W/"{version}"'
+
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(',')}
+    return '*' in tags or etag in tags or etag[2:] in tags
+
+
 @router.get(
     "/addresses",
     response_model=AddressListResponse,
     responses={
         200: {"description": "List of email addresses"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"model": ErrorResponse, "description": "API key required"},
         403: {"model": ErrorResponse, "description": "Invalid API key"}
     },
     summary="Get all email addresses",
     description="Get list of all email addresses that have received emails"
 )
-async def get_addresses(verified: bool = Depends(verify_api_key)):
+async def get_addresses(
+    response: Response,
+    domain: Optional[str] = Query(
+        None, description="Only addresses in this domain"),
+    if_none_match: Optional[str] = Header(None),
+    verified: bool = Depends(verify_api_key)
+):
     """Get all email addresses"""
 
-    addresses = email_storage_service.get_all_addresses()
+    # Read the version first: a change racing with the read below then
+    # only makes the ETag stale, never the response
+    etag = _etag(email_storage_service.get_version())
+    if _not_modified(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    addresses = email_storage_service.get_all_addresses(domain)
+    response.headers["ETag"] = etag
 
     return AddressListResponse(
         count=len(addresses),
@@ -36,11 +68,33 @@ async def get_addresses(verified: bool = Depends(verify_api_key)):
     )
 
 
+@router.get(
+    "/domains",
+    responses={
+        200: {"description": "Domains with mailboxes"},
+        401: {"model": ErrorResponse, "description": "API key required"},
+        403: {"model": ErrorResponse, "description": "Invalid API key"}
+    },
+    summary="Get domains",
+    description="Get domains that have received emails, with address counts"
+)
+async def get_domains(verified: bool = Depends(verify_api_key)):
+    """Get domains with mailboxes"""
+
+    domains = email_storage_service.get_domains()
+
+    return {
+        "count": len(domains),
+        "domains": domains
+    }
+
+
 @router.get(
     "/email/{address}",
     response_model=EmailListResponse,
     responses={
         200: {"description": "Emails for the address"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"model": ErrorResponse, "description": "API key required"},
         403: {"model": ErrorResponse, "description": "Invalid API key"},
         404: {"model": ErrorResponse, "description": "Address not found"}
@@ -52,38 +106,139 @@ async def get_emails_for_address(
     address: str,
     limit: int = Query(
         10, ge=1, le=100, description="Maximum number of emails to return"),
+    after: Optional[str] = Query(
+        None, description="Only emails with an id after this one; returns the "
+                          "first `limit` of them, oldest first"),
+    since: Optional[float] = Query(
+        None, description="Only emails received at or after this Unix time"),
+    until: Optional[float] = Query(
+        None, description="Only emails received at or before this Unix time"),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, of: " + ", ".join(EMAIL_FIELDS)),
+    view: str = Query(
+        "full", pattern="^(full|summary)$",
+        description="summary returns id, from, to, subject, received and "
+                    "a body snippet"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     verified: bool = Depends(verify_api_key)
 ):
     """Get emails for a specific address"""
 
-    emails = email_storage_service.get_emails(address, limit)
+    # Pollers usually get their answer here, from the mailbox version alone
+    version = email_storage_service.get_version(address)
+    etag = _etag(version) if version is not None else None
+    if etag is not None and _not_modified(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    headers = {"ETag": etag} if etag is not None else None
+
+    projection = _projection(fields, view)
+    if projection is not None:
+        # Storage skips extracting bodies that were not asked for
+        emails = await email_storage_service.get_emails_off_loop(
+            address, limit, after, since, until, fields=projection)
+        _ensure_found(emails, address)
+        content = to_json(
+            {"address": address.strip(), "count": len(emails), "emails": emails})
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    # Unchanged mailboxes reuse the compressed body from an earlier request
+    encoding = None
+    if config.COMPRESSION_MIN_SIZE:
+        encoding = negotiate_encoding(accept_encoding)
+    # Keyed on the address as echoed in the body, not the mailbox it
+    # resolves to: U@x.com and u@x.com share emails but not bodies
+    cache_key = (address.strip(), limit, after, since, until, encoding)
+    if encoding is not None and etag is not None:
+        cached = compressed_responses.get(cache_key, etag)
+        if cached is not None:
+            return _encoded_response(cached, encoding, etag)
 
-    if not emails and address.lower() not in [addr.lower() for addr in email_storage_service.email_storage.keys()]:
+    # Emails are serialized once and cached, so the list is assembled
+    # from JSON fragments rather than validated and encoded per request
+    emails = await email_storage_service.get_emails_json_off_loop(
+        address, limit, after, since, until)
+    _ensure_found(emails, address)
+
+    content = b''.join((
+        b'{"address":', to_json(address.strip()),
+        b',"count":', str(len(emails)).encode(),
+        b',"emails":[', b','.join(emails), b']}'
+    ))
+    if (encoding is not None and etag is not None
+            and len(content) >= config.COMPRESSION_MIN_SIZE):
+        content = await compress_off_loop(content, encoding)
+        compressed_responses.put(cache_key, etag, content)
+        return _encoded_response(content, encoding, etag)
+
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _projection(fields: Optional[str], view: str) -> Optional[List[str]]:
+    """Fields to return, or None for full emails"""
+    if fields is None:
+        return list(SUMMARY_FIELDS) if view == "summary" else None
+
+    requested = list(dict.fromkeys(
+        field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in EMAIL_FIELDS]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid fields: {', '.join(unknown) or fields!r}; "
+                   f"choose from {', '.join(EMAIL_FIELDS)}"
+        )
+    return requested
+
+
+def _ensure_found(emails: list, address: str) -> None:
+    """404 for addresses that never received mail"""
+    if not emails and address.lower() not in email_storage_service.email_storage:
         raise HTTPException(
             status_code=404,
             detail=f"No emails found for address: {address}"
         )
 
-    # Convert to response format
-    email_models = []
-    for email in emails:
-        email_models.append({
-            'id': email['id'],
-            'from': email['from'],
-            'to': email['to'],
-            'subject': email['subject'],
-            'body': email['body'],
-            'headers': email['headers'],
-            'received': email['received']
-        })
-
-    return EmailListResponse(
-        address=address,
-        count=len(email_models),
-        emails=email_models
+
+def _encoded_response(content: bytes, encoding: str, etag: str) -> Response:
+    """Response with an already compressed body"""
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"ETag": etag, "Content-Encoding": encoding, "Vary": "Accept-Encoding"}
     )
 
 
+@router.get(
+    "/export",
+    responses={
+        200: {"description": "One email per line as JSON",
+              "content": {"application/x-ndjson": {}}},
+        401: {"model": ErrorResponse, "description": "API key required"},
+        403: {"model": ErrorResponse, "description": "Invalid API key"}
+    },
+    summary="Export all emails",
+    description="Stream every stored email as newline-delimited JSON"
+)
+async def export_emails(
+    domain: Optional[str] = Query(
+        None, description="Only mailboxes in this domain"),
+    verified: bool = Depends(verify_api_key)
+):
+    """Stream all emails as NDJSON"""
+
+    async def lines():
+        # Iterated on the event loop, not in a thread, so single-loop
+        # storage stays single-threaded; each chunk is one short lock hold,
+        # and only spooled emails are read back in a worker thread
+        async for chunk in email_storage_service.export_json_off_loop(domain):
+            yield b'\n'.join(chunk) + b'\n'
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.delete(
     "/email/{address}",
     response_model=MessageResponse,
@@ -151,7 +306,7 @@ async def force_cleanup(verified: bool = Depends(verify_api_key)):
 async def get_storage_stats(verified: bool = Depends(verify_api_key)):
     """Get storage statistics"""
 
-    stats = email_storage_service.get_statistics()
+    stats = (await status_snapshot_service.get())['storage']
 
     return {
         "statistics": stats,
@@ -3,13 +3,17 @@
 Health check and status router
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from datetime import datetime
 import time
 
+from ..compression import compressed_responses
+from ..request_metrics import request_metrics
 from ..models import HealthResponse, StatusResponse, ErrorResponse
 from ..config import config
-from ..services import email_storage_service, smtp_service, cleanup_service
+from ..services import (smtp_service, cleanup_service, backpressure_monitor,
+                        status_snapshot_service, profiling_service, message_spool,
+                        email_storage_service)
 from .auth import verify_api_key
 from .. import __version__
 
@@ -30,28 +34,35 @@ _start_time = time.time()
     summary="Health check",
     description="Health check endpoint for monitoring and load balancers (Kubernetes ready)"
 )
-async def health_check():
+async def health_check(response: Response):
     """Health check endpoint"""
 
+    backpressure = backpressure_monitor.get_status()
+
     # Check critical services
     services = {
         "smtp_server": "healthy" if smtp_service.is_running else "unhealthy",
-        "email_storage": "healthy",  # Always healthy if responding
+        "email_storage": "degraded" if backpressure['active'] else "healthy",
         "cleanup_service": "healthy" if cleanup_service.is_running else "degraded"
     }
 
     # Determine overall status
     if services["smtp_server"] == "unhealthy":
         status = "unhealthy"
-    elif services["cleanup_service"] == "degraded":
+    elif "degraded" in services.values():
         status = "degraded"
     else:
         status = "healthy"
 
+    # Let load balancers steer mail elsewhere until ingest recovers
+    if backpressure['active']:
+        response.status_code = 503
+
     return HealthResponse(
         status=status,
         version=__version__,
-        services=services
+        services=services,
+        backpressure=backpressure
     )
 
 
@@ -70,7 +81,7 @@ async def get_status(verified: bool = Depends(verify_api_key)):
     """Get detailed server status"""
 
     # Get storage statistics
-    stats = email_storage_service.get_statistics()
+    stats = (await status_snapshot_service.get())['storage']
 
     # Calculate uptime
     uptime_seconds = int(time.time() - _start_time)
@@ -102,9 +113,10 @@ async def get_status(verified: bool = Depends(verify_api_key)):
 async def get_services_status(verified: bool = Depends(verify_api_key)):
     """Get detailed service status"""
 
-    smtp_status = smtp_service.get_status()
-    cleanup_status = cleanup_service.get_status()
-    storage_stats = email_storage_service.get_statistics()
+    snapshot = await status_snapshot_service.get()
+    smtp_status = snapshot['smtp']
+    cleanup_status = snapshot['cleanup']
+    storage_stats = snapshot['storage']
 
     return {
         "smtp_server": {
@@ -117,14 +129,28 @@ async def get_services_status(verified: bool = Depends(verify_api_key)):
         },
         "email_storage": {
             **storage_stats,
-            "memory_usage": "In-memory storage"
+            "memory_usage": {
+                "backend": "in-memory",
+                "estimated_bytes": (storage_stats['total_bytes']
+                                    + email_storage_service.cache_bytes),
+                "stored_bytes": storage_stats['total_bytes'],
+                "json_cache_bytes": email_storage_service.cache_bytes,
+                "spooled_bytes": message_spool.bytes
+            }
         },
         "api_server": {
             "running": True,
             "port": config.API_PORT,
             "host": config.HOST,
             "version": __version__,
-            "uptime_seconds": int(time.time() - _start_time)
+            "uptime_seconds": int(time.time() - _start_time),
+            "compression": compressed_responses.get_stats(),
+            "status_cache": status_snapshot_service.get_stats(),
+            "slow_request_ms": config.SLOW_REQUEST_MS,
+            "total_slow_requests": request_metrics.total_slow,
+            "latency_ms": request_metrics.get_percentiles(),
+            "profiling": {"enabled": config.PROFILING_ENABLED,
+                          **profiling_service.get_status()}
         }
     }
 
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics router
+"""
+
+from fastapi import APIRouter, Depends, Response
+
+from ..models import ErrorResponse
+from ..request_metrics import request_metrics
+from ..services import (email_storage_service, smtp_service, cleanup_service,
+                        backpressure_monitor, message_spool)
+from ..services.metrics import PrometheusWriter
+from .auth import verify_api_key
+
+
+router = APIRouter(tags=["Health & Status"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histograms kept in milliseconds are exported in seconds
+MS = 0.001
+
+
+@router.get(
+    "/metrics",
+    response_class=Response,
+    responses={
+        200: {"description": "Metrics in Prometheus text format",
+              "content": {CONTENT_TYPE: {}}},
+        401: {"model": ErrorResponse, "description": "API key required"},
+        403: {"model": ErrorResponse, "description": "Invalid API key"}
+    },
+    summary="Prometheus metrics",
+    description="Counters, gauges and histograms in Prometheus text exposition format"
+)
+async def get_metrics(verified: bool = Depends(verify_api_key)):
+    """Render metrics for a Prometheus scrape"""
+
+    writer = PrometheusWriter()
+    _smtp_metrics(writer)
+    _storage_metrics(writer)
+    _cleanup_metrics(writer)
+    _api_metrics(writer)
+
+    return Response(content=writer.render(), media_type=CONTENT_TYPE)
+
+
+def _smtp_metrics(writer: PrometheusWriter) -> None:
+    """SMTP handler counters and ingest histograms"""
+    handler = smtp_service.handler
+    # Includes the counters published by SMTP worker processes
+    counters = handler.counters()
+
+    writer.gauge("mailserver_smtp_up", int(smtp_service.is_running),
+                 "Whether the SMTP server is running")
+    writer.counter("mailserver_smtp_deliveries_accepted_total",
+                   handler.total_emails_received,
+                   "Deliveries (message x recipient) stored")
+    for reason, count in counters['rejected'].items():
+        writer.counter("mailserver_smtp_rejected_total", count,
+                       "SMTP commands refused", {"reason": reason})
+    writer.counter("mailserver_smtp_duplicates_total",
+                   handler.duplicates.total_duplicates,
+                   "Deliveries skipped as duplicates")
+    writer.counter("mailserver_smtp_sessions_total", counters['total_sessions'],
+                   "SMTP sessions opened")
+    writer.gauge("mailserver_smtp_connections", counters['connection_count'],
+                 "Open SMTP connections")
+
+    for command, histogram in counters['command_latency'].items():
+        writer.histogram("mailserver_smtp_command_duration_seconds", histogram,
+                         "Time spent in SMTP command handlers",
+                         {"command": command}, scale=MS)
+    writer.histogram("mailserver_smtp_message_size_bytes", counters['message_size'],
+                     "Size of received messages")
+    writer.histogram("mailserver_smtp_session_duration_seconds",
+                     counters['session_duration'],
+                     "SMTP session length")
+
+    writer.gauge("mailserver_ingest_in_flight",
+                 handler.parser_pool.in_flight + handler.ingest.pending,
+                 "Messages accepted but not yet stored")
+    writer.counter("mailserver_ingest_batches_total", handler.ingest.total_batches,
+                   "Storage write batches")
+    writer.histogram("mailserver_ingest_batch_emails", handler.ingest.batch_sizes,
+                     "Emails per storage write batch")
+    writer.gauge("mailserver_backpressure_active", int(backpressure_monitor.active),
+                 "Whether ingest backpressure is refusing mail")
+
+
+def _storage_metrics(writer: PrometheusWriter) -> None:
+    """Storage gauges, all kept up to date on write"""
+    storage = email_storage_service
+
+    writer.gauge("mailserver_storage_emails", storage.total_emails, "Emails stored")
+    writer.gauge("mailserver_storage_bytes", storage.total_bytes,
+                 "Estimated bytes of stored email")
+    writer.gauge("mailserver_storage_json_cache_bytes", storage.cache_bytes,
+                 "Bytes of JSON cached for stored email")
+    writer.gauge("mailserver_storage_addresses", len(storage.email_storage),
+                 "Mailboxes with stored email")
+    writer.gauge("mailserver_spool_files", message_spool.files,
+                 "Message payloads spooled to disk")
+    writer.gauge("mailserver_spool_bytes", message_spool.bytes,
+                 "Bytes of message payloads spooled to disk")
+    writer.histogram("mailserver_storage_lock_wait_seconds", storage.write_lock_wait,
+                     "Time storage writes waited for the lock", scale=MS)
+    writer.histogram("mailserver_storage_lock_hold_seconds", storage.write_lock_hold,
+                     "Time storage writes held the lock", scale=MS)
+
+
+def _cleanup_metrics(writer: PrometheusWriter) -> None:
+    """Cleanup service counters and durations"""
+    stats = cleanup_service.cleanup_stats
+
+    writer.counter("mailserver_cleanup_runs_total", stats['total_cleanups'],
+                   "Scheduled cleanups run")
+    writer.counter("mailserver_cleanup_emails_removed_total",
+                   stats['total_emails_cleaned'],
+                   "Emails removed by cleanup")
+    writer.histogram("mailserver_cleanup_duration_seconds",
+                     cleanup_service.cleanup_duration,
+                     "Time a cleanup took")
+
+
+def _api_metrics(writer: PrometheusWriter) -> None:
+    """API request latency and responses per route"""
+    for (method, route), histogram in list(request_metrics.latency.items()):
+        writer.histogram("mailserver_http_request_duration_seconds", histogram,
+                         "API request latency", {"method": method, "route": route},
+                         scale=MS)
+    for (method, route, status), count in list(request_metrics.responses.items()):
+        writer.counter("mailserver_http_responses_total", count, "API responses",
+                       {"method": method, "route": route, "status": status})
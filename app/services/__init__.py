@@ -5,9 +5,21 @@ Services package for business logic
 from .smtp_server import SMTPService, smtp_service
 from .email_storage import EmailStorageService, email_storage_service
 from .cleanup import CleanupService, cleanup_service
+from .message_parser import MessageParserPool, message_parser_pool
+from .spool import MessageSpool, message_spool
+from .ingest import IngestQueue, ingest_queue
+from .backpressure import BackpressureMonitor, backpressure_monitor
+from .status_snapshot import StatusSnapshotService, status_snapshot_service
+from .profiling import ProfilingService, ProfilingError, profiling_service
 
 __all__ = [
     "SMTPService", "smtp_service",
     "EmailStorageService", "email_storage_service", 
-    "CleanupService", "cleanup_service"
+    "CleanupService", "cleanup_service",
+    "MessageParserPool", "message_parser_pool",
+    "MessageSpool", "message_spool",
+    "IngestQueue", "ingest_queue",
+    "BackpressureMonitor", "backpressure_monitor",
+    "StatusSnapshotService", "status_snapshot_service",
+    "ProfilingService", "ProfilingError", "profiling_service"
 ] 
\ No newline at end of file
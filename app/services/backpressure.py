@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Ingest backpressure: refuse new mail while storage or the parse queue
+is saturated
+"""
+
+import logging
+from typing import Dict, Any, Optional
+
+from ..config import config
+from .email_storage import email_storage_service
+
+
+logger = logging.getLogger(__name__)
+
+# Once active, backpressure is lifted only below this fraction of the
+# high-water marks so it does not flap around the threshold
+RESUME_RATIO = 0.9
+
+# Temporary failure; RFC 5321 4.5.3.1.10 "insufficient system storage"
+BACKPRESSURE_REPLY = '452 4.3.1 Insufficient system storage, try again later'
+
+
+class BackpressureMonitor:
+    """Tracks ingest high-water marks with hysteresis"""
+
+    def __init__(self, storage=None):
+        self.storage = storage or email_storage_service
+        self.active = False
+        self.reason: Optional[str] = None
+        self.in_flight = 0
+        self.total_rejected = 0
+        self.total_activations = 0
+
+    def evaluate(self, in_flight: Optional[int] = None) -> Optional[str]:
+        """Update the state and get the saturated resource, if any"""
+        if in_flight is not None:
+            self.in_flight = in_flight
+
+        threshold = RESUME_RATIO if self.active else 1.0
+        reason = None
+        if self._level(self.storage.memory_bytes,
+                       config.BACKPRESSURE_STORAGE_BYTES) >= threshold:
+            reason = 'storage'
+        elif self._level(self.in_flight,
+                         config.BACKPRESSURE_IN_FLIGHT) >= threshold:
+            reason = 'in_flight'
+
+        if (reason is not None) != self.active:
+            self.active = reason is not None
+            if self.active:
+                self.total_activations += 1
+                logger.warning(
+                    f"Ingest backpressure on: {reason} high-water mark reached")
+            else:
+                logger.info("Ingest backpressure off")
+        self.reason = reason
+
+        return reason
+
+    def admit(self, in_flight: Optional[int] = None) -> bool:
+        """Check whether new mail can be accepted, counting refusals"""
+        if self.evaluate(in_flight) is None:
+            return True
+
+        self.total_rejected += 1
+        return False
+
+    @staticmethod
+    def _level(value: int, limit: int) -> float:
+        """Fill level against a high-water mark (0 disables the mark)"""
+        return value / limit if limit > 0 else 0.0
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get backpressure state"""
+        self.evaluate()
+
+        return {
+            'active': self.active,
+            'reason': self.reason,
+            'storage_bytes': self.storage.memory_bytes,
+            'storage_high_water': config.BACKPRESSURE_STORAGE_BYTES,
+            'in_flight': self.in_flight,
+            'in_flight_high_water': config.BACKPRESSURE_IN_FLIGHT,
+            'total_rejected': self.total_rejected,
+            'total_activations': self.total_activations
+        }
+
+
+# Global instance
+backpressure_monitor = BackpressureMonitor()
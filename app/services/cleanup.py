@@ -5,18 +5,30 @@ Cleanup service for scheduled email cleanup
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, Optional
 from datetime import datetime
 
 from ..config import config
 from .email_storage import email_storage_service
+from .metrics import Histogram, DURATION_BUCKETS_S
 
 
 logger = logging.getLogger(__name__)
 
+# Expiry checks are at least this far apart, so emails expiring close
+# together are reclaimed in one batch
+EXPIRY_RESOLUTION_SECONDS = 1.0
+
 
 class CleanupService:
-    """Service for scheduled cleanup of old emails"""
+    """Service for scheduled cleanup of old emails.
+
+    The loop sleeps until the oldest stored email passes retention and
+    then reclaims what is due in batches of CLEANUP_BATCH_SIZE, yielding
+    to the event loop between batches. CLEANUP_INTERVAL_MINUTES only
+    caps how long it sleeps.
+    """
 
     def __init__(self):
         self.cleanup_task: Optional[asyncio.Task] = None
@@ -26,8 +38,10 @@ class CleanupService:
             'total_cleanups': 0,
             'total_emails_cleaned': 0,
             'total_addresses_cleaned': 0,
+            'total_expiry_batches': 0,
             'last_cleanup_result': None
         }
+        self.cleanup_duration = Histogram(DURATION_BUCKETS_S)
 
     async def start(self) -> bool:
         """Start the cleanup service"""
@@ -39,7 +53,9 @@ class CleanupService:
             self.cleanup_task = asyncio.create_task(self._cleanup_loop())
             self.is_running = True
             logger.info(
-                f"Cleanup service started (interval: {config.CLEANUP_INTERVAL_MINUTES} minutes)")
+                f"Cleanup service started (expiring by deadline, batches of "
+                f"{config.CLEANUP_BATCH_SIZE}, max interval: "
+                f"{config.CLEANUP_INTERVAL_MINUTES} minutes)")
             return True
 
         except Exception as e:
@@ -72,10 +88,15 @@ class CleanupService:
         """Main cleanup loop"""
         while self.is_running:
             try:
-                await asyncio.sleep(config.get_cleanup_interval_seconds())
+                await asyncio.sleep(self._seconds_until_next_expiry())
 
                 if self.is_running:  # Check if still running after sleep
-                    await self.perform_cleanup()
+                    result = self.expire_due()
+                    if result.get('cleaned_emails', 0) >= config.CLEANUP_BATCH_SIZE:
+                        # More may be due: let requests run, then continue
+                        await asyncio.sleep(0)
+                        continue
+                    await asyncio.sleep(EXPIRY_RESOLUTION_SECONDS)
 
             except asyncio.CancelledError:
                 logger.info("Cleanup loop cancelled")
@@ -84,20 +105,56 @@ class CleanupService:
                 logger.error(f"Error in cleanup loop: {e}")
                 # Continue the loop despite errors
 
+    def _seconds_until_next_expiry(self) -> float:
+        """Time until the oldest email expires, capped by the cleanup
+        interval and by retention (mail arriving meanwhile expires later)"""
+        longest = min(config.get_cleanup_interval_seconds(),
+                      config.get_retention_seconds())
+        deadline = email_storage_service.get_next_expiry()
+        if deadline is None:
+            return longest
+        return min(longest, max(0.0, deadline - time.time()))
+
+    def expire_due(self) -> Dict[str, Any]:
+        """Reclaim one batch of emails past retention"""
+        try:
+            start = time.perf_counter()
+            result = email_storage_service.expire_due(config.CLEANUP_BATCH_SIZE)
+            self.cleanup_stats['total_expiry_batches'] += 1
+            if not result['cleaned_emails']:
+                return result
+
+            self.cleanup_duration.observe(time.perf_counter() - start)
+            self._record(result)
+            logger.debug(
+                f"Expired {result['cleaned_emails']} emails, "
+                f"{result['removed_addresses']} addresses removed")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error during expiry: {e}")
+            return {'error': str(e)}
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        """Add a cleanup result to the statistics"""
+        self.cleanup_stats['total_cleanups'] += 1
+        self.cleanup_stats['total_emails_cleaned'] += result['cleaned_emails']
+        self.cleanup_stats['total_addresses_cleaned'] += result['removed_addresses']
+        self.cleanup_stats['last_cleanup_result'] = result
+        self.last_cleanup = datetime.now()
+
     async def perform_cleanup(self) -> Dict[str, Any]:
         """Perform cleanup operation"""
         try:
             logger.info("Starting scheduled cleanup...")
 
             # Perform cleanup
+            start = time.perf_counter()
             result = email_storage_service.cleanup_old_emails()
+            self.cleanup_duration.observe(time.perf_counter() - start)
 
             # Update statistics
-            self.cleanup_stats['total_cleanups'] += 1
-            self.cleanup_stats['total_emails_cleaned'] += result['cleaned_emails']
-            self.cleanup_stats['total_addresses_cleaned'] += result['removed_addresses']
-            self.cleanup_stats['last_cleanup_result'] = result
-            self.last_cleanup = datetime.now()
+            self._record(result)
 
             logger.info(
                 f"Cleanup completed: {result['cleaned_emails']} emails cleaned, "
@@ -121,21 +178,23 @@ class CleanupService:
         return {
             'running': self.is_running,
             'cleanup_interval_minutes': config.CLEANUP_INTERVAL_MINUTES,
+            'batch_size': config.CLEANUP_BATCH_SIZE,
             'retention_hours': config.RETENTION_HOURS,
             'last_cleanup': self.last_cleanup.isoformat() if self.last_cleanup else None,
-            'stats': self.cleanup_stats
+            'stats': self.cleanup_stats,
+            'duration_seconds': self.cleanup_duration.snapshot()
         }
 
     def get_next_cleanup_in_seconds(self) -> Optional[int]:
-        """Get seconds until next cleanup"""
-        if not self.last_cleanup or not self.is_running:
+        """Get seconds until the oldest stored email expires"""
+        if not self.is_running:
             return None
 
-        interval_seconds = config.get_cleanup_interval_seconds()
-        elapsed_seconds = (datetime.now() - self.last_cleanup).total_seconds()
-        remaining_seconds = max(0, interval_seconds - elapsed_seconds)
+        deadline = email_storage_service.get_next_expiry()
+        if deadline is None:
+            return None
 
-        return int(remaining_seconds)
+        return int(max(0, deadline - time.time()))
 
 
 # Global instance
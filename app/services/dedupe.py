@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Duplicate message suppression
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from ..config import config
+
+
+def message_key(recipient: str, headers: Dict[str, str], data: bytes) -> str:
+    """Identify a message for one recipient by Message-ID, or by content"""
+    message_id = next((value for name, value in headers.items()
+                       if name.lower() == 'message-id'), None)
+    if message_id:
+        identity = f'id:{message_id.strip()}'
+    else:
+        identity = 'sha:' + hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f'{recipient.lower()}|{identity}'
+
+
+class DuplicateFilter:
+    """Bounded LRU of recently seen message keys with a TTL.
+
+    Entries are ordered by when they were last recorded, so expired
+    ones are always at the front and pruning stops at the first live
+    entry. Checking records nothing: a key is only recorded once its
+    email is stored, so a failed delivery can still be retried.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = (config.DEDUPE_MAX_ENTRIES
+                            if max_entries is None else max_entries)
+        self.ttl = config.DEDUPE_TTL_SECONDS if ttl is None else ttl
+        self._entries: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_duplicates = 0
+
+    def contains(self, key: str) -> bool:
+        """Check whether a key was recorded within the TTL"""
+        with self._lock:
+            self._prune(time.monotonic())
+            duplicate = key in self._entries
+            if duplicate:
+                self.total_duplicates += 1
+            return duplicate
+
+    def record(self, key: str) -> None:
+        """Record a key for an email that was stored"""
+        now = time.monotonic()
+
+        with self._lock:
+            self._prune(now)
+            self._entries[key] = now + self.ttl
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired entries; the caller holds the lock"""
+        while self._entries:
+            key, expires = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Forget all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get duplicate filter statistics"""
+        return {
+            'enabled': config.DEDUPE_ENABLED,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'total_duplicates': self.total_duplicates
+        }
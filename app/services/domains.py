@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Recipient domain matching for multi-domain routing
+"""
+
+from typing import Iterable, List, Optional
+
+from ..config import config
+
+
+class DomainMatcher:
+    """Precompiled set of accepted domains.
+
+    Exact domains live in a set and ``*.suffix`` patterns in a set of
+    suffixes, so a lookup costs one probe per label of the recipient
+    domain no matter how many domains are configured.
+    """
+
+    __slots__ = ('exact', 'suffixes', 'patterns')
+
+    def __init__(self, patterns: Iterable[str]):
+        self.exact = set()
+        self.suffixes = set()
+        self.patterns: List[str] = []
+
+        for pattern in patterns:
+            pattern = pattern.strip().lower()
+            if not pattern or pattern in self.patterns:
+                continue
+            self.patterns.append(pattern)
+            if pattern.startswith('*.'):
+                self.suffixes.add(pattern[2:])
+            else:
+                self.exact.add(pattern)
+
+    @classmethod
+    def from_config(cls) -> 'DomainMatcher':
+        """Build a matcher from the configured domains"""
+        return cls(config.get_domains())
+
+    def match(self, domain: str) -> Optional[str]:
+        """Get the configured pattern accepting a domain, if any"""
+        domain = domain.lower()
+        if domain in self.exact:
+            return domain
+
+        # Walk up the labels: a.b.example.com -> b.example.com -> example.com
+        dot = domain.find('.')
+        while dot != -1:
+            suffix = domain[dot + 1:]
+            if suffix in self.suffixes:
+                return f'*.{suffix}'
+            dot = domain.find('.', dot + 1)
+
+        return None
+
+    def accepts(self, address: str) -> bool:
+        """Check whether an address belongs to one of our domains"""
+        _, at, domain = address.rpartition('@')
+        return bool(at) and self.match(domain) is not None
+
+
+def address_domain(address: str) -> str:
+    """Get the lowercased domain part of an address"""
+    return address.rpartition('@')[2].lower()
@@ -3,12 +3,97 @@
 Email storage service for managing email data
 """
 
+import asyncio
+import heapq
 import time
 import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from operator import itemgetter
+from contextlib import nullcontext
 from datetime import datetime
 from collections import defaultdict, deque
-from typing import Dict, List, Optional, Any
+from typing import (AsyncIterator, Callable, Dict, Iterator, List, Optional, Any,
+                    Sequence, Tuple)
 from ..config import config
+from ..models import EmailModel
+from .domains import address_domain
+from .ids import id_bound, is_message_id
+from .message_parser import extract_body
+from .metrics import Histogram, LATENCY_BUCKETS_MS
+
+# Fields kept for bookkeeping that are never returned to API clients
+INTERNAL_FIELDS = frozenset({'timestamp', 'raw', 'stored_bytes', 'json', 'snippet'})
+
+# Fields that can be requested with a projection, and the summary view
+EMAIL_FIELDS = ('id', 'from', 'to', 'subject', 'body', 'headers', 'received', 'snippet')
+SUMMARY_FIELDS = ('id', 'from', 'to', 'subject', 'received', 'snippet')
+
+SNIPPET_LENGTH = 160
+
+# Approximate CPython overhead of a stored email dict with its field
+# objects, and of each header name/value pair, measured with
+# sys.getsizeof walks of typical parsed emails
+EMAIL_OVERHEAD_BYTES = 1280
+HEADER_OVERHEAD_BYTES = 120
+
+# Text fields counted by length in the size estimate
+SIZED_FIELDS = ('id', 'from', 'to', 'subject', 'body', 'received')
+
+# Mailboxes listed in the statistics as using the most memory
+LARGEST_ADDRESSES = 10
+
+
+def make_snippet(body: Optional[str]) -> str:
+    """Short single-line preview of a body"""
+    if not body:
+        return ''
+    # Only look at enough of the body to fill the snippet
+    words = body[:SNIPPET_LENGTH * 4].split()
+    snippet = ' '.join(words)
+    if len(snippet) <= SNIPPET_LENGTH:
+        return snippet
+    return snippet[:SNIPPET_LENGTH - 3].rstrip() + '...'
+
+
+def strip_whitespace(value: Any) -> Any:
+    """Strip strings, and the keys and values of dicts, as EmailModel's
+    str_strip_whitespace does, so projections match the full view"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {strip_whitespace(k): strip_whitespace(v) for k, v in value.items()}
+    return value
+
+
+def is_spooled(email: Dict[str, Any]) -> bool:
+    """Check whether an email's body has to be read back from disk"""
+    raw = email.get('raw')
+    return (email.get('body') is None and raw is not None
+            and not isinstance(raw, (bytes, bytearray)))
+
+
+def estimate_email_size(email_data: Dict[str, Any]) -> int:
+    """Approximate in-memory size of an email, in bytes"""
+    size = EMAIL_OVERHEAD_BYTES
+    size += sum(len(email_data.get(field) or '') for field in SIZED_FIELDS)
+    size += sum(len(name) + len(value) + HEADER_OVERHEAD_BYTES
+                for name, value in email_data.get('headers', {}).items())
+
+    # Spooled payloads live on disk and are not counted
+    raw = email_data.get('raw')
+    if isinstance(raw, (bytes, bytearray)):
+        size += len(raw)
+
+    return size
+
+
+_email_id = itemgetter('id')
+
+
+def _cached_size(email: Dict[str, Any]) -> int:
+    """Bytes of the JSON fragment cached on an email, if any"""
+    return len(email.get('json') or b'')
 
 
 class EmailStorageService:
@@ -17,58 +102,338 @@ class EmailStorageService:
     def __init__(self):
         self.email_storage: Dict[str, deque] = defaultdict(deque)
         self.email_timestamps: Dict[str, float] = {}
+        # Mailboxes per recipient domain
+        self.domain_index: Dict[str, set] = defaultdict(set)
+        # Running estimate of stored bytes, in total and per mailbox; these
+        # only change with the store version, so they are safe to report
+        # next to an ETag or from a cached snapshot
+        self.total_bytes = 0
+        self.mailbox_bytes: Dict[str, int] = {}
+        # JSON fragments cached on first read, which grow without a
+        # version change and are counted apart
+        self.cache_bytes = 0
+        # Running count of stored emails, so gauges need no scan
+        self.total_emails = 0
+        # Change counters: one sequence shared by all mailboxes, so a
+        # mailbox that is deleted and recreated never repeats a version
+        self.version = 0
+        self.mailbox_versions: Dict[str, int] = {}
+        # Min-heap of (oldest timestamp, address), one live entry per
+        # mailbox: the one matching expiry_scheduled. Others are stale and
+        # dropped when they surface.
+        self.expiry_heap: List[tuple] = []
+        self.expiry_scheduled: Dict[str, float] = {}
+        # Time waited for and then held the lock per write, in milliseconds
+        self.write_lock_wait = Histogram(LATENCY_BUCKETS_MS)
+        self.write_lock_hold = Histogram(LATENCY_BUCKETS_MS)
         self._lock = threading.RLock()  # Reentrant lock for thread safety
+        self.single_loop = False
+
+    def set_single_loop(self, enabled: bool) -> None:
+        """Drop locking when all access happens on one event loop"""
+        with self._lock:
+            self._lock = nullcontext() if enabled else threading.RLock()
+            self.single_loop = enabled
 
     def add_email(self, email_data: Dict[str, Any]) -> bool:
         """Add email to storage"""
-        try:
-            with self._lock:
-                address = email_data['to'].lower()
-
-                # Add email to queue
-                self.email_storage[address].append(email_data)
-
-                # Limit emails per address
-                if len(self.email_storage[address]) > config.MAX_EMAILS_PER_ADDRESS:
-                    self.email_storage[address].popleft()
+        return self.add_emails([email_data])[0]
 
-                # Update timestamp
-                self.email_timestamps[address] = email_data['timestamp']
-
-                return True
-        except Exception as e:
-            print(f"Error adding email: {e}")
-            return False
-
-    def get_emails(self, address: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get emails for a specific address"""
+    def add_emails(self, emails: List[Dict[str, Any]]) -> List[bool]:
+        """Add several emails under one lock acquisition"""
+        results = []
+        requested = time.perf_counter()
         with self._lock:
-            address = address.lower()
-            emails = list(self.email_storage.get(address, []))
-
-            # Sort by timestamp (newest first)
-            emails.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-
-            # Apply limit
-            emails = emails[:limit]
-
-            # Remove internal timestamp field
-            clean_emails = []
-            for email in emails:
-                clean_email = {k: v for k,
-                               v in email.items() if k != 'timestamp'}
-                clean_emails.append(clean_email)
-
-            return clean_emails
+            start = time.perf_counter()
+            self.write_lock_wait.observe((start - requested) * 1000)
+            for email_data in emails:
+                try:
+                    self._add_locked(email_data)
+                    results.append(True)
+                except Exception as e:
+                    print(f"Error adding email: {e}")
+                    results.append(False)
+            self.write_lock_hold.observe((time.perf_counter() - start) * 1000)
+
+        return results
+
+    def _add_locked(self, email_data: Dict[str, Any]) -> None:
+        """Add one email; the caller holds the lock"""
+        address = email_data['to'].lower()
+
+        if address not in self.email_storage:
+            self.domain_index[address_domain(address)].add(address)
+
+        if email_data.get('body') is not None:
+            email_data['snippet'] = make_snippet(email_data['body'])
+        email_data['stored_bytes'] = estimate_email_size(email_data)
+        self._account_bytes(address, email_data['stored_bytes'])
+
+        # Add email to queue, keeping generated ids in order for range
+        # queries (arrivals from other threads or nodes can interleave)
+        mailbox = self.email_storage[address]
+        email_id = email_data.get('id', '')
+        if (mailbox and email_id < mailbox[-1].get('id', '')
+                and is_message_id(email_id)):
+            insort(mailbox, email_data, key=_email_id)
+        else:
+            mailbox.append(email_data)
+        self.total_emails += 1
+
+        # Limit emails per address
+        if len(self.email_storage[address]) > config.MAX_EMAILS_PER_ADDRESS:
+            evicted = self.email_storage[address].popleft()
+            self._account_bytes(address, -evicted.get('stored_bytes', 0))
+            self.cache_bytes -= _cached_size(evicted)
+            self.total_emails -= 1
+
+        # Update timestamp
+        self.email_timestamps[address] = email_data['timestamp']
+        scheduled = self.expiry_scheduled.get(address)
+        if scheduled is None or email_data['timestamp'] < scheduled:
+            self._schedule_expiry(address, email_data['timestamp'])
+        self._bump_version(address)
+
+    def get_emails(self, address: str, limit: int = 10, after: Optional[str] = None,
+                   since: Optional[float] = None, until: Optional[float] = None,
+                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Get emails for a specific address, optionally only those after an
+        id cursor or received within a time range, and only some fields.
+
+        Emails come newest first, except with an after cursor: then they
+        are the first emails after it, oldest first, so a poller moving
+        its cursor to the last id it saw misses nothing. Emails spooled to
+        disk are read back after the lock is released.
+        """
+        render = self._renderer(fields)
+        selected, results = self._select_rendered(
+            address, limit, after, since, until, render)
+        return self._render_spooled(selected, results, render)
+
+    async def get_emails_off_loop(self, address: str, limit: int = 10,
+                                  after: Optional[str] = None,
+                                  since: Optional[float] = None,
+                                  until: Optional[float] = None,
+                                  fields: Optional[Sequence[str]] = None
+                                  ) -> List[Dict[str, Any]]:
+        """get_emails for the event loop: spooled emails are read from
+        disk in a worker thread"""
+        render = self._renderer(fields)
+        selected, results = self._select_rendered(
+            address, limit, after, since, until, render)
+        return await self._render_spooled_off_loop(selected, results, render)
+
+    def get_emails_json(self, address: str, limit: int = 10,
+                        after: Optional[str] = None,
+                        since: Optional[float] = None,
+                        until: Optional[float] = None) -> List[bytes]:
+        """Same selection as get_emails, as serialized EmailModel JSON.
+
+        Each email is validated and serialized once, on first read, and
+        the bytes are kept with it; emails spooled to disk are serialized
+        on every read, outside the lock, so their bodies stay out of memory.
+        """
+        selected, results = self._select_rendered(
+            address, limit, after, since, until, self._fragment)
+        return self._render_spooled(selected, results, self._fragment)
+
+    async def get_emails_json_off_loop(self, address: str, limit: int = 10,
+                                       after: Optional[str] = None,
+                                       since: Optional[float] = None,
+                                       until: Optional[float] = None) -> List[bytes]:
+        """get_emails_json for the event loop: spooled emails are read
+        from disk in a worker thread"""
+        selected, results = self._select_rendered(
+            address, limit, after, since, until, self._fragment)
+        return await self._render_spooled_off_loop(selected, results, self._fragment)
+
+    def _renderer(self,
+                  fields: Optional[Sequence[str]]) -> Callable[[Dict[str, Any]], Any]:
+        """How get_emails turns a stored email into a result"""
+        if fields is not None:
+            return lambda email: self._project(email, fields)
+        return self._clean
+
+    def _clean(self, email: Dict[str, Any]) -> Dict[str, Any]:
+        """Email without internal fields, extracting a lazily parsed body"""
+        email = self._materialize_body(email)
+        return {k: v for k, v in email.items() if k not in INTERNAL_FIELDS}
+
+    def _fragment(self, email: Dict[str, Any]) -> bytes:
+        """Cached JSON of an email, serializing it on first read"""
+        fragment = email.get('json')
+        if fragment is None:
+            fragment = self._serialize(email)
+        return fragment
+
+    def _select_rendered(self, address: str, limit: int, after: Optional[str],
+                         since: Optional[float], until: Optional[float],
+                         render: Callable[[Dict[str, Any]], Any]
+                         ) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """Select emails and render those in memory under the lock; spooled
+        ones are left as None, since reading them back from disk would
+        block writers"""
+        with self._lock:
+            selected = self._select(address, limit, after, since, until)
+            return selected, [None if is_spooled(email) else render(email)
+                              for email in selected]
+
+    @staticmethod
+    def _render_spooled(selected: List[Dict[str, Any]], results: List[Any],
+                        render: Callable[[Dict[str, Any]], Any]) -> List[Any]:
+        """Fill in the spooled emails left out by _select_rendered; the
+        caller does not hold the lock"""
+        return [render(email) if result is None else result
+                for email, result in zip(selected, results)]
+
+    async def _render_spooled_off_loop(self, selected: List[Dict[str, Any]],
+                                       results: List[Any],
+                                       render: Callable[[Dict[str, Any]], Any]
+                                       ) -> List[Any]:
+        """_render_spooled in a worker thread, when there is disk to read"""
+        if all(result is not None for result in results):
+            return results
+        return await asyncio.to_thread(self._render_spooled, selected, results, render)
+
+    def _select(self, address: str, limit: int, after: Optional[str],
+                since: Optional[float], until: Optional[float]) -> List[Dict[str, Any]]:
+        """Emails of a mailbox within the filters, ordered as described in
+        get_emails; the caller holds the lock"""
+        mailbox = self.email_storage.get(address.lower(), ())
+        if after is not None:
+            return self._id_range(mailbox, after, since, until, limit)
+        if since is None and until is None:
+            emails = list(mailbox)
+        else:
+            emails = self._id_range(mailbox, after, since, until)
+
+        # Sort by timestamp (newest first)
+        emails.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+
+        # Apply limit
+        return emails[:limit]
+
+    def _project(self, email: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+        """Pick fields of an email, extracting the body only if it is needed"""
+        source = email
+        if 'body' in fields or ('snippet' in fields and 'snippet' not in email):
+            source = self._materialize_body(email)
+            if 'snippet' not in email:
+                # Parsed headers-only: the snippet is made on first request
+                email['snippet'] = make_snippet(source.get('body'))
+
+        projected = {field: strip_whitespace(source.get(field)) for field in fields}
+        if 'snippet' in projected:
+            projected['snippet'] = email['snippet']
+        return projected
+
+    def _serialize(self, email: Dict[str, Any], cache: bool = True) -> bytes:
+        """Serialize an email for the API, caching it unless it is spooled"""
+        materialized = self._materialize_body(email, keep=cache)
+        fragment = EmailModel.model_validate(
+            {k: v for k, v in materialized.items() if k not in INTERNAL_FIELDS}
+        ).model_dump_json(by_alias=True).encode()
+
+        if cache and materialized is email:
+            email['json'] = fragment
+            self.cache_bytes += len(fragment)
+
+        return fragment
+
+    def export_json(self, domain: Optional[str] = None,
+                    chunk_size: int = 256) -> Iterator[List[bytes]]:
+        """Serialized emails of every mailbox, oldest first, in chunks.
+
+        The lock is taken per chunk rather than for the whole export,
+        and nothing is cached on the emails, so memory stays at about one
+        mailbox of references plus one chunk of JSON however much is
+        stored. Mail arriving during an export may or may not be included.
+        """
+        for batch, chunk in self._export_chunks(domain, chunk_size):
+            yield self._render_spooled(batch, chunk, self._serialize_uncached)
+
+    async def export_json_off_loop(self, domain: Optional[str] = None,
+                                   chunk_size: int = 256
+                                   ) -> AsyncIterator[List[bytes]]:
+        """export_json for the event loop: spooled emails are read from
+        disk in a worker thread"""
+        for batch, chunk in self._export_chunks(domain, chunk_size):
+            yield await self._render_spooled_off_loop(
+                batch, chunk, self._serialize_uncached)
+
+    def _export_chunks(self, domain: Optional[str], chunk_size: int
+                       ) -> Iterator[Tuple[List[Dict[str, Any]], List[Any]]]:
+        """Chunks of emails with those in memory serialized under the
+        lock, and spooled ones left as None for _render_spooled"""
+        with self._lock:
+            if domain is None:
+                addresses = list(self.email_storage)
+            else:
+                addresses = list(self.domain_index.get(domain.lower(), ()))
 
-    def get_all_addresses(self) -> List[Dict[str, Any]]:
-        """Get all active email addresses with counts"""
+        for address in addresses:
+            with self._lock:
+                emails = list(self.email_storage.get(address, ()))
+
+            for start in range(0, len(emails), chunk_size):
+                batch = emails[start:start + chunk_size]
+                with self._lock:
+                    chunk = [None if is_spooled(email) else
+                             email.get('json') or self._serialize_uncached(email)
+                             for email in batch]
+                yield batch, chunk
+
+    def _serialize_uncached(self, email: Dict[str, Any]) -> bytes:
+        """Serialize an email without caching the JSON on it"""
+        return self._serialize(email, cache=False)
+
+    @staticmethod
+    def _id_range(mailbox, after: Optional[str], since: Optional[float],
+                  until: Optional[float],
+                  limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Binary-search a mailbox, which is ordered by id; with a limit,
+        only the first emails of the range"""
+        lo, hi = 0, len(mailbox)
+        if after is not None:
+            lo = bisect_right(mailbox, after.upper(), key=_email_id)
+        if since is not None:
+            lo = max(lo, bisect_left(mailbox, id_bound(since), key=_email_id))
+        if until is not None:
+            hi = bisect_right(mailbox, id_bound(until, upper=True), key=_email_id)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return list(islice(mailbox, lo, hi)) if lo < hi else []
+
+    def _materialize_body(self, email: Dict[str, Any],
+                          keep: bool = True) -> Dict[str, Any]:
+        """Fill in the body of a headers-only parsed email; without keep
+        the stored email is left as it is"""
+        if email.get('body') is None and 'raw' in email:
+            raw = email['raw']
+            in_memory = isinstance(raw, (bytes, bytearray))
+            if in_memory and keep:
+                email['body'] = extract_body(email.pop('raw'))
+            else:
+                # Spooled to disk: read it back, but keep the body out of memory
+                email = email.copy()
+                email['body'] = extract_body(raw if in_memory else raw.read())
+        return email
+
+    def get_all_addresses(self, domain: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get all active email addresses with counts, optionally for one domain"""
         with self._lock:
+            if domain is None:
+                mailboxes = self.email_storage.keys()
+            else:
+                mailboxes = self.domain_index.get(domain.lower(), ())
+
             addresses = []
-            for address, emails in self.email_storage.items():
+            for address in mailboxes:
+                emails = self.email_storage[address]
                 addresses.append({
                     'address': address,
-                    'emailCount': len(emails)
+                    'emailCount': len(emails),
+                    'bytes': self.mailbox_bytes.get(address, 0)
                 })
             return addresses
 
@@ -78,9 +443,10 @@ class EmailStorageService:
             address = address.lower()
 
             if address in self.email_storage:
-                del self.email_storage[address]
-                if address in self.email_timestamps:
-                    del self.email_timestamps[address]
+                self.total_bytes -= self.mailbox_bytes.pop(address, 0)
+                self.cache_bytes -= sum(map(_cached_size, self.email_storage[address]))
+                self.total_emails -= len(self.email_storage[address])
+                self._drop_mailbox(address)
                 return True
 
             return False
@@ -93,19 +459,8 @@ class EmailStorageService:
             addresses_to_remove = []
             cleaned_count = 0
 
-            for address, emails in self.email_storage.items():
-                # Count emails before cleanup
-                original_count = len(emails)
-
-                # Filter out old emails
-                self.email_storage[address] = deque([
-                    email for email in emails
-                    if email.get('timestamp', 0) > cutoff_time
-                ])
-
-                # Count cleaned emails
-                cleaned_count += original_count - \
-                    len(self.email_storage[address])
+            for address in self.email_storage:
+                cleaned_count += self._expire_mailbox(address, cutoff_time)
 
                 # Mark empty addresses for removal
                 if not self.email_storage[address]:
@@ -113,9 +468,7 @@ class EmailStorageService:
 
             # Remove empty addresses
             for address in addresses_to_remove:
-                del self.email_storage[address]
-                if address in self.email_timestamps:
-                    del self.email_timestamps[address]
+                self._drop_mailbox(address)
 
             return {
                 'cleaned_emails': cleaned_count,
@@ -123,14 +476,160 @@ class EmailStorageService:
                 'active_addresses': len(self.email_storage)
             }
 
+    def expire_due(self, limit: int) -> Dict[str, int]:
+        """Remove emails past retention, oldest mailboxes first, stopping
+        once about limit emails are removed.
+
+        Only mailboxes whose oldest email is due are visited, so a run
+        costs the expired mail rather than the whole store.
+        """
+        with self._lock:
+            cutoff_time = time.time() - config.get_retention_seconds()
+            cleaned_count = removed_addresses = 0
+
+            while (self.expiry_heap and self.expiry_heap[0][0] <= cutoff_time
+                   and cleaned_count < limit):
+                timestamp, address = heapq.heappop(self.expiry_heap)
+                if self.expiry_scheduled.get(address) != timestamp:
+                    continue  # Stale entry
+                del self.expiry_scheduled[address]
+
+                cleaned_count += self._expire_mailbox(address, cutoff_time)
+                emails = self.email_storage[address]
+                if emails:
+                    self._schedule_expiry(
+                        address, min(email.get('timestamp', 0) for email in emails))
+                else:
+                    self._drop_mailbox(address)
+                    removed_addresses += 1
+
+            return {
+                'cleaned_emails': cleaned_count,
+                'removed_addresses': removed_addresses,
+                'active_addresses': len(self.email_storage)
+            }
+
+    def get_next_expiry(self) -> Optional[float]:
+        """Time the oldest stored email passes retention, or None if empty.
+
+        Never later than the true deadline: a mailbox whose oldest email
+        was evicted keeps its earlier deadline until it is next checked.
+        """
+        with self._lock:
+            while self.expiry_heap:
+                timestamp, address = self.expiry_heap[0]
+                if self.expiry_scheduled.get(address) == timestamp:
+                    return timestamp + config.get_retention_seconds()
+                heapq.heappop(self.expiry_heap)
+            return None
+
+    def _schedule_expiry(self, address: str, timestamp: float) -> None:
+        """Record the oldest timestamp of a mailbox; the caller holds the lock"""
+        self.expiry_scheduled[address] = timestamp
+        heapq.heappush(self.expiry_heap, (timestamp, address))
+
+        # Rebuild once stale entries dominate
+        if len(self.expiry_heap) > 2 * len(self.expiry_scheduled) + 64:
+            self.expiry_heap = [(timestamp, address) for address, timestamp
+                                in self.expiry_scheduled.items()]
+            heapq.heapify(self.expiry_heap)
+
+    def _expire_mailbox(self, address: str, cutoff_time: float) -> int:
+        """Drop emails older than the cutoff from a mailbox, keeping the
+        mailbox itself; the caller holds the lock"""
+        emails = self.email_storage[address]
+        kept = deque()
+        removed_bytes = 0
+        for email in emails:
+            if email.get('timestamp', 0) > cutoff_time:
+                kept.append(email)
+            else:
+                removed_bytes += email.get('stored_bytes', 0)
+                self.cache_bytes -= _cached_size(email)
+
+        removed = len(emails) - len(kept)
+        if removed:
+            self.email_storage[address] = kept
+            self._account_bytes(address, -removed_bytes)
+            self.total_emails -= removed
+            self._bump_version(address)
+        return removed
+
+    def _drop_mailbox(self, address: str) -> None:
+        """Remove a mailbox and its bookkeeping; the caller holds the lock"""
+        del self.email_storage[address]
+        self.mailbox_bytes.pop(address, None)
+        self.email_timestamps.pop(address, None)
+        self.expiry_scheduled.pop(address, None)
+        self._unindex_address(address)
+        self._bump_version(address, removed=True)
+
+    def _bump_version(self, address: str, removed: bool = False) -> None:
+        """Record a change to a mailbox; the caller holds the lock"""
+        self.version += 1
+        if removed:
+            self.mailbox_versions.pop(address, None)
+        else:
+            self.mailbox_versions[address] = self.version
+
+    def get_version(self, address: Optional[str] = None) -> Optional[int]:
+        """Change counter of a mailbox, or of the whole store.
+
+        Lock-free: a single dict lookup, cheap enough to answer
+        conditional requests without touching the emails.
+        """
+        if address is None:
+            return self.version
+        return self.mailbox_versions.get(address.lower())
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated memory of stored emails and their cached JSON"""
+        return self.total_bytes + self.cache_bytes
+
+    def _account_bytes(self, address: str, delta: int) -> None:
+        """Add to the stored bytes of a mailbox and the total; the caller
+        holds the lock"""
+        self.total_bytes += delta
+        self.mailbox_bytes[address] = self.mailbox_bytes.get(address, 0) + delta
+
+    def get_largest_addresses(self,
+                              count: int = LARGEST_ADDRESSES) -> List[Dict[str, Any]]:
+        """Mailboxes using the most memory, largest first"""
+        with self._lock:
+            largest = heapq.nlargest(count, self.mailbox_bytes.items(),
+                                     key=itemgetter(1))
+            return [{'address': address, 'bytes': size,
+                     'emailCount': len(self.email_storage.get(address, ()))}
+                    for address, size in largest]
+
+    def _unindex_address(self, address: str) -> None:
+        """Drop a removed mailbox from the domain index"""
+        domain = address_domain(address)
+        mailboxes = self.domain_index.get(domain)
+        if mailboxes is not None:
+            mailboxes.discard(address)
+            if not mailboxes:
+                del self.domain_index[domain]
+
+    def get_domains(self) -> List[Dict[str, Any]]:
+        """Get domains that have mailboxes, with mailbox counts"""
+        with self._lock:
+            return [{'domain': domain, 'addressCount': len(mailboxes)}
+                    for domain, mailboxes in self.domain_index.items()]
+
     def get_statistics(self) -> Dict[str, Any]:
         """Get storage statistics"""
         with self._lock:
-            total_emails = sum(len(emails)
-                               for emails in self.email_storage.values())
+            total_emails = self.total_emails
 
             return {
                 'total_addresses': len(self.email_storage),
+                'total_domains': len(self.domain_index),
+                'total_bytes': self.total_bytes,
+                'largest_addresses': self.get_largest_addresses(),
+                'write_lock_wait_ms': self.write_lock_wait.snapshot(),
+                'write_lock_hold_ms': self.write_lock_hold.snapshot(),
                 'total_emails': total_emails,
                 'addresses': list(self.email_storage.keys()),
                 'oldest_email': self._get_oldest_email_timestamp(),
@@ -162,6 +661,15 @@ class EmailStorageService:
         with self._lock:
             self.email_storage.clear()
             self.email_timestamps.clear()
+            self.domain_index.clear()
+            self.mailbox_versions.clear()
+            self.mailbox_bytes.clear()
+            self.expiry_heap.clear()
+            self.expiry_scheduled.clear()
+            self.total_bytes = 0
+            self.cache_bytes = 0
+            self.total_emails = 0
+            self.version += 1
 
 
 # Global instance
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Time-sortable message ids
+
+Ids are 64-bit snowflake values (milliseconds since EPOCH_MS, node id,
+per-millisecond sequence) written as 13 Crockford base32 characters, so
+string order is creation order and ids can be binary-searched.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from ..config import config
+
+
+# 2024-01-01T00:00:00Z
+EPOCH_MS = 1704067200000
+
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+TIME_SHIFT = NODE_BITS + SEQUENCE_BITS
+
+ID_LENGTH = 13
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_DECODE = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def encode_id(value: int) -> str:
+    """Encode a 64-bit id as fixed-width Crockford base32"""
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def decode_id(message_id: str) -> int:
+    """Decode an id produced by encode_id"""
+    value = 0
+    for char in message_id.upper():
+        value = (value << 5) | _DECODE[char]
+    return value
+
+
+def is_message_id(value: str) -> bool:
+    """Check whether a string looks like a generated id"""
+    return len(value) == ID_LENGTH and all(char in _DECODE for char in value)
+
+
+def id_time(message_id: str) -> float:
+    """Get the creation time of an id, in seconds since the Unix epoch"""
+    return ((decode_id(message_id) >> TIME_SHIFT) + EPOCH_MS) / 1000
+
+
+def id_bound(timestamp: float, upper: bool = False) -> str:
+    """Get the smallest (or largest) id that can be created at a time"""
+    ms = max(0, int(timestamp * 1000) - EPOCH_MS)
+    value = ms << TIME_SHIFT
+    if upper:
+        value |= (1 << TIME_SHIFT) - 1
+    return encode_id(value)
+
+
+class IdGenerator:
+    """Monotonic snowflake id generator.
+
+    Ids never go backwards: if the clock does, or more than 4096 ids are
+    needed within one millisecond, the generator keeps counting on from
+    the last millisecond it used.
+    """
+
+    def __init__(self, node_id: Optional[int] = None):
+        self.node_id = config.NODE_ID if node_id is None else node_id
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_id(self) -> str:
+        """Generate the next id"""
+        now = int(time.time() * 1000) - EPOCH_MS
+
+        with self._lock:
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence > SEQUENCE_MASK:
+                    self._last_ms += 1
+                    self._sequence = 0
+
+            value = ((self._last_ms << TIME_SHIFT)
+                     | ((self.node_id & MAX_NODE_ID) << SEQUENCE_BITS)
+                     | self._sequence)
+
+        return encode_id(value)
+
+
+# Global instance
+id_generator = IdGenerator()
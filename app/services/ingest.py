@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Batched ingestion between the SMTP handler and storage
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Dict, Any, List, Optional
+
+from ..config import config
+from .email_storage import email_storage_service
+from .metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# Emails committed per storage write
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class IngestQueue:
+    """Queue stage committing emails to storage in batches.
+
+    ``submit`` hands over the emails of one message and resolves once
+    they are stored. A writer task per event loop commits up to
+    ``batch_size`` emails with a single storage lock acquisition: what
+    is queued once the writer wakes up, plus whatever arrives within
+    ``batch_ms`` of the first one.
+    """
+
+    def __init__(self, storage=None, batch_size: Optional[int] = None,
+                 batch_ms: Optional[float] = None):
+        self.storage = storage or email_storage_service
+        self.batch_size = (config.INGEST_BATCH_SIZE
+                           if batch_size is None else batch_size)
+        self.batch_ms = config.INGEST_BATCH_MS if batch_ms is None else batch_ms
+
+        # The SMTP controller runs its own loop, so keep a queue per loop
+        self._queues: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Queue] = weakref.WeakKeyDictionary()
+        self._writers = set()
+
+        self.pending = 0
+        self.total_batches = 0
+        self.total_emails = 0
+        self.batch_sizes = Histogram(BATCH_BUCKETS)
+
+    async def submit(self, emails: List[Dict[str, Any]]) -> List[bool]:
+        """Store emails, returning a success flag per email"""
+        if self.batch_size <= 1:
+            results = self.storage.add_emails(emails)
+            self._record(len(emails), sum(results))
+            return results
+
+        queue = self._get_queue()
+        future = asyncio.get_running_loop().create_future()
+        self.pending += len(emails)
+        queue.put_nowait((emails, future))
+        return await future
+
+    def _get_queue(self) -> asyncio.Queue:
+        """Get the queue of the running loop, starting its writer"""
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = asyncio.Queue()
+            writer = loop.create_task(self._writer(queue))
+            self._writers.add(writer)
+            writer.add_done_callback(self._writers.discard)
+        return queue
+
+    async def _writer(self, queue: asyncio.Queue) -> None:
+        """Collect submissions into batches and commit them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            count = len(batch[0][0])
+            deadline = loop.time() + self.batch_ms / 1000
+
+            # Let handlers that are already runnable enqueue as well
+            await asyncio.sleep(0)
+
+            while count < self.batch_size:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                count += len(item[0])
+
+            self._commit(batch)
+
+    def _commit(self, batch: List[tuple]) -> None:
+        """Write one batch and resolve its submitters"""
+        emails = [email for item, _ in batch for email in item]
+        try:
+            results = self.storage.add_emails(emails)
+        except Exception as e:
+            logger.error(f"Failed to store batch of {len(emails)} emails: {e}")
+            results = [False] * len(emails)
+
+        self.pending -= len(emails)
+        self._record(len(emails), sum(results))
+
+        offset = 0
+        for item, future in batch:
+            stored = results[offset:offset + len(item)]
+            offset += len(item)
+            if not future.done():
+                future.set_result(stored)
+
+    def _record(self, size: int, stored: int) -> None:
+        """Update batch statistics"""
+        self.total_batches += 1
+        self.total_emails += stored
+        self.batch_sizes.observe(size)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ingest queue statistics"""
+        return {
+            'batch_size': self.batch_size,
+            'batch_ms': self.batch_ms,
+            'pending': self.pending,
+            'total_batches': self.total_batches,
+            'total_emails': self.total_emails,
+            'emails_per_batch': self.batch_sizes.snapshot()
+        }
+
+
+# Global instance
+ingest_queue = IngestQueue()
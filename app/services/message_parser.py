@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Message parsing service with a configurable worker pool
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from email import policy
+from email.parser import BytesHeaderParser, BytesParser
+from typing import Dict, Any, Optional, Tuple
+
+from ..config import config
+
+
+logger = logging.getLogger(__name__)
+
+PARSE_MODES = ('inline', 'thread', 'process')
+
+
+def parse_message(data: bytes, headers_only: bool = False) -> Dict[str, Any]:
+    """Parse raw message bytes into the fields kept in storage.
+
+    Module-level so it can be shipped to a process pool: only the raw
+    bytes go in and only a small dict of strings comes back. With
+    headers_only the body is left as None for extract_body() to fill
+    in on first read.
+    """
+    if headers_only:
+        msg = BytesHeaderParser(policy=policy.compat32).parsebytes(
+            _header_block(data))
+    else:
+        msg = BytesParser(policy=policy.compat32).parsebytes(data)
+
+    subject, headers = _get_headers(msg)
+
+    return {
+        'subject': subject if subject is not None else 'No Subject',
+        'body': None if headers_only else _get_body(msg),
+        'headers': headers
+    }
+
+
+def extract_body(data: bytes) -> str:
+    """Parse the full message and return only its body"""
+    return _get_body(BytesParser(policy=policy.compat32).parsebytes(data))
+
+
+def _header_block(data: bytes) -> bytes:
+    """Slice off the header block so the body is never decoded or copied"""
+    end = data.find(b'\r\n\r\n')
+    # A bare-LF blank line only counts if it comes first
+    lf_end = data.find(b'\n\n', 0, end if end >= 0 else len(data))
+    if lf_end >= 0:
+        return data[:lf_end + 2]
+    if end >= 0:
+        return data[:end + 4]
+    return data
+
+
+def _header_text(value: str) -> str:
+    """Turn a raw header value back into text.
+
+    BytesParser keeps non-ASCII header bytes as surrogate escapes;
+    those are usually UTF-8 sent by SMTPUTF8 clients.
+    """
+    if value.isascii():
+        return value
+    return value.encode('ascii', 'surrogateescape').decode('utf-8', 'replace')
+
+
+def _get_headers(msg) -> Tuple[Optional[str], Dict[str, str]]:
+    """Get the first Subject and the header dict from a message"""
+    subject = None
+    headers = {}
+    for name, value in msg.raw_items():
+        value = _header_text(value)
+        headers[name] = value
+        if subject is None and name.lower() == 'subject':
+            subject = value
+    return subject, headers
+
+
+def _decode_payload(part) -> str:
+    """Decode a part's payload using its declared charset"""
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ""
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='replace')
+    except LookupError:
+        return payload.decode('utf-8', errors='replace')
+
+
+def _get_body(msg) -> str:
+    """Extract email body from message"""
+    try:
+        if msg.is_multipart():
+            for part in msg.walk():
+                if part.get_content_type() == "text/plain":
+                    body = _decode_payload(part)
+                    if body:
+                        return body
+        else:
+            return _decode_payload(msg)
+    except Exception as e:
+        logger.warning(f"Error extracting email body: {e}")
+
+    return ""
+
+
+class MessageParserPool:
+    """Runs message parsing off the SMTP event loop"""
+
+    def __init__(self, mode: Optional[str] = None, workers: Optional[int] = None,
+                 headers_only: Optional[bool] = None):
+        self.mode = (mode or config.PARSE_WORKER_MODE).lower()
+        self.workers = workers or config.PARSE_WORKERS
+        self.headers_only = (config.LAZY_BODY_PARSING
+                             if headers_only is None else headers_only)
+        self.executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.total_parsed = 0
+
+    def start(self) -> None:
+        """Create the executor for the configured mode"""
+        if self.executor is not None or self.mode == 'inline':
+            return
+
+        if self.mode == 'process':
+            # Spawned workers do not inherit the controller thread or locks
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='mail-parser'
+            )
+
+        logger.info(
+            f"Message parser pool started ({self.mode}, {self.workers} workers)")
+
+    def stop(self) -> None:
+        """Shut down the executor"""
+        if self.executor is None:
+            return
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+        logger.info("Message parser pool stopped")
+
+    async def parse(self, data: bytes,
+                    headers_only: Optional[bool] = None) -> Dict[str, Any]:
+        """Parse message bytes, in the pool unless running inline"""
+        if headers_only is None:
+            headers_only = self.headers_only
+
+        self.in_flight += 1
+        try:
+            if self.mode == 'inline':
+                result = parse_message(data, headers_only)
+            else:
+                if self.executor is None:
+                    self.start()
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self.executor, parse_message, data, headers_only)
+
+            self.total_parsed += 1
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get parser pool statistics"""
+        return {
+            'mode': self.mode,
+            'workers': 0 if self.mode == 'inline' else self.workers,
+            'headers_only': self.headers_only,
+            'in_flight': self.in_flight,
+            'total_parsed': self.total_parsed
+        }
+
+
+# Global instance
+message_parser_pool = MessageParserPool()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Lightweight metrics primitives shared by the services
+"""
+
+import math
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Sequence
+
+
+# Default bucket upper bounds
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                      1000, 2500, 5000, 10000)
+DURATION_BUCKETS_S = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+SIZE_BUCKETS_BYTES = (1024, 4096, 16384, 65536, 262144, 1048576,
+                      4194304, 16777216, 67108864)
+
+
+class Histogram:
+    """Fixed-bucket histogram.
+
+    Observing is a bisect and two additions, so it is cheap enough for
+    per-command use; values above the last bound land in +Inf.
+    """
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one value"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def reset(self) -> None:
+        """Drop all observations"""
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, other: 'Histogram') -> None:
+        """Add the observations of a histogram with the same bounds"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def copy(self) -> 'Histogram':
+        """Independent histogram with the same observations"""
+        histogram = Histogram(self.bounds)
+        histogram.add(self)
+        return histogram
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get per-bucket counts (not cumulative) keyed by upper bound"""
+        buckets = {f'{bound:g}': count
+                   for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'buckets': buckets
+        }
+
+
+class LogHistogram:
+    """HDR-style histogram for streaming percentiles in fixed memory.
+
+    Bucket bounds grow geometrically by 2**(1/SUB_BUCKETS) (about 9%)
+    from min_value to max_value, so any percentile is reported within
+    that relative error however many values are observed.
+    """
+
+    SUB_BUCKETS = 8
+
+    __slots__ = ('min_value', 'counts', 'count', 'max')
+
+    def __init__(self, min_value: float = 0.01, max_value: float = 1e6):
+        self.min_value = min_value
+        size = math.ceil(math.log2(max_value / min_value) * self.SUB_BUCKETS) + 1
+        self.counts = [0] * size
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one value"""
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1,
+                        math.ceil(math.log2(value / self.min_value) * self.SUB_BUCKETS))
+        self.counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = self.min_value * 2 ** (index / self.SUB_BUCKETS)
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """Get count, p50, p95, p99 and max"""
+        return {
+            'count': self.count,
+            'p50': round(self.percentile(0.50), 3),
+            'p95': round(self.percentile(0.95), 3),
+            'p99': round(self.percentile(0.99), 3),
+            'max': round(self.max, 3)
+        }
+
+
+def _format_labels(labels: Optional[Dict[str, Any]]) -> str:
+    """Render a label set, escaping values as the text format requires"""
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        value = (str(value).replace('\\', '\\\\').replace('"', '\\"')
+                 .replace('\n', '\\n'))
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample exactly; :g keeps only 6 significant digits, so
+    large counters would stop moving between scrapes"""
+    if isinstance(value, int):
+        return str(int(value))
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class PrometheusWriter:
+    """Builds a scrape in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f'# HELP {name} {help_text}')
+            self.lines.append(f'# TYPE {name} {kind}')
+
+    def counter(self, name: str, value: float, help_text: str,
+                labels: Optional[Dict[str, Any]] = None) -> None:
+        """Add a counter sample (name should end in _total)"""
+        self._declare(name, 'counter', help_text)
+        self.lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    def gauge(self, name: str, value: float, help_text: str,
+              labels: Optional[Dict[str, Any]] = None) -> None:
+        """Add a gauge sample"""
+        self._declare(name, 'gauge', help_text)
+        self.lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    def histogram(self, name: str, histogram: Histogram, help_text: str,
+                  labels: Optional[Dict[str, Any]] = None, scale: float = 1.0) -> None:
+        """Add a histogram; scale converts its unit (0.001 for ms to seconds)"""
+        self._declare(name, 'histogram', help_text)
+        labels = labels or {}
+        # Read the counts once so buckets, count and sum agree
+        counts = list(histogram.counts)
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, counts):
+            cumulative += count
+            le = _format_labels({**labels, 'le': _format_value(bound * scale)})
+            self.lines.append(f'{name}_bucket{le} {cumulative}')
+        cumulative += counts[-1]
+        le = _format_labels({**labels, 'le': '+Inf'})
+        self.lines.append(f'{name}_bucket{le} {cumulative}')
+        rendered = _format_labels(labels)
+        self.lines.append(
+            f'{name}_sum{rendered} {_format_value(histogram.sum * scale)}')
+        self.lines.append(f'{name}_count{rendered} {cumulative}')
+
+    def render(self) -> str:
+        """Get the scrape body"""
+        return '\n'.join(self.lines) + '\n'
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+On-demand profiling: cProfile captures, tracemalloc snapshots and stack dumps
+"""
+
+import asyncio
+import concurrent.futures
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import tracemalloc
+from typing import Dict, Any, List, Optional
+
+from .smtp_server import smtp_service
+
+
+logger = logging.getLogger(__name__)
+
+# Allocation noise from the import system and tracemalloc itself
+TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+)
+
+
+# From 3.12 cProfile is built on sys.monitoring: one profiler per
+# interpreter, and it sees every thread
+PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class ProfilingError(Exception):
+    """A profiling action cannot run in the current state"""
+
+
+class ProfilingService:
+    """Profiles the running server without restarting or attaching to it.
+
+    Before Python 3.12 cProfile only sees the thread it was enabled on,
+    so a capture runs one profiler on the API event loop and one on each
+    SMTP controller loop, and merges them; from 3.12 a single profiler
+    covers all threads, parser pool threads included. SMTP worker
+    processes are never included.
+    """
+
+    def __init__(self):
+        self._profiling = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self.total_profiles = 0
+        self.total_snapshots = 0
+
+    def _smtp_loops(self) -> List[asyncio.AbstractEventLoop]:
+        """Event loops of running SMTP/LMTP controller threads"""
+        loops = []
+        for controller in (smtp_service.controller, smtp_service.lmtp_controller):
+            loop = getattr(controller, 'loop', None)
+            if loop is not None and loop.is_running():
+                loops.append(loop)
+        return loops
+
+    async def profile(self, seconds: float) -> pstats.Stats:
+        """Profile the API loop and SMTP controller loops for seconds"""
+        if self._profiling:
+            raise ProfilingError("A profile is already being captured")
+        self._profiling = True
+
+        # (loop, profiler) pairs; None is the API loop, this thread
+        profilers = [(None, cProfile.Profile())]
+        if not PROFILER_SEES_ALL_THREADS:
+            profilers += [(loop, cProfile.Profile()) for loop in self._smtp_loops()]
+
+        enabled = []
+        try:
+            for loop, profile in profilers:
+                # Recorded first: a timed out enable may still run later
+                enabled.append((loop, profile))
+                try:
+                    await _on_loop(loop, profile.enable)
+                except ValueError as e:
+                    raise ProfilingError(f"Cannot start profiling: {e}")
+            await asyncio.sleep(seconds)
+        finally:
+            # Disabling a profiler that never started is harmless
+            for loop, profile in reversed(enabled):
+                try:
+                    await _on_loop(loop, profile.disable)
+                except Exception as e:
+                    logger.error(f"Failed to stop profiler: {e}")
+            self._profiling = False
+
+        stats = pstats.Stats(profilers[0][1], stream=io.StringIO())
+        for _, profile in profilers[1:]:
+            stats.add(profile)
+        self.total_profiles += 1
+        logger.info(f"Captured {seconds}s profile with {len(profilers)} profiler(s)")
+        return stats
+
+    @staticmethod
+    def dump_stats(stats: pstats.Stats) -> bytes:
+        """Stats in the binary format read by pstats and snakeviz"""
+        return marshal.dumps(stats.stats)
+
+    @staticmethod
+    def format_stats(stats: pstats.Stats, sort: str = 'cumulative',
+                     limit: int = 100) -> str:
+        """Stats as a sorted text report"""
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def start_tracemalloc(self, frames: int = 10) -> Dict[str, Any]:
+        """Start tracing allocations"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._baseline = None
+            logger.info(f"tracemalloc started ({frames} frames)")
+        return self.get_tracemalloc_status()
+
+    def stop_tracemalloc(self) -> Dict[str, Any]:
+        """Stop tracing allocations and drop the baseline snapshot"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        self._baseline = None
+        return self.get_tracemalloc_status()
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        """Take a snapshot; it becomes the baseline of the next diff"""
+        if not tracemalloc.is_tracing():
+            raise ProfilingError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+        self.total_snapshots += 1
+        return snapshot
+
+    def snapshot_report(self, key_type: str = 'lineno', limit: int = 50) -> str:
+        """Top allocations, as a diff against the previous snapshot if any"""
+        snapshot = self.take_snapshot()
+        baseline, self._baseline = self._baseline, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [f"Traced memory: current {current} B, peak {peak} B"]
+        if baseline is None:
+            lines.append(f"Top {limit} allocations by {key_type}:")
+            statistics = snapshot.statistics(key_type)
+        else:
+            lines.append(
+                f"Top {limit} changes since the previous snapshot by {key_type}:")
+            statistics = snapshot.compare_to(baseline, key_type)
+        lines.extend(str(stat) for stat in statistics[:limit])
+        return '\n'.join(lines) + '\n'
+
+    def snapshot_dump(self) -> bytes:
+        """A snapshot in the format read by tracemalloc.Snapshot.load"""
+        snapshot = self.take_snapshot()
+        self._baseline = snapshot
+        fd, path = tempfile.mkstemp(suffix='.tracemalloc')
+        try:
+            os.close(fd)
+            snapshot.dump(path)
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+    def dump_stacks(self) -> str:
+        """Current stacks of all threads and of the tasks on each event loop"""
+        out = io.StringIO()
+        frames = sys._current_frames()
+        out.write(f"Stacks at {time.strftime('%Y-%m-%dT%H:%M:%S')}\n")
+
+        for thread in threading.enumerate():
+            frame = frames.get(thread.ident)
+            if frame is None:
+                continue
+            out.write(f"\nThread {thread.name} (ident {thread.ident}"
+                      f"{', daemon' if thread.daemon else ''}):\n")
+            out.writelines(traceback.format_stack(frame))
+
+        loops = [('API', asyncio.get_running_loop())]
+        loops += [('SMTP', loop) for loop in self._smtp_loops()]
+        for name, loop in loops:
+            tasks = asyncio.all_tasks(loop)
+            out.write(f"\n{name} event loop: {len(tasks)} task(s)\n")
+            for task in tasks:
+                task.print_stack(file=out)
+        return out.getvalue()
+
+    def get_tracemalloc_status(self) -> Dict[str, Any]:
+        """Get tracemalloc state"""
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else 0,
+            'traced_bytes': current,
+            'peak_bytes': peak,
+            'has_baseline': self._baseline is not None
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get profiling status"""
+        return {
+            'profiling': self._profiling,
+            'total_profiles': self.total_profiles,
+            'total_snapshots': self.total_snapshots,
+            'tracemalloc': self.get_tracemalloc_status()
+        }
+
+
+async def _on_loop(loop: Optional[asyncio.AbstractEventLoop], fn) -> None:
+    """Run fn on another thread's event loop and wait for it, or right
+    here when loop is None"""
+    if loop is None:
+        fn()
+        return
+
+    done: concurrent.futures.Future = concurrent.futures.Future()
+
+    def call():
+        try:
+            done.set_result(fn())
+        except BaseException as e:
+            done.set_exception(e)
+
+    loop.call_soon_threadsafe(call)
+    await asyncio.wait_for(asyncio.wrap_future(done), timeout=5)
+
+
+# Global instance
+profiling_service = ProfilingService()
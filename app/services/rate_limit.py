@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Per-client SMTP rate limiting with token buckets
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..config import config
+
+
+# Seconds between sweeps for idle buckets
+PRUNE_INTERVAL = 60
+
+# Temporary failure; RFC 3463 4.7.1 "delivery not authorized"
+RATE_LIMIT_REPLY = '451 4.7.1 Rate limit exceeded, try again later'
+
+
+class TokenBucketTable:
+    """Token buckets keyed by client.
+
+    Each bucket is a (tokens, updated) tuple. A bucket that has refilled
+    to its burst behaves exactly like a missing one, so such buckets are
+    dropped by a sweep every PRUNE_INTERVAL seconds. Over max_buckets,
+    each new client evicts only the least recently used bucket, so a
+    flood of new keys costs O(1) per key rather than a sweep each.
+    """
+
+    def __init__(self, rate: float, burst: float, max_buckets: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL
+        self.total_limited = 0
+
+    def _tokens(self, key: str, now: float) -> float:
+        """Current tokens of a bucket; the caller holds the lock"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        tokens, updated = bucket
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def has_tokens(self, key: str, cost: float = 1) -> bool:
+        """Check whether a request would be allowed, without consuming"""
+        with self._lock:
+            return self._tokens(key, time.monotonic()) >= cost
+
+    def consume(self, key: str, cost: float = 1) -> bool:
+        """Take tokens from a bucket if it has enough"""
+        now = time.monotonic()
+
+        with self._lock:
+            tokens = self._tokens(key, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+
+            # Order stays least recently used first
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            if now >= self._next_prune:
+                self._prune(now)
+
+            return allowed
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have refilled"""
+        self._next_prune = now + PRUNE_INTERVAL
+        full = [key for key in self._buckets if self._tokens(key, now) >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+    def get_status(self, top: int = 10) -> Dict[str, Any]:
+        """Get table size and the most depleted clients"""
+        now = time.monotonic()
+        with self._lock:
+            levels = sorted((self._tokens(key, now), key) for key in self._buckets)
+
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'buckets': len(levels),
+            'total_limited': self.total_limited,
+            'most_depleted': [{'client': key, 'tokens': round(tokens, 2)}
+                              for tokens, key in levels[:top]]
+        }
+
+
+class RateLimiter:
+    """Per-peer-IP and per-sender limits on deliveries (one per recipient)"""
+
+    def __init__(self):
+        self.peers = TokenBucketTable(
+            config.RATE_LIMIT_PEER_PER_SECOND, config.RATE_LIMIT_PEER_BURST,
+            config.RATE_LIMIT_MAX_BUCKETS)
+        self.senders = TokenBucketTable(
+            config.RATE_LIMIT_SENDER_PER_SECOND, config.RATE_LIMIT_SENDER_BURST,
+            config.RATE_LIMIT_MAX_BUCKETS)
+
+    def _tables(self, peer: Optional[str],
+                sender: Optional[str]) -> List[Tuple[TokenBucketTable, str]]:
+        """Buckets that apply to a transaction"""
+        tables = []
+        if peer:
+            tables.append((self.peers, peer))
+        if sender:
+            tables.append((self.senders, sender.lower()))
+        return tables
+
+    def check_mail(self, peer: Optional[str], sender: Optional[str]) -> bool:
+        """At MAIL: refuse early if the client has no tokens left"""
+        return self._admit(peer, sender, consume=False)
+
+    def consume_rcpt(self, peer: Optional[str], sender: Optional[str]) -> bool:
+        """At RCPT: charge one delivery to the peer and the sender"""
+        return self._admit(peer, sender, consume=True)
+
+    def _admit(self, peer: Optional[str], sender: Optional[str], consume: bool) -> bool:
+        """Allow a command only if every applicable bucket has a token"""
+        if not config.RATE_LIMIT_ENABLED:
+            return True
+
+        tables = self._tables(peer, sender)
+        limited = [table for table, key in tables if not table.has_tokens(key)]
+        for table in limited:
+            table.total_limited += 1
+        if limited:
+            return False
+
+        if consume:
+            for table, key in tables:
+                table.consume(key)
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get limiter state"""
+        return {
+            'enabled': config.RATE_LIMIT_ENABLED,
+            'peers': self.peers.get_status(),
+            'senders': self.senders.get_status()
+        }
@@ -3,132 +3,500 @@
 SMTP server service using aiosmtpd
 """
 
+import asyncio
 import logging
+import os
+import socket
+import time
 from datetime import datetime
-from email.parser import Parser
-from aiosmtpd.controller import Controller
-from typing import Optional, Dict, Any
+from aiosmtpd.controller import Controller, UnixSocketController
+from aiosmtpd.lmtp import LMTP
+from aiosmtpd.smtp import MISSING, SMTP, syntax
+from typing import Optional, Dict, Any, List
 
 from ..config import config
+from .message_parser import MessageParserPool, message_parser_pool
+from .metrics import (Histogram, DURATION_BUCKETS_S, LATENCY_BUCKETS_MS,
+                      SIZE_BUCKETS_BYTES)
+from .backpressure import BACKPRESSURE_REPLY, backpressure_monitor
+from .dedupe import DuplicateFilter, message_key
+from .domains import DomainMatcher
 from .email_storage import email_storage_service
+from .ids import id_generator
+from .ingest import IngestQueue, ingest_queue
+from .rate_limit import RATE_LIMIT_REPLY, RateLimiter
+from .spool import message_spool
 
 
 logger = logging.getLogger(__name__)
 
+# Resolved once; aiosmtpd would otherwise call getfqdn() per connection
+_server_hostname: Optional[str] = None
+
+
+# Why a command was refused, for the rejection counters
+REJECT_REASONS = ('recipient', 'backpressure', 'rate_limit', 'error')
+
+# BDAT chunks that are refused are read and dropped this much at a time
+DISCARD_READ_SIZE = 64 * 1024
+
+
+def _peer_host(session) -> Optional[str]:
+    """Client IP of a session (None for Unix socket peers)"""
+    peer = getattr(session, 'peer', None)
+    return peer[0] if isinstance(peer, tuple) and peer else None
+
 
 class CustomSMTPHandler:
     """SMTP message handler using aiosmtpd"""
 
-    def __init__(self):
+    def __init__(self, parser_pool: Optional[MessageParserPool] = None,
+                 ingest: Optional[IngestQueue] = None):
         self.connection_count = 0
+        self.total_sessions = 0
         self.total_emails_received = 0
+        self.parser_pool = parser_pool or message_parser_pool
+        self.ingest = ingest or ingest_queue
+        self.domains = DomainMatcher.from_config()
+        self.duplicates = DuplicateFilter()
+        self.rate_limiter = RateLimiter()
+
+        # Capacity metrics
+        self.session_duration = Histogram(DURATION_BUCKETS_S)
+        self.command_latency = {
+            command: Histogram(LATENCY_BUCKETS_MS)
+            for command in ('MAIL', 'RCPT', 'DATA')
+        }
+        self.message_size = Histogram(SIZE_BUCKETS_BYTES)
+        # Refused commands by reason
+        self.rejected = dict.fromkeys(REJECT_REASONS, 0)
+        # Latest counters published by SMTP worker processes, by worker id
+        self.worker_counters: Dict[int, Dict[str, Any]] = {}
+
+    def session_opened(self) -> None:
+        """Called by the protocol when a client connects"""
+        self.connection_count += 1
+        self.total_sessions += 1
+
+    def session_closed(self, duration: float) -> None:
+        """Called by the protocol when a client disconnects"""
+        self.connection_count -= 1
+        self.session_duration.observe(duration)
+
+    def _observe_latency(self, command: str, start: float) -> None:
+        """Record how long a command hook took, in milliseconds"""
+        self.command_latency[command].observe(
+            (time.perf_counter() - start) * 1000)
 
     async def handle_DATA(self, server, session, envelope):
         """Handle incoming email data"""
+        start = time.perf_counter()
+        # LMTP answers DATA once per recipient (RFC 2033)
+        lmtp = isinstance(server, LMTP)
+        rcpttos = envelope.rcpt_tos
         try:
             peer = session.peer
             mailfrom = envelope.mail_from
-            rcpttos = envelope.rcpt_tos
             data = envelope.content  # bytes
+            self.message_size.observe(len(data))
+
+            if not backpressure_monitor.admit(self._in_flight()):
+                self.rejected['backpressure'] += 1
+                return self._reply_all(lmtp, rcpttos, BACKPRESSURE_REPLY)
 
             logger.info(
                 f"Received email from {mailfrom} to {rcpttos} from {peer}")
 
-            # Parse email
-            parser = Parser()
-            msg = parser.parsestr(data.decode('utf-8', errors='ignore'))
+            # Oversized payloads go to disk; only their headers are parsed
+            spill = message_spool.should_spill(len(data))
+
+            # Parse email off the event loop
+            parsed = await self.parser_pool.parse(
+                data, headers_only=True if spill else None)
+            payload = await self._spool_payload(data) if spill else data
 
-            # Process each recipient
+            # Process each recipient, noting the outcome in RCPT order
             timestamp = datetime.now()
-            processed_count = 0
+            emails = []
+            keys: List[Optional[str]] = []
+            outcomes = []
 
             for rcpt in rcpttos:
-                if self._is_valid_recipient(rcpt):
-                    email_data = self._create_email_data(
-                        mailfrom, rcpt, msg, data, timestamp
-                    )
-
-                    if email_storage_service.add_email(email_data):
-                        processed_count += 1
-                        logger.debug(f"Stored email for {rcpt}")
-                    else:
-                        logger.error(f"Failed to store email for {rcpt}")
-                else:
+                key = self._dedupe_key(rcpt, parsed, data)
+                if not self._is_valid_recipient(rcpt):
                     logger.info(f"Ignoring email for {rcpt} - not our domain")
+                    outcomes.append('invalid')
+                elif key is not None and (key in keys
+                                          or self.duplicates.contains(key)):
+                    logger.info(f"Skipping duplicate email for {rcpt}")
+                    outcomes.append('duplicate')
+                else:
+                    emails.append(self._create_email_data(
+                        mailfrom, rcpt, parsed, payload, timestamp
+                    ))
+                    keys.append(key)
+                    outcomes.append('store')
+
+            results = await self._store_emails(emails) if emails else []
+            # Only stored emails count as seen, so a failed one can be retried
+            for key, stored in zip(keys, results):
+                if key is not None and stored:
+                    self.duplicates.record(key)
+            processed_count = sum(results)
+            if processed_count < len(emails):
+                logger.error(f"Failed to store {len(emails) - processed_count} "
+                             f"of {len(emails)} emails")
+            else:
+                logger.debug(f"Stored {processed_count} emails")
 
             self.total_emails_received += processed_count
 
-            if processed_count > 0:
+            if lmtp:
+                return self._lmtp_replies(rcpttos, outcomes, results)
+            # Duplicates are accepted so the sender stops retrying
+            if processed_count > 0 or 'duplicate' in outcomes:
                 return '250 OK'
             else:
+                self.rejected['recipient'] += 1
                 return '550 No valid recipients in domain'
 
         except Exception as e:
             logger.error(f"Error processing email: {e}")
-            return '451 Requested action aborted: local error in processing'
+            self.rejected['error'] += 1
+            return self._reply_all(lmtp, rcpttos, '451 Requested action aborted: '
+                                   'local error in processing')
+        finally:
+            self._observe_latency('DATA', start)
+
+    @staticmethod
+    def _reply_all(lmtp: bool, rcpttos: List[str], status: str) -> str:
+        """Give every LMTP recipient the same status"""
+        if lmtp and rcpttos:
+            return '\r\n'.join([status] * len(rcpttos))
+        return status
+
+    def _lmtp_replies(self, rcpttos: List[str], outcomes: List[str],
+                      results: List[bool]) -> str:
+        """Build one LMTP status line per recipient, in RCPT order"""
+        stored = iter(results)
+        replies = []
+        for rcpt, outcome in zip(rcpttos, outcomes):
+            if outcome == 'invalid':
+                replies.append(f'550 5.1.1 <{rcpt}> No such user here')
+            elif outcome == 'duplicate' or next(stored):
+                replies.append(f'250 2.1.5 <{rcpt}> OK')
+            else:
+                replies.append(f'451 4.3.0 <{rcpt}> Requested action aborted: '
+                               'local error in processing')
+        return '\r\n'.join(replies)
+
+    async def _spool_payload(self, data: bytes):
+        """Write an oversized payload to disk without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, message_spool.spill, data)
+
+    async def _store_emails(self, emails: List[Dict[str, Any]]) -> List[bool]:
+        """Hand the emails of one message to the ingest queue"""
+        return await self.ingest.submit(emails)
+
+    @staticmethod
+    def _dedupe_key(rcpt: str, parsed: Dict[str, Any], data: bytes) -> Optional[str]:
+        """Duplicate filter key of this message for a recipient, if enabled"""
+        if not config.DEDUPE_ENABLED:
+            return None
+        return message_key(rcpt, parsed['headers'], data)
+
+    def _in_flight(self) -> int:
+        """Messages accepted but not yet stored"""
+        return self.parser_pool.in_flight + self.ingest.pending
 
     def _is_valid_recipient(self, recipient: str) -> bool:
-        """Check if recipient is valid for our domain"""
-        return recipient.lower().endswith(f'@{config.DOMAIN.lower()}')
-
-    def _create_email_data(self, mailfrom: str, rcpt: str, msg, data: bytes, timestamp: datetime) -> Dict[str, Any]:
-        """Create email data structure"""
-        return {
-            'id': f"{timestamp.timestamp()}_{hash(data)}",
+        """Check if recipient is valid for one of our domains"""
+        return self.domains.accepts(recipient)
+
+    def _create_email_data(self, mailfrom: str, rcpt: str, parsed: Dict[str, Any],
+                           data, timestamp: datetime) -> Dict[str, Any]:
+        """Create email data structure (data is bytes or a SpooledPayload)"""
+        email_data = {
+            'id': id_generator.next_id(),
             'from': mailfrom,
             'to': rcpt,
-            'subject': msg.get('Subject', 'No Subject'),
-            'body': self._get_body(msg),
-            'headers': dict(msg.items()),
+            'subject': parsed['subject'],
+            'body': parsed['body'],
+            'headers': parsed['headers'],
             'received': timestamp.isoformat(),
             'timestamp': timestamp.timestamp()
         }
 
-    def _get_body(self, msg) -> str:
-        """Extract email body from message"""
-        try:
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            return payload.decode('utf-8', errors='ignore')
-            else:
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    return payload.decode('utf-8', errors='ignore')
-        except Exception as e:
-            logger.warning(f"Error extracting email body: {e}")
+        # Headers-only parse: keep the raw payload, body is extracted on read
+        if parsed['body'] is None:
+            email_data['raw'] = data
 
-        return ""
+        return email_data
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        """Handle EHLO command, advertising the extensions we support"""
+        session.host_name = hostname
+
+        extensions = []
+        if config.SMTP_PIPELINING:
+            extensions.append('250-PIPELINING')
+        if config.SMTP_CHUNKING and hasattr(server, 'smtp_BDAT'):
+            extensions.append('250-CHUNKING')
+
+        # Keep the final '250 HELP' line last
+        return responses[:-1] + extensions + responses[-1:]
 
     async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
         """Handle RCPT TO command"""
-        if self._is_valid_recipient(address):
-            envelope.rcpt_tos.append(address)
-            return '250 OK'
-        else:
-            return '550 No such user here'
+        start = time.perf_counter()
+        try:
+            if not backpressure_monitor.admit(self._in_flight()):
+                self.rejected['backpressure'] += 1
+                return BACKPRESSURE_REPLY
+
+            if not self.rate_limiter.consume_rcpt(
+                    _peer_host(session), envelope.mail_from):
+                self.rejected['rate_limit'] += 1
+                return RATE_LIMIT_REPLY
+
+            if self._is_valid_recipient(address):
+                envelope.rcpt_tos.append(address)
+                return '250 OK'
+            else:
+                self.rejected['recipient'] += 1
+                return '550 No such user here'
+        finally:
+            self._observe_latency('RCPT', start)
 
     async def handle_MAIL(self, server, session, envelope, address, mail_options):
         """Handle MAIL FROM command"""
-        envelope.mail_from = address
-        return '250 OK'
+        start = time.perf_counter()
+        try:
+            if not self.rate_limiter.check_mail(_peer_host(session), address):
+                self.rejected['rate_limit'] += 1
+                return RATE_LIMIT_REPLY
+
+            envelope.mail_from = address
+            return '250 OK'
+        finally:
+            self._observe_latency('MAIL', start)
+
+    def counters(self) -> Dict[str, Any]:
+        """Connection, session and command counters, with the latest ones
+        published by SMTP worker processes added in"""
+        counters = {
+            'connection_count': self.connection_count,
+            'total_sessions': self.total_sessions,
+            'rejected': dict(self.rejected),
+            'session_duration': self.session_duration.copy(),
+            'command_latency': {command: histogram.copy()
+                                for command, histogram in self.command_latency.items()},
+            'message_size': self.message_size.copy()
+        }
+        for worker in list(self.worker_counters.values()):
+            counters['connection_count'] += worker['connection_count']
+            counters['total_sessions'] += worker['total_sessions']
+            for reason, count in worker['rejected'].items():
+                counters['rejected'][reason] += count
+            counters['session_duration'].add(worker['session_duration'])
+            for command, histogram in worker['command_latency'].items():
+                counters['command_latency'][command].add(histogram)
+            counters['message_size'].add(worker['message_size'])
+        return counters
+
+    def retire_workers(self) -> None:
+        """Fold the last counters of stopped worker processes into this
+        handler's, so totals do not drop when the workers are restarted"""
+        for worker in self.worker_counters.values():
+            self.total_sessions += worker['total_sessions']
+            for reason, count in worker['rejected'].items():
+                self.rejected[reason] += count
+            self.session_duration.add(worker['session_duration'])
+            for command, histogram in worker['command_latency'].items():
+                self.command_latency[command].add(histogram)
+            self.message_size.add(worker['message_size'])
+        self.worker_counters.clear()
 
     def get_stats(self) -> Dict[str, Any]:
-        """Get SMTP handler statistics"""
+        """Get SMTP handler statistics, SMTP worker processes included"""
+        counters = self.counters()
         return {
             'total_emails_received': self.total_emails_received,
-            'connection_count': self.connection_count
+            'rejected': counters['rejected'],
+            'connection_count': counters['connection_count'],
+            'total_sessions': counters['total_sessions'],
+            'session_duration_seconds': counters['session_duration'].snapshot(),
+            'command_latency_ms': {
+                command: histogram.snapshot()
+                for command, histogram in counters['command_latency'].items()
+            },
+            'message_size_bytes': counters['message_size'].snapshot(),
+            'max_message_size': config.MAX_MESSAGE_SIZE,
+            'parser': self.parser_pool.get_stats(),
+            'ingest': self.ingest.get_stats(),
+            'dedupe': self.duplicates.get_stats(),
+            'rate_limit': self.rate_limiter.get_status(),
+            'spool': message_spool.get_stats()
         }
 
 
+class MailServerSMTP(SMTP):
+    """aiosmtpd SMTP protocol with CHUNKING (BDAT, RFC 3030) support and
+    session tracking"""
+
+    def __init__(self, handler, **kwargs):
+        super().__init__(handler, **kwargs)
+        self._bdat_chunks: List[bytes] = []
+        self._bdat_size = 0
+        self._bdat_failed = False
+        self._session_start: Optional[float] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        if self._session_start is None:
+            self._session_start = time.perf_counter()
+            self.event_handler.session_opened()
+        super().connection_made(transport)
+
+    def connection_lost(self, error: Optional[Exception]) -> None:
+        if self._session_start is not None:
+            self.event_handler.session_closed(
+                time.perf_counter() - self._session_start)
+            self._session_start = None
+        super().connection_lost(error)
+
+    def _set_post_data_state(self):
+        """Reset the envelope and any pending BDAT chunks"""
+        super()._set_post_data_state()
+        self._bdat_chunks = []
+        self._bdat_size = 0
+        self._bdat_failed = False
+
+    @syntax('BDAT chunk-size [LAST]')
+    async def smtp_BDAT(self, arg: Optional[str]) -> None:
+        if not config.SMTP_CHUNKING:
+            await self.push('502 Error: command "BDAT" not implemented')
+            return
+        if await self.check_helo_needed('EHLO'):
+            return
+        if await self.check_auth_needed('BDAT'):
+            return
+
+        parts = arg.split() if arg else []
+        last = len(parts) == 2 and parts[1].upper() == 'LAST'
+        valid = parts and parts[0].isdigit() and (len(parts) == 1 or last)
+        if not valid:
+            await self.push('501 Syntax: BDAT chunk-size [LAST]')
+            return
+        size = int(parts[0])
+
+        # The chunk follows the command immediately, so it has to be read
+        # even when the transaction is going to be refused; refused chunks
+        # are discarded as they arrive, never held in memory
+        assert self.envelope is not None
+        if not self.envelope.rcpt_tos:
+            if not await self._discard(size):
+                return
+            self._set_post_data_state()
+            await self.push('503 Error: need RCPT command')
+            return
+
+        too_big = (self.data_size_limit
+                   and self._bdat_size + size > self.data_size_limit)
+        if self._bdat_failed or too_big:
+            if not await self._discard(size):
+                return
+            # Drop what we have; the rest of the transaction fails too
+            self._bdat_failed = True
+            self._bdat_chunks = []
+            if last:
+                self._set_post_data_state()
+            await self.push('552 Error: Too much mail data')
+            return
+
+        try:
+            chunk = await self._reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            return
+
+        self._bdat_size += size
+        if size:
+            self._bdat_chunks.append(chunk)
+        if not last:
+            await self.push(f'250 {size} octets received')
+            return
+
+        # Single-chunk messages are used as-is; others are joined once
+        chunks = self._bdat_chunks
+        content = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        self.envelope.content = content
+        self.envelope.original_content = content
+
+        status = await self._call_handler_hook('DATA')
+        self._set_post_data_state()
+        await self.push('250 OK' if status is MISSING else status)
+
+    async def _discard(self, size: int) -> bool:
+        """Read and drop size bytes in bounded reads; False if the client
+        disconnected first"""
+        while size > 0:
+            data = await self._reader.read(min(size, DISCARD_READ_SIZE))
+            if not data:
+                return False
+            size -= len(data)
+        return True
+
+    async def smtp_DATA(self, arg: str) -> None:
+        if self._bdat_chunks or self._bdat_failed:
+            await self.push('503 Error: DATA not allowed after BDAT')
+            return
+        await super().smtp_DATA(arg)
+
+
+class MailServerLMTP(LMTP, MailServerSMTP):
+    """LMTP (RFC 2033) variant: LHLO instead of HELO/EHLO and one DATA
+    reply per recipient, with the same extensions and tracking"""
+
+
+def create_smtp_protocol(handler: CustomSMTPHandler, lmtp: bool = False) -> SMTP:
+    """Create the SMTP (or LMTP) protocol instance for one connection"""
+    global _server_hostname
+    if _server_hostname is None:
+        _server_hostname = socket.getfqdn()
+
+    protocol_class = MailServerLMTP if lmtp else MailServerSMTP
+    return protocol_class(
+        handler,
+        hostname=_server_hostname,
+        enable_SMTPUTF8=True,
+        data_size_limit=config.MAX_MESSAGE_SIZE
+    )
+
+
+class SMTPController(Controller):
+    """Threaded controller building connections with create_smtp_protocol"""
+
+    def factory(self):
+        return create_smtp_protocol(self.handler)
+
+
+class LMTPController(UnixSocketController):
+    """Threaded controller serving LMTP on a Unix socket"""
+
+    def factory(self):
+        return create_smtp_protocol(self.handler, lmtp=True)
+
+
 class SMTPService:
     """SMTP server service"""
 
     def __init__(self):
         self.handler = CustomSMTPHandler()
         self.controller: Optional[Controller] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.lmtp_controller: Optional[UnixSocketController] = None
+        self.lmtp_server: Optional[asyncio.AbstractServer] = None
+        self.worker_pool = None
         self.is_running = False
 
     def start(self) -> bool:
@@ -138,17 +506,70 @@ class SMTPService:
                 logger.warning("SMTP server is already running")
                 return True
 
-            self.controller = Controller(
-                self.handler,
-                hostname=config.HOST,
+            if config.SMTP_WORKERS > 0:
+                from .smtp_workers import SMTPWorkerPool
+
+                self.worker_pool = SMTPWorkerPool(
+                    self.handler, config.SMTP_WORKERS)
+                self.worker_pool.start()
+            else:
+                self.handler.parser_pool.start()
+
+                self.controller = SMTPController(
+                    self.handler,
+                    hostname=config.HOST,
+                    port=config.SMTP_PORT
+                )
+
+                self.controller.start()
+
+            if config.LMTP_SOCKET:
+                self.lmtp_controller = LMTPController(
+                    self.handler, unix_socket=config.LMTP_SOCKET)
+                self.lmtp_controller.start()
+                logger.info(f"LMTP server started on {config.LMTP_SOCKET}")
+
+            self.is_running = True
+
+            logger.info(
+                f"SMTP server started on {config.HOST}:{config.SMTP_PORT}"
+                f" ({config.SMTP_WORKERS or 'no'} worker processes)")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to start SMTP server: {e}")
+            return False
+
+    async def start_on_loop(self) -> bool:
+        """Start SMTP server on the running event loop instead of a thread"""
+        try:
+            if self.is_running:
+                logger.warning("SMTP server is already running")
+                return True
+
+            self.handler.parser_pool.start()
+
+            loop = asyncio.get_running_loop()
+            self.server = await loop.create_server(
+                lambda: create_smtp_protocol(self.handler),
+                host=config.HOST,
                 port=config.SMTP_PORT
             )
 
-            self.controller.start()
+            if config.LMTP_SOCKET:
+                self.lmtp_server = await loop.create_unix_server(
+                    lambda: create_smtp_protocol(self.handler, lmtp=True),
+                    path=config.LMTP_SOCKET
+                )
+                logger.info(f"LMTP server started on {config.LMTP_SOCKET}")
+
+            # Storage is now only touched from this loop
+            email_storage_service.set_single_loop(True)
             self.is_running = True
 
             logger.info(
-                f"SMTP server started on {config.HOST}:{config.SMTP_PORT}")
+                f"SMTP server started on {config.HOST}:{config.SMTP_PORT}"
+                f" (application event loop)")
             return True
 
         except Exception as e:
@@ -158,11 +579,31 @@ class SMTPService:
     def stop(self) -> bool:
         """Stop SMTP server"""
         try:
-            if not self.is_running or not self.controller:
+            if not self.is_running:
                 logger.warning("SMTP server is not running")
                 return True
 
-            self.controller.stop()
+            if self.lmtp_controller:
+                self.lmtp_controller.stop()
+                self.lmtp_controller = None
+            if self.lmtp_server:
+                self.lmtp_server.close()
+                self.lmtp_server = None
+            if config.LMTP_SOCKET and os.path.exists(config.LMTP_SOCKET):
+                os.unlink(config.LMTP_SOCKET)
+
+            if self.worker_pool:
+                self.worker_pool.stop()
+                self.worker_pool = None
+            if self.controller:
+                self.controller.stop()
+                self.controller = None
+                self.handler.parser_pool.stop()
+            if self.server:
+                self.server.close()
+                self.server = None
+                self.handler.parser_pool.stop()
+                email_storage_service.set_single_loop(False)
             self.is_running = False
 
             logger.info("SMTP server stopped")
@@ -181,9 +622,23 @@ class SMTPService:
             'host': config.HOST,
             'port': config.SMTP_PORT,
             'domain': config.DOMAIN,
-            **stats
+            'run_mode': config.SMTP_RUN_MODE,
+            'lmtp_socket': config.LMTP_SOCKET,
+            'domains': self.handler.domains.patterns,
+            'extensions': self.get_extensions(),
+            **stats,
+            'workers': self.worker_pool.get_stats() if self.worker_pool else None
         }
 
+    def get_extensions(self) -> List[str]:
+        """ESMTP extensions advertised on top of aiosmtpd's defaults"""
+        extensions = []
+        if config.SMTP_PIPELINING:
+            extensions.append('PIPELINING')
+        if config.SMTP_CHUNKING:
+            extensions.append('CHUNKING')
+        return extensions
+
     def restart(self) -> bool:
         """Restart SMTP server"""
         logger.info("Restarting SMTP server...")
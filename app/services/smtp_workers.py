@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Multi-process SMTP ingest: N worker processes share the SMTP port via
+SO_REUSEPORT and forward parsed emails to the process owning the store
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.process
+import multiprocessing.queues
+import multiprocessing.synchronize
+import queue
+import socket
+import threading
+from typing import Optional, Dict, Any, List
+
+from ..config import config
+from .backpressure import backpressure_monitor
+from .message_parser import MessageParserPool
+from .email_storage import email_storage_service
+from .ids import MAX_NODE_ID, id_generator
+from .smtp_server import CustomSMTPHandler, create_smtp_protocol
+from .spool import message_spool
+
+
+logger = logging.getLogger(__name__)
+
+# Emails moved from the forward queue into storage per drain iteration
+DRAIN_BATCH_SIZE = 256
+
+# How often the drain thread publishes storage size to idle workers
+STORAGE_PUBLISH_SECONDS = 1.0
+
+# How often workers publish their handler counters to the owning process
+COUNTERS_PUBLISH_SECONDS = 1.0
+
+
+class ForwardingSMTPHandler(CustomSMTPHandler):
+    """SMTP handler for worker processes that forwards instead of storing"""
+
+    def __init__(self, forward_queue):
+        # Workers are already separate processes, so parse inline
+        super().__init__(parser_pool=MessageParserPool(mode='inline'))
+        self.forward_queue = forward_queue
+
+    async def _spool_payload(self, data: bytes):
+        """Forward raw bytes; the owning process spools them on drain"""
+        return data
+
+    async def _store_emails(self, emails: List[Dict[str, Any]]) -> List[bool]:
+        """Send the emails to the owning process"""
+        for email_data in emails:
+            self.forward_queue.put(email_data)
+        return [True] * len(emails)
+
+
+class WorkerCounters:
+    """A worker's handler counters, sent over the forward queue so the
+    owning process can report connections, sessions and latency"""
+
+    def __init__(self, worker_id: int, counters: Dict[str, Any]):
+        self.worker_id = worker_id
+        self.counters = counters
+
+
+async def _publish_counters(worker_id: int, handler: CustomSMTPHandler,
+                            forward_queue) -> None:
+    """Send the handler counters to the owning process periodically"""
+    while True:
+        await asyncio.sleep(COUNTERS_PUBLISH_SECONDS)
+        forward_queue.put(WorkerCounters(worker_id, handler.counters()))
+
+
+class SharedStorageBytes:
+    """Stands in for storage in a worker's backpressure monitor, reading
+    the memory_bytes the owning process publishes"""
+
+    def __init__(self, value):
+        self._value = value
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._value.value
+
+
+def _worker_main(worker_id: int, settings: Dict[str, Any], forward_queue,
+                 storage_bytes, ready, stop) -> None:
+    """Entry point of an SMTP worker process"""
+    for name, value in settings.items():
+        setattr(type(config), name, value)
+
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL),
+        format=(f'%(asctime)s - smtp-worker-{worker_id} - %(name)s - '
+                '%(levelname)s - %(message)s')
+    )
+
+    # Each worker creates ids under its own node id
+    id_generator.node_id = (config.NODE_ID + 1 + worker_id) & MAX_NODE_ID
+
+    # The worker's own store is always empty: apply the storage mark to
+    # the store of the owning process
+    backpressure_monitor.storage = SharedStorageBytes(storage_bytes)
+
+    handler = ForwardingSMTPHandler(forward_queue)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = loop.run_until_complete(loop.create_server(
+        lambda: create_smtp_protocol(handler),
+        host=config.HOST,
+        port=config.SMTP_PORT,
+        reuse_port=True
+    ))
+    publisher = loop.create_task(
+        _publish_counters(worker_id, handler, forward_queue))
+    ready.set()
+
+    try:
+        loop.run_until_complete(loop.run_in_executor(None, stop.wait))
+    finally:
+        publisher.cancel()
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        # Final counters, so nothing since the last publish is lost
+        forward_queue.put(WorkerCounters(worker_id, handler.counters()))
+        loop.close()
+
+
+class SMTPWorkerPool:
+    """Runs SMTP worker processes and drains their forwarded emails"""
+
+    def __init__(self, handler: CustomSMTPHandler, workers: int):
+        self.handler = handler
+        self.workers = workers
+        self._ctx = multiprocessing.get_context('spawn')
+        self.processes: List[multiprocessing.process.BaseProcess] = []
+        self.forward_queue: Optional[multiprocessing.queues.Queue] = None
+        # memory_bytes of storage, published to the workers' backpressure
+        self.storage_bytes = self._ctx.Value('q', 0)
+        self._stop_event: Optional[multiprocessing.synchronize.Event] = None
+        self._drain_thread: Optional[threading.Thread] = None
+        self.total_forwarded = 0
+
+    def start(self) -> None:
+        """Start the worker processes and the drain thread"""
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+
+        settings = {name: getattr(config, name)
+                    for name in dir(config) if name.isupper()}
+        forward_queue = self._ctx.Queue()
+        stop_event = self._ctx.Event()
+        self.forward_queue = forward_queue
+        self._stop_event = stop_event
+
+        self._drain_thread = threading.Thread(
+            target=self._drain, name='smtp-worker-drain', daemon=True)
+        self._drain_thread.start()
+
+        ready_events = []
+        for worker_id in range(self.workers):
+            ready = self._ctx.Event()
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(worker_id, settings, forward_queue,
+                      self.storage_bytes, ready, stop_event),
+                name=f'smtp-worker-{worker_id}',
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+            ready_events.append(ready)
+
+        for started, ready in zip(self.processes, ready_events):
+            if not ready.wait(30):
+                self.stop()
+                raise RuntimeError(f"{started.name} failed to start")
+
+    def stop(self) -> None:
+        """Stop the workers, then drain what they already forwarded"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+        if self._drain_thread is not None and self.forward_queue is not None:
+            self.forward_queue.put(None)
+            self._drain_thread.join()
+            self._drain_thread = None
+        self.handler.retire_workers()
+
+    def _drain(self) -> None:
+        """Move forwarded emails into storage, publishing its size to the
+        workers after each batch and while idle"""
+        forward_queue = self.forward_queue
+        assert forward_queue is not None
+        while True:
+            try:
+                batch = [forward_queue.get(timeout=STORAGE_PUBLISH_SECONDS)]
+            except queue.Empty:
+                # Cleanup and deletes shrink storage while no mail arrives
+                self.storage_bytes.value = email_storage_service.memory_bytes
+                continue
+            try:
+                while len(batch) < DRAIN_BATCH_SIZE:
+                    batch.append(forward_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            emails = []
+            for item in batch:
+                if isinstance(item, WorkerCounters):
+                    self.handler.worker_counters[item.worker_id] = item.counters
+                elif item is not None:
+                    emails.append(item)
+            for email_data in emails:
+                raw = email_data.get('raw')
+                if isinstance(raw, bytes) and message_spool.should_spill(len(raw)):
+                    email_data['raw'] = message_spool.spill(raw)
+
+            # One storage lock acquisition per drained batch
+            stored = sum(email_storage_service.add_emails(emails)) if emails else 0
+            self.storage_bytes.value = email_storage_service.memory_bytes
+            if stored < len(emails):
+                logger.error(
+                    f"Failed to store {len(emails) - stored} forwarded emails")
+            self.handler.total_emails_received += stored
+            self.total_forwarded += stored
+
+            if any(item is None for item in batch):
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics"""
+        return {
+            'workers': self.workers,
+            'alive': sum(1 for p in self.processes if p.is_alive()),
+            'total_forwarded': self.total_forwarded
+        }
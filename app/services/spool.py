@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Disk spool for oversized message payloads
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from typing import Dict, Any, Optional
+
+from ..config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class SpooledPayload:
+    """Handle to a message payload stored in a temp file.
+
+    The file is removed when the handle is garbage collected, so
+    whatever drops the email from storage (eviction, delete, cleanup)
+    also frees the disk space.
+    """
+
+    __slots__ = ('path', 'size', '_finalizer', '__weakref__')
+
+    def __init__(self, path: str, size: int, spool: 'MessageSpool'):
+        self.path = path
+        self.size = size
+        self._finalizer = weakref.finalize(self, spool._release, path, size)
+
+    def read(self) -> bytes:
+        """Read the payload back from disk"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class MessageSpool:
+    """Writes oversized payloads to temp files and tracks their usage"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else config.SPILL_DIR
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.total_spilled = 0
+
+    def should_spill(self, size: int) -> bool:
+        """Check whether a payload of this size goes to disk"""
+        return 0 < config.SPILL_THRESHOLD_BYTES < size
+
+    def spill(self, data: bytes) -> SpooledPayload:
+        """Write data to a new temp file and return its handle"""
+        fd, path = tempfile.mkstemp(
+            prefix='mail-', suffix='.eml', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            self.files += 1
+            self.bytes += len(data)
+            self.total_spilled += 1
+
+        return SpooledPayload(path, len(data), self)
+
+    def _release(self, path: str, size: int) -> None:
+        """Remove a spooled file once nothing references it"""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove spooled message {path}: {e}")
+
+        with self._lock:
+            self.files -= 1
+            self.bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get spool statistics"""
+        return {
+            'directory': self.directory or tempfile.gettempdir(),
+            'threshold_bytes': config.SPILL_THRESHOLD_BYTES,
+            'files': self.files,
+            'bytes': self.bytes,
+            'total_spilled': self.total_spilled
+        }
+
+
+# Global instance
+message_spool = MessageSpool()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Shared, briefly cached status snapshot for the status endpoints
+"""
+
+import asyncio
+import time
+from typing import Dict, Any, Optional
+
+from ..config import config
+from .cleanup import cleanup_service
+from .email_storage import EmailStorageService, email_storage_service
+from .smtp_server import smtp_service
+
+
+class StatusSnapshotService:
+    """One snapshot of service state shared by /status, /stats and /services.
+
+    A snapshot is reused for STATUS_CACHE_MS. After that the storage
+    statistics, which scan every email, are only recomputed if storage
+    has changed since they were taken. Probes arriving while a snapshot
+    is being computed wait for that computation instead of starting
+    their own.
+    """
+
+    def __init__(self, storage: Optional[EmailStorageService] = None):
+        self.storage = storage or email_storage_service
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._taken_at = 0.0
+        self._storage_version: Optional[int] = None
+        self._pending: Optional[asyncio.Future] = None
+        self.hits = 0
+        self.refreshes = 0
+        self.storage_scans = 0
+
+    async def get(self) -> Dict[str, Any]:
+        """Get the current snapshot, refreshing it if it is too old"""
+        age = time.monotonic() - self._taken_at
+        if self._snapshot is not None and age * 1000 < config.STATUS_CACHE_MS:
+            self.hits += 1
+            return self._snapshot
+
+        loop = asyncio.get_running_loop()
+        if self._pending is None or self._pending.get_loop() is not loop:
+            self._pending = loop.create_task(self._refresh())
+            self._pending.add_done_callback(self._clear_pending)
+        else:
+            self.hits += 1
+
+        # Shielded so a probe that disconnects does not cancel the others
+        return await asyncio.shield(self._pending)
+
+    def _clear_pending(self, task: asyncio.Future) -> None:
+        if self._pending is task:
+            self._pending = None
+
+    async def _refresh(self) -> Dict[str, Any]:
+        """Take a new snapshot"""
+        version = self.storage.get_version()
+        if self._snapshot is not None and version == self._storage_version:
+            storage_stats = self._snapshot['storage']
+        else:
+            storage_stats = await self._storage_statistics()
+            self.storage_scans += 1
+
+        snapshot = {
+            'storage': storage_stats,
+            'smtp': smtp_service.get_status(),
+            'cleanup': cleanup_service.get_status()
+        }
+
+        self._snapshot = snapshot
+        self._storage_version = version
+        self._taken_at = time.monotonic()
+        self.refreshes += 1
+        return snapshot
+
+    async def _storage_statistics(self) -> Dict[str, Any]:
+        """Scan storage, off the event loop unless storage is loop-only"""
+        if self.storage.single_loop:
+            return self.storage.get_statistics()
+        return await asyncio.to_thread(self.storage.get_statistics)
+
+    def invalidate(self) -> None:
+        """Drop the cached snapshot"""
+        self._snapshot = None
+        self._storage_version = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            'ttl_ms': config.STATUS_CACHE_MS,
+            'hits': self.hits,
+            'refreshes': self.refreshes,
+            'storage_scans': self.storage_scans
+        }
+
+
+# Global instance
+status_snapshot_service = StatusSnapshotService()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import socket
+import statistics
+import sys
+from email import policy
+from email.mime.text import MIMEText
+from pathlib import Path
+from typing import Dict, List
+
+# Make the `app` package importable when run as a plain script
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+
+def free_port() -> int:
+    """Find a free TCP port on localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def build_message(to_addr: str, subject: str, body_size: int = 200,
+                  line_length: int = 56) -> bytes:
+    """Build a plain text message with a body of roughly body_size bytes"""
+    words = 'The quick brown fox jumps over the lazy dog 0123456789. '
+    line = (words * (line_length // len(words) + 1))[:line_length - 1] + '\n'
+    body = (line * (body_size // len(line) + 1))[:body_size]
+    msg = MIMEText(body)
+    msg['Subject'] = subject
+    msg['From'] = 'bench@example.com'
+    msg['To'] = to_addr
+    return msg.as_bytes(policy=policy.SMTP)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) in milliseconds"""
+    if not samples:
+        return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(len(ordered) * 0.95))
+    return {
+        'count': len(ordered),
+        'p50_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[p95_index] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
+
+
+def print_table(title: str, header: List[str], rows: List[List]) -> None:
+    """Print a simple aligned table"""
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
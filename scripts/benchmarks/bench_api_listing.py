@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: requests per second of GET /api/v1/email/{address}?limit=100,
+pre-serialized JSON fragments vs per-request validation and encoding
+
+The application runs under uvicorn in its own process with one mailbox
+of 100 emails. The previous implementation of the endpoint (dict copies,
+EmailListResponse validation, FastAPI's encoder) is mounted next to it
+under /bench/legacy so both are measured against the same server.
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import time
+from datetime import datetime
+
+from _common import free_port, print_table
+
+API_KEY = 'bench-api-key'
+ADDRESS = 'listing@test-mail.example.com'
+
+
+def serve(api_port: int, body_size: int) -> None:
+    """Run the application with a filled mailbox and the legacy route"""
+    os.environ.update({
+        'SMTP_PORT': str(free_port()),
+        'API_PORT': str(api_port),
+        'HOST': '127.0.0.1',
+        'API_KEY': API_KEY,
+        'LOG_LEVEL': 'WARNING',
+    })
+
+    import uvicorn
+    from app.main import app
+    from app.models import EmailListResponse
+    from app.services import email_storage_service
+    from app.services.ids import id_generator
+
+    sentence = 'The quick brown fox jumps over the lazy dog. '
+    body = (sentence * (body_size // len(sentence) + 1))[:body_size]
+    now = time.time()
+    for i in range(100):
+        email_storage_service.add_email({
+            'id': id_generator.next_id(),
+            'from': 'bench@example.com',
+            'to': ADDRESS,
+            'subject': f'Listing benchmark {i}',
+            'body': body,
+            'headers': {'From': 'bench@example.com', 'To': ADDRESS,
+                        'Subject': f'Listing benchmark {i}',
+                        'Message-ID': f'<{i}@bench.example.com>'},
+            'received': datetime.fromtimestamp(now + i).isoformat(),
+            'timestamp': now + i
+        })
+
+    @app.get('/bench/legacy/{address}', response_model=EmailListResponse)
+    async def legacy(address: str, limit: int = 10):
+        emails = email_storage_service.get_emails(address, limit)
+        email_models = [{
+            'id': email['id'],
+            'from': email['from'],
+            'to': email['to'],
+            'subject': email['subject'],
+            'body': email['body'],
+            'headers': email['headers'],
+            'received': email['received']
+        } for email in emails]
+        return EmailListResponse(
+            address=address, count=len(email_models), emails=email_models)
+
+    uvicorn.run(app, host='127.0.0.1', port=api_port, log_level='warning')
+
+
+def wait_ready(api_port: int, timeout: float = 30) -> None:
+    """Wait until the API answers"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', api_port, timeout=1)
+            conn.request('GET', '/api/v1/health')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API did not start")
+
+
+def measure(api_port: int, path: str, requests: int):
+    """Issue requests over one kept-alive connection, return (req/s, bytes)"""
+    headers = {'Authorization': f'Bearer {API_KEY}'}
+    conn = http.client.HTTPConnection('127.0.0.1', api_port)
+
+    # Warm up, which also fills the fragment cache
+    for _ in range(10):
+        conn.request('GET', path, headers=headers)
+        size = len(conn.getresponse().read())
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+    elapsed = time.perf_counter() - start
+
+    conn.close()
+    return requests / elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--body-size', type=int, default=2048)
+    args = parser.parse_args()
+
+    api_port = free_port()
+    ctx = multiprocessing.get_context('spawn')
+    server = ctx.Process(target=serve, args=(api_port, args.body_size), daemon=True)
+    server.start()
+
+    try:
+        wait_ready(api_port)
+        rows = []
+        baseline = None
+        for name, path in (
+                ('legacy', f'/bench/legacy/{ADDRESS}?limit=100'),
+                ('pre-serialized', f'/api/v1/email/{ADDRESS}?limit=100')):
+            rate, size = measure(api_port, path, args.requests)
+            baseline = baseline or rate
+            rows.append([name, f'{rate:.0f}', f'{rate / baseline:.2f}x', size])
+    finally:
+        server.terminate()
+        server.join()
+
+    print_table(f"GET /email/{{address}}?limit=100, {args.body_size} byte bodies",
+                ['path', 'req/s', 'speedup', 'response bytes'], rows)
+
+
+if __name__ == '__main__':
+    main()
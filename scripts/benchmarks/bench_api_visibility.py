@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency from SMTP acceptance to API visibility, with the SMTP
+server in aiosmtpd's controller thread vs on the application event loop
+
+The full application runs under uvicorn in its own process. Each sample
+sends one message, then polls the API over a kept-alive connection
+until the message shows up.
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import smtplib
+import time
+
+from _common import build_message, free_port, print_table, summarize
+
+API_KEY = 'bench-api-key'
+
+
+def serve(smtp_port: int, api_port: int, run_mode: str) -> None:
+    """Run the application with the given SMTP run mode"""
+    os.environ.update({
+        'SMTP_PORT': str(smtp_port),
+        'API_PORT': str(api_port),
+        'HOST': '127.0.0.1',
+        'API_KEY': API_KEY,
+        'SMTP_RUN_MODE': run_mode,
+        'LOG_LEVEL': 'WARNING',
+    })
+
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(app, host='127.0.0.1', port=api_port, log_level='warning')
+
+
+def wait_ready(api_port: int, timeout: float = 30) -> None:
+    """Wait until the API answers"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', api_port, timeout=1)
+            conn.request('GET', '/api/v1/health')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API did not start")
+
+
+def measure(smtp_port: int, api_port: int, samples: int, domain: str):
+    """Send messages and time until each is visible through the API"""
+    headers = {'Authorization': f'Bearer {API_KEY}'}
+    api = http.client.HTTPConnection('127.0.0.1', api_port)
+    accept_to_visible, send_to_visible, polls = [], [], []
+
+    with smtplib.SMTP('127.0.0.1', smtp_port) as client:
+        for i in range(samples):
+            rcpt = f'visibility{i}@{domain}'
+            message = build_message(rcpt, f'sample {i}', 512)
+
+            sent = time.perf_counter()
+            client.sendmail('bench@example.com', [rcpt], message)
+            accepted = time.perf_counter()
+
+            attempts = 0
+            while True:
+                attempts += 1
+                api.request('GET', f'/api/v1/email/{rcpt}', headers=headers)
+                response = api.getresponse()
+                response.read()
+                if response.status == 200:
+                    break
+            visible = time.perf_counter()
+
+            accept_to_visible.append(visible - accepted)
+            send_to_visible.append(visible - sent)
+            polls.append(attempts)
+
+    api.close()
+    return accept_to_visible, send_to_visible, polls
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SMTP to API visibility benchmark')
+    parser.add_argument('--samples', type=int, default=300,
+                        help='Messages per mode')
+    args = parser.parse_args()
+
+    from app.config import config
+
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for run_mode in ('thread', 'loop'):
+        smtp_port, api_port = free_port(), free_port()
+        server = ctx.Process(target=serve, args=(smtp_port, api_port, run_mode))
+        server.start()
+        try:
+            wait_ready(api_port)
+            accept, send, polls = measure(
+                smtp_port, api_port, args.samples, config.DOMAIN)
+        finally:
+            server.terminate()
+            server.join()
+
+        for label, samples in (('accept -> visible', accept),
+                               ('send -> visible', send)):
+            stats = summarize(samples)
+            rows.append([run_mode, label, f"{stats['p50_ms']:.2f}",
+                         f"{stats['p95_ms']:.2f}", f"{stats['max_ms']:.2f}"])
+        rows.append([run_mode, 'API polls per message',
+                     f"{sum(polls) / len(polls):.2f}", '', ''])
+
+    print_table(f"SMTP to API visibility ({args.samples} messages)",
+                ['mode', 'metric', 'p50 ms', 'p95 ms', 'max ms'], rows)
+
+
+if __name__ == "__main__":
+    main()
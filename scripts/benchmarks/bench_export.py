@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and throughput of the NDJSON export as the store grows
+
+Storage is filled in-process, then tracemalloc traces only what the
+export itself allocates while its output is consumed and discarded,
+the way the streaming response hands it to the socket.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from _common import print_table
+
+from app.services.email_storage import EmailStorageService
+from app.services.ids import IdGenerator
+
+
+def fill(storage: EmailStorageService, messages: int, body_size: int) -> None:
+    """Store messages spread over mailboxes of 100"""
+    ids = IdGenerator()
+    sentence = 'The quick brown fox jumps over the lazy dog. '
+    body = (sentence * (body_size // len(sentence) + 1))[:body_size]
+    now = time.time()
+    for i in range(messages):
+        address = f'user{i // 100}@test-mail.example.com'
+        storage.add_email({
+            'id': ids.next_id(),
+            'from': 'bench@example.com',
+            'to': address,
+            'subject': f'Export benchmark {i}',
+            'body': body,
+            'headers': {'From': 'bench@example.com', 'To': address},
+            'received': '2024-01-01T12:00:00',
+            'timestamp': now
+        })
+
+
+def measure(messages: int, body_size: int):
+    """Export a store of this size, return (peak bytes, lines/s, output bytes)"""
+    storage = EmailStorageService()
+    fill(storage, messages, body_size)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    lines = output = 0
+    for chunk in storage.export_json():
+        data = b'\n'.join(chunk) + b'\n'
+        lines += len(chunk)
+        output += len(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert lines == messages
+    return peak, lines / elapsed, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--body-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    rows = []
+    for messages in args.messages:
+        peak, rate, output = measure(messages, args.body_size)
+        rows.append([messages, f'{output / 1e6:.1f}', f'{peak / 1024:.0f}',
+                     f'{rate:.0f}'])
+
+    print_table(f"NDJSON export, {args.body_size} byte bodies",
+                ['messages', 'output MB', 'peak KiB', 'lines/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
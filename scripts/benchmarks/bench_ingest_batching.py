@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ingest throughput and storage lock hold time, batched vs
+unbatched writes, at 1, 10 and 100 concurrent SMTP clients
+
+The server runs in its own process; the clients are asyncio
+connections in another process, each sending messages back to back.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+from _common import build_message, free_port, print_table
+
+from app.config import config
+
+
+def serve(port: int, batch_size: int, batch_ms: float, ready, stop, results) -> None:
+    """Run the SMTP server until stopped, then report storage stats"""
+    type(config).INGEST_BATCH_SIZE = batch_size
+    type(config).INGEST_BATCH_MS = batch_ms
+    # Storage growth is not what this benchmark measures
+    type(config).MAX_EMAILS_PER_ADDRESS = 10
+    type(config).BACKPRESSURE_IN_FLIGHT = 0
+
+    from app.services.email_storage import email_storage_service
+    from app.services.message_parser import MessageParserPool
+    from app.services.smtp_server import CustomSMTPHandler, SMTPController
+
+    handler = CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+    controller = SMTPController(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    ready.set()
+    stop.wait()
+    controller.stop()
+
+    hold = email_storage_service.write_lock_hold
+    results.put({
+        'acquisitions': hold.count,
+        'hold_ms': hold.sum,
+        'emails': handler.ingest.total_emails
+    })
+
+
+async def client(port: int, message: bytes, rcpt: str, count: int) -> None:
+    """Send count messages over one connection"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def reply() -> bytes:
+        while True:
+            line = await reader.readline()
+            if line[3:4] != b'-':
+                return line
+
+    await reply()
+    writer.write(b'EHLO bench\r\n')
+    await reply()
+    for _ in range(count):
+        for command in (b'MAIL FROM:<bench@example.com>\r\n',
+                        f'RCPT TO:<{rcpt}>\r\n'.encode(), b'DATA\r\n'):
+            writer.write(command)
+            await reply()
+        writer.write(message + b'.\r\n')
+        line = await reply()
+        if not line.startswith(b'250'):
+            raise RuntimeError(f"Unexpected reply: {line!r}")
+    writer.write(b'QUIT\r\n')
+    await reply()
+    writer.close()
+
+
+def run_clients(port: int, clients: int, count: int, results) -> None:
+    """Run the clients concurrently and report the elapsed time"""
+    message = build_message(f'bench@{config.DOMAIN}', 'ingest', 1024)
+    if not message.endswith(b'\r\n'):
+        message += b'\r\n'
+
+    async def run():
+        await asyncio.gather(*[
+            client(port, message, f'bench{i}@{config.DOMAIN}', count)
+            for i in range(clients)
+        ])
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    results.put(time.perf_counter() - start)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Batched ingest benchmark')
+    parser.add_argument('--messages', type=int, default=2000,
+                        help='Total messages per run')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100],
+                        help='Concurrent client counts')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='Batch size for the batched run')
+    parser.add_argument('--batch-ms', type=float, default=0,
+                        help='Batch window for the batched run')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for clients in args.clients:
+        for label, batch_size in (('unbatched', 1), ('batched', args.batch_size)):
+            port = free_port()
+            ready, stop = ctx.Event(), ctx.Event()
+            stats = ctx.Queue()
+            server = ctx.Process(target=serve, args=(
+                port, batch_size, args.batch_ms, ready, stop, stats))
+            server.start()
+            ready.wait(30)
+
+            elapsed_queue = ctx.Queue()
+            sender = ctx.Process(target=run_clients, args=(
+                port, clients, max(1, args.messages // clients), elapsed_queue))
+            sender.start()
+            elapsed = elapsed_queue.get()
+            sender.join()
+
+            stop.set()
+            result = stats.get()
+            server.join()
+
+            acquisitions = max(1, result['acquisitions'])
+            rows.append([
+                clients, label,
+                f"{result['emails'] / elapsed:,.0f}",
+                result['acquisitions'],
+                f"{result['hold_ms'] / acquisitions:.3f}",
+                f"{result['hold_ms'] * 1000 / max(1, result['emails']):.1f}"
+            ])
+
+    print_table("Batched ingest",
+                ['clients', 'mode', 'msgs/s', 'lock acquisitions',
+                 'mean hold ms', 'hold us/msg'], rows)
+
+
+if __name__ == "__main__":
+    main()
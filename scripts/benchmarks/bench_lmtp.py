@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LMTP over a Unix socket vs SMTP over loopback TCP
+
+One server process runs both listeners with the same handler. Clients
+are asyncio connections in another process sending messages back to
+back, one command at a time.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from _common import build_message, free_port, print_table, summarize
+
+from app.config import config
+
+
+def serve(port: int, socket_path: str, ready, stop) -> None:
+    """Run SMTP and LMTP listeners until stopped"""
+    # Storage growth is not what this benchmark measures
+    type(config).MAX_EMAILS_PER_ADDRESS = 10
+    type(config).BACKPRESSURE_IN_FLIGHT = 0
+
+    from app.services.message_parser import MessageParserPool
+    from app.services.smtp_server import (CustomSMTPHandler, LMTPController,
+                                          SMTPController)
+
+    handler = CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+    smtp = SMTPController(handler, hostname='127.0.0.1', port=port)
+    lmtp = LMTPController(handler, unix_socket=socket_path)
+    smtp.start()
+    lmtp.start()
+    ready.set()
+    stop.wait()
+    lmtp.stop()
+    smtp.stop()
+
+
+async def client(connect, greeting: bytes, message: bytes, rcpt: str,
+                 count: int, latencies: list) -> None:
+    """Send count messages over one connection"""
+    reader, writer = await connect()
+
+    async def reply() -> bytes:
+        while True:
+            line = await reader.readline()
+            if line[3:4] != b'-':
+                return line
+
+    await reply()
+    writer.write(greeting)
+    await reply()
+    for _ in range(count):
+        start = time.perf_counter()
+        for command in (b'MAIL FROM:<bench@example.com>\r\n',
+                        f'RCPT TO:<{rcpt}>\r\n'.encode(), b'DATA\r\n'):
+            writer.write(command)
+            await reply()
+        writer.write(message + b'.\r\n')
+        line = await reply()
+        if not line.startswith(b'250'):
+            raise RuntimeError(f"Unexpected reply: {line!r}")
+        latencies.append(time.perf_counter() - start)
+    writer.write(b'QUIT\r\n')
+    await reply()
+    writer.close()
+
+
+def run_clients(protocol: str, port: int, socket_path: str, clients: int,
+                count: int, body_size: int, results) -> None:
+    """Run the clients concurrently and report elapsed time and latencies"""
+    message = build_message(f'bench@{config.DOMAIN}', protocol, body_size)
+    if not message.endswith(b'\r\n'):
+        message += b'\r\n'
+
+    greeting = b'LHLO bench\r\n' if protocol == 'lmtp' else b'EHLO bench\r\n'
+
+    def connect():
+        if protocol == 'lmtp':
+            return asyncio.open_unix_connection(socket_path)
+        return asyncio.open_connection('127.0.0.1', port)
+
+    latencies = []
+
+    async def run():
+        await asyncio.gather(*[
+            client(connect, greeting, message, f'bench{i}@{config.DOMAIN}',
+                   count, latencies)
+            for i in range(clients)
+        ])
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    results.put((time.perf_counter() - start, latencies))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='LMTP vs SMTP benchmark')
+    parser.add_argument('--messages', type=int, default=2000,
+                        help='Total messages per run')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10],
+                        help='Concurrent client counts')
+    parser.add_argument('--body-size', type=int, default=1024,
+                        help='Message body size in bytes')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    port = free_port()
+    socket_path = os.path.join(tempfile.mkdtemp(), 'lmtp.sock')
+    ready, stop = ctx.Event(), ctx.Event()
+    server = ctx.Process(target=serve, args=(port, socket_path, ready, stop))
+    server.start()
+    ready.wait(30)
+
+    rows = []
+    try:
+        for clients in args.clients:
+            for protocol in ('smtp', 'lmtp'):
+                results = ctx.Queue()
+                sender = ctx.Process(target=run_clients, args=(
+                    protocol, port, socket_path, clients,
+                    max(1, args.messages // clients), args.body_size, results))
+                sender.start()
+                elapsed, latencies = results.get()
+                sender.join()
+
+                stats = summarize(latencies)
+                rows.append([clients, protocol.upper(),
+                             f"{len(latencies) / elapsed:,.0f}",
+                             f"{stats['p50_ms']:.2f}", f"{stats['p95_ms']:.2f}"])
+    finally:
+        stop.set()
+        server.join()
+
+    print_table("LMTP (Unix socket) vs SMTP (loopback TCP)",
+                ['clients', 'protocol', 'msgs/s', 'p50 ms', 'p95 ms'], rows)
+
+
+if __name__ == "__main__":
+    main()
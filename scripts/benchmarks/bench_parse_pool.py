@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SMTP acceptance latency while large messages are parsed
+
+Starts the SMTP server in its own process for each parse mode, keeps a
+few sender processes busy with large messages, and measures how long a
+small message takes to be accepted meanwhile. Large messages use long
+lines by default so the line-by-line DATA receive stays small next to
+the parse cost being measured.
+"""
+
+import argparse
+import multiprocessing
+import smtplib
+import time
+
+from _common import build_message, free_port, print_table, summarize
+
+from aiosmtpd.controller import Controller
+from app.config import config
+from app.services.message_parser import MessageParserPool
+from app.services.smtp_server import CustomSMTPHandler
+
+
+def serve(mode: str, workers: int, port: int, ready, stop) -> None:
+    """Run an SMTP server with the given parse mode until stopped"""
+    # Keep memory bounded so allocation doesn't dominate the measurement
+    config.MAX_EMAILS_PER_ADDRESS = 2
+    pool = MessageParserPool(mode=mode, workers=workers)
+    pool.start()
+    controller = Controller(
+        CustomSMTPHandler(parser_pool=pool),
+        hostname='127.0.0.1',
+        port=port,
+        data_size_limit=None
+    )
+    controller.start()
+    ready.set()
+    stop.wait()
+    controller.stop()
+    pool.stop()
+
+
+def send_large(port: int, message: bytes, rcpt: str, stop) -> None:
+    """Send large messages over one connection until stopped"""
+    with smtplib.SMTP('127.0.0.1', port, timeout=300) as client:
+        while not stop.is_set():
+            client.sendmail('bench@example.com', [rcpt], message)
+
+
+def run_mode(mode: str, large_mb: int, large_senders: int, samples: int,
+             line_length: int) -> dict:
+    """Run the benchmark for a single parse mode"""
+    ctx = multiprocessing.get_context('spawn')
+    port = free_port()
+    ready, stop = ctx.Event(), ctx.Event()
+    server = ctx.Process(
+        target=serve, args=(mode, max(2, large_senders), port, ready, stop))
+    server.start()
+    ready.wait(30)
+
+    rcpt = f'bench@{config.DOMAIN}'
+    large = build_message(rcpt, 'large', large_mb * 1024 * 1024, line_length)
+    small = build_message(rcpt, 'small')
+
+    senders = [ctx.Process(target=send_large, args=(port, large, rcpt, stop))
+               for _ in range(large_senders)]
+    for p in senders:
+        p.start()
+    time.sleep(1.0)
+
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        with smtplib.SMTP('127.0.0.1', port, timeout=300) as client:
+            client.sendmail('bench@example.com', [rcpt], small)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+
+    stop.set()
+    for p in senders:
+        p.join()
+    server.join()
+
+    return summarize(latencies)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Parse pool acceptance latency benchmark')
+    parser.add_argument('--modes', nargs='+', default=['inline', 'thread', 'process'],
+                        help='Parse modes to compare')
+    parser.add_argument('--large-mb', type=int, default=20,
+                        help='Size of the large messages in MB')
+    parser.add_argument('--large-senders', type=int, default=2,
+                        help='Concurrent large message senders')
+    parser.add_argument('--samples', type=int, default=50,
+                        help='Small messages to time per mode')
+    parser.add_argument('--line-length', type=int, default=998,
+                        help='Line length of the large message bodies')
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes:
+        result = run_mode(mode, args.large_mb, args.large_senders,
+                          args.samples, args.line_length)
+        rows.append([mode, result['count'], f"{result['p50_ms']:.1f}",
+                     f"{result['p95_ms']:.1f}", f"{result['max_ms']:.1f}"])
+
+    print_table(
+        f"Small message latency with {args.large_senders} x {args.large_mb} MB senders",
+        ['mode', 'samples', 'p50 ms', 'p95 ms', 'max ms'], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: message parsing throughput
+
+Compares the previous str-based path (decode + Parser().parsestr) with
+the bytes-native BytesParser path and the BytesHeaderParser header-only
+path used with LAZY_BODY_PARSING.
+"""
+
+import argparse
+import time
+from email.parser import Parser
+
+from _common import build_message, print_table
+
+from app.services.message_parser import _get_body, parse_message
+
+
+def legacy_parse(data: bytes) -> dict:
+    """The original handler parse path"""
+    msg = Parser().parsestr(data.decode('utf-8', errors='ignore'))
+    return {
+        'subject': msg.get('Subject', 'No Subject'),
+        'body': _get_body(msg),
+        'headers': dict(msg.items())
+    }
+
+
+PATHS = {
+    'str (legacy)': legacy_parse,
+    'bytes': lambda data: parse_message(data),
+    'bytes headers-only': lambda data: parse_message(data, headers_only=True),
+}
+
+
+def measure(func, data: bytes, min_seconds: float) -> float:
+    """Return messages per second for func over data"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        func(data)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return count / elapsed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Parsing throughput benchmark')
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[2 * 1024, 100 * 1024, 5 * 1024 * 1024],
+                        help='Body sizes in bytes')
+    parser.add_argument('--seconds', type=float, default=1.0,
+                        help='Minimum run time per measurement')
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        data = build_message('bench@example.com', 'Parsing benchmark', size)
+        for name, func in PATHS.items():
+            rate = measure(func, data, args.seconds)
+            rows.append([f"{size // 1024} KB", name, f"{rate:,.0f}",
+                         f"{rate * len(data) / 1024 / 1024:,.1f}"])
+
+    print_table('Parse throughput', ['body', 'path', 'msgs/s', 'MB/s'], rows)
+
+
+if __name__ == "__main__":
+    main()
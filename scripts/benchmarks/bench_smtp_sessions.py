@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: messages per second by SMTP session style
+
+Compares one message per connection, many messages per connection and
+pipelined BDAT sessions (MAIL, RCPT and BDAT LAST sent in one write,
+several messages in flight) against a server in its own process.
+"""
+
+import argparse
+import multiprocessing
+import smtplib
+import socket
+import time
+
+from _common import build_message, free_port, print_table
+
+from app.config import config
+from app.services.message_parser import MessageParserPool
+from app.services.smtp_server import CustomSMTPHandler, SMTPController
+
+
+def serve(port: int, ready, stop) -> None:
+    """Run the SMTP server until stopped"""
+    # Storage growth is not what this benchmark measures
+    config.MAX_EMAILS_PER_ADDRESS = 10
+    controller = SMTPController(
+        CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline')),
+        hostname='127.0.0.1',
+        port=port
+    )
+    controller.start()
+    ready.set()
+    stop.wait()
+    controller.stop()
+
+
+def one_per_connection(port: int, message: bytes, rcpt: str, count: int) -> None:
+    """Open a new connection for every message"""
+    for _ in range(count):
+        with smtplib.SMTP('127.0.0.1', port) as client:
+            client.sendmail('bench@example.com', [rcpt], message)
+
+
+def many_per_connection(port: int, message: bytes, rcpt: str, count: int) -> None:
+    """Send every message over one connection, one command at a time"""
+    with smtplib.SMTP('127.0.0.1', port) as client:
+        for _ in range(count):
+            client.sendmail('bench@example.com', [rcpt], message)
+
+
+def pipelined(port: int, message: bytes, rcpt: str, count: int,
+              window: int = 10) -> None:
+    """Pipeline whole BDAT transactions, window messages at a time"""
+    transaction = (
+        b'MAIL FROM:<bench@example.com>\r\n'
+        + f'RCPT TO:<{rcpt}>\r\n'.encode()
+        + f'BDAT {len(message)} LAST\r\n'.encode() + message
+    )
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        reader = sock.makefile('rb')
+        reader.readline()
+        sock.sendall(b'EHLO bench\r\n')
+        while not reader.readline().startswith(b'250 '):
+            pass
+
+        sent = 0
+        while sent < count:
+            batch = min(window, count - sent)
+            sock.sendall(transaction * batch)
+            for _ in range(batch * 3):
+                reply = reader.readline()
+                if not reply.startswith(b'250'):
+                    raise RuntimeError(f"Unexpected reply: {reply!r}")
+            sent += batch
+        sock.sendall(b'QUIT\r\n')
+
+
+def timed(style_name: str, port: int, message: bytes, rcpt: str, count: int,
+          results) -> None:
+    """Run one client and report its elapsed time"""
+    start = time.perf_counter()
+    STYLES[style_name](port, message, rcpt, count)
+    results.put(time.perf_counter() - start)
+
+
+STYLES = {
+    'one per connection': one_per_connection,
+    'many per connection': many_per_connection,
+    'pipelined (BDAT)': pipelined,
+}
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SMTP session style benchmark')
+    parser.add_argument('--messages', type=int, default=500,
+                        help='Messages per client')
+    parser.add_argument('--clients', type=int, default=1,
+                        help='Concurrent client processes')
+    parser.add_argument('--body-size', type=int, default=1024,
+                        help='Message body size in bytes')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    port = free_port()
+    ready, stop = ctx.Event(), ctx.Event()
+    server = ctx.Process(target=serve, args=(port, ready, stop))
+    server.start()
+    ready.wait(30)
+
+    rcpt = f'bench@{config.DOMAIN}'
+    message = build_message(rcpt, 'sessions', args.body_size)
+
+    rows = []
+    results = ctx.Queue()
+    for name in STYLES:
+        clients = [ctx.Process(target=timed,
+                               args=(name, port, message, rcpt,
+                                     args.messages, results))
+                   for _ in range(args.clients)]
+        for p in clients:
+            p.start()
+        for p in clients:
+            p.join()
+        # Clients overlap, so the slowest one bounds the run
+        elapsed = max(results.get() for _ in clients)
+        rows.append([name, f"{args.messages * args.clients / elapsed:,.0f}"])
+
+    stop.set()
+    server.join()
+
+    print_table(f"Session styles ({args.clients} clients x {args.messages} messages)",
+                ['style', 'msgs/s'], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SMTP ingest throughput versus SMTP_WORKERS
+
+Runs SMTPService in this process with 0 (in-process controller) or N
+SO_REUSEPORT worker processes, drives it from several client processes
+and reports messages per second until every message is in storage.
+Scaling is bounded by the number of CPU cores on the host.
+"""
+
+import argparse
+import multiprocessing
+import os
+import smtplib
+import time
+
+from _common import build_message, free_port, print_table
+
+from app.config import config
+from app.services import email_storage_service, smtp_service
+
+
+def send_batch(port: int, message: bytes, rcpt: str, count: int) -> None:
+    """Send count messages over a single connection"""
+    with smtplib.SMTP('127.0.0.1', port, timeout=120) as client:
+        for _ in range(count):
+            client.sendmail('bench@example.com', [rcpt], message)
+
+
+def total_emails() -> int:
+    """Count stored emails"""
+    return sum(a['emailCount'] for a in email_storage_service.get_all_addresses())
+
+
+def run(workers: int, clients: int, per_client: int, body_size: int) -> float:
+    """Return messages per second for one worker count"""
+    config.HOST = '127.0.0.1'
+    config.SMTP_PORT = free_port()
+    config.SMTP_WORKERS = workers
+    config.MAX_EMAILS_PER_ADDRESS = per_client
+    email_storage_service.clear_all()
+    if not smtp_service.start():
+        raise RuntimeError("SMTP service failed to start")
+
+    ctx = multiprocessing.get_context('spawn')
+    message = build_message(f'bench@{config.DOMAIN}', 'workers', body_size)
+    procs = [ctx.Process(target=send_batch,
+                         args=(config.SMTP_PORT, message,
+                               f'bench{i}@{config.DOMAIN}', per_client))
+             for i in range(clients)]
+
+    expected = clients * per_client
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    while total_emails() < expected:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    smtp_service.stop()
+    email_storage_service.clear_all()
+    return expected / elapsed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SMTP worker scaling benchmark')
+    parser.add_argument('--workers', nargs='+', type=int, default=[0, 1, 2, 4],
+                        help='SMTP_WORKERS values to compare')
+    parser.add_argument('--clients', type=int, default=8,
+                        help='Concurrent client processes')
+    parser.add_argument('--per-client', type=int, default=200,
+                        help='Messages per client connection')
+    parser.add_argument('--body-size', type=int, default=2048,
+                        help='Message body size in bytes')
+    args = parser.parse_args()
+
+    rows = []
+    baseline = None
+    for workers in args.workers:
+        rate = run(workers, args.clients, args.per_client, args.body_size)
+        if workers == 1 or baseline is None:
+            baseline = rate
+        rows.append([workers, f"{rate:,.0f}", f"{rate / baseline:.2f}x"])
+
+    print_table(
+        f"Ingest throughput ({args.clients} clients, {os.cpu_count()} CPUs)",
+        ['workers', 'msgs/s', 'vs 1 worker'], rows)
+
+
+if __name__ == "__main__":
+    main()
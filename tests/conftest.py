@@ -10,7 +10,8 @@ from fastapi.testclient import TestClient
 
 from app.main import app
 from app.config import TestingConfig, config
-from app.services import email_storage_service, smtp_service, cleanup_service
+from app.services import (email_storage_service, smtp_service, cleanup_service,
+                          status_snapshot_service)
 
 
 @pytest.fixture(scope="session")
@@ -39,6 +40,13 @@ def clean_storage():
     email_storage_service.clear_all()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def fresh_status_snapshot():
+    """Don't let one test see the status snapshot cached by another"""
+    status_snapshot_service.invalidate()
+    yield
+
+
 @pytest.fixture(scope="function")
 def test_client(test_config, clean_storage):
     """Test client fixture"""
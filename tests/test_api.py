@@ -3,9 +3,11 @@
 Tests for FastAPI endpoints
 """
 
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.models import EmailListResponse
 from app.services import email_storage_service
 
 
@@ -102,6 +104,25 @@ class TestAPI:
         assert len(data["addresses"]) == 1
         assert data["addresses"][0]["address"] == "test@test-mail.example.com"
         assert data["addresses"][0]["emailCount"] == 1
+        assert data["addresses"][0]["bytes"] == email_storage_service.total_bytes
+
+    def test_addresses_domain_filter(self, client, auth_headers, sample_email_data):
+        """Test filtering addresses and listing domains"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(sample_email_data)
+        other = dict(sample_email_data, to='user@other.example')
+        email_storage_service.add_email(other)
+
+        response = client.get("/api/v1/addresses?domain=other.example",
+                              headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 1
+        assert data["addresses"][0]["address"] == "user@other.example"
+
+        response = client.get("/api/v1/domains", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
 
     def test_get_emails_for_address(self, client, auth_headers, sample_email_data):
         """Test getting emails for specific address"""
@@ -120,6 +141,110 @@ class TestAPI:
         assert len(data["emails"]) == 1
         assert data["emails"][0]["subject"] == "Test Email"
 
+    def test_get_emails_matches_model(self, client, auth_headers, sample_email_data):
+        """Test the pre-serialized listing equals the model-encoded one"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(
+            dict(sample_email_data, subject=' Naïve "quoted" '))
+        email_storage_service.add_email(dict(sample_email_data, id='test-email-2'))
+
+        response = client.get(
+            "/api/v1/email/test@test-mail.example.com", headers=auth_headers)
+
+        expected = EmailListResponse(
+            address="test@test-mail.example.com",
+            count=2,
+            emails=email_storage_service.get_emails("test@test-mail.example.com")
+        )
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == expected.model_dump(by_alias=True)
+
+    def test_get_emails_conditional(self, client, auth_headers, sample_email_data):
+        """Test If-None-Match gets a 304 until the mailbox changes"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(dict(sample_email_data))
+        url = "/api/v1/email/test@test-mail.example.com"
+
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+        unchanged = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        email_storage_service.add_email(dict(sample_email_data, id='test-email-2'))
+        changed = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["count"] == 2
+
+    def test_addresses_conditional(self, client, auth_headers, sample_email_data):
+        """Test the address list ETag changes on delete"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(dict(sample_email_data))
+
+        etag = client.get("/api/v1/addresses", headers=auth_headers).headers["etag"]
+        unchanged = client.get(
+            "/api/v1/addresses", headers={**auth_headers, "If-None-Match": etag})
+        email_storage_service.delete_emails("test@test-mail.example.com")
+        changed = client.get(
+            "/api/v1/addresses", headers={**auth_headers, "If-None-Match": etag})
+
+        assert unchanged.status_code == 304
+        assert changed.status_code == 200
+        assert changed.json()["count"] == 0
+
+    def test_get_emails_summary_and_fields(self, client, auth_headers,
+                                           sample_email_data):
+        """Test view=summary and fields= projections"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(dict(sample_email_data))
+        url = "/api/v1/email/test@test-mail.example.com"
+
+        summary = client.get(f"{url}?view=summary", headers=auth_headers).json()
+        fields = client.get(f"{url}?fields=id,subject", headers=auth_headers).json()
+        invalid = client.get(f"{url}?fields=id,password", headers=auth_headers)
+
+        assert summary["count"] == 1
+        assert set(summary["emails"][0]) == {
+            "id", "from", "to", "subject", "received", "snippet"}
+        assert summary["emails"][0]["snippet"] == "This is a test email body."
+        assert fields["emails"] == [{"id": "test-email-1", "subject": "Test Email"}]
+        assert invalid.status_code == 422
+
+    def test_projection_matches_full_view(self, client, auth_headers,
+                                          sample_email_data):
+        """Test projected fields are stripped like the model-encoded view"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(dict(
+            sample_email_data, subject=' Hi ', body='hello\n\n',
+            headers={' X-Test ': ' y'}))
+        url = "/api/v1/email/test@test-mail.example.com"
+
+        full = client.get(url, headers=auth_headers).json()["emails"][0]
+        projected = client.get(f"{url}?fields=subject,body,headers",
+                               headers=auth_headers).json()["emails"][0]
+
+        assert projected == {field: full[field]
+                             for field in ("subject", "body", "headers")}
+        assert projected["headers"] == {"X-Test": "y"}
+
+    def test_export(self, client, auth_headers, sample_email_data):
+        """Test the NDJSON export has one email per line"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(dict(sample_email_data))
+        email_storage_service.add_email(
+            dict(sample_email_data, id='test-email-2', to='other@other.example'))
+
+        response = client.get("/api/v1/export", headers=auth_headers)
+        filtered = client.get("/api/v1/export?domain=other.example",
+                              headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == ['test-email-1', 'test-email-2']
+        filtered_ids = [json.loads(line)["id"] for line in filtered.text.splitlines()]
+        assert filtered_ids == ['test-email-2']
+
     def test_get_emails_not_found(self, client, auth_headers):
         """Test getting emails for non-existent address"""
         email_storage_service.clear_all()
@@ -200,6 +325,32 @@ class TestAPI:
         assert "cleanup_service" in data
         assert "email_storage" in data
         assert "api_server" in data
+        memory = data["email_storage"]["memory_usage"]
+        assert memory["stored_bytes"] == data["email_storage"]["total_bytes"]
+        assert memory["estimated_bytes"] == (
+            memory["stored_bytes"] + memory["json_cache_bytes"])
+
+    def test_metrics(self, client, auth_headers, sample_email_data):
+        """Test /metrics exposes storage gauges and per-route latency"""
+        email_storage_service.clear_all()
+        email_storage_service.add_email(sample_email_data)
+        client.get("/api/v1/email/test@test-mail.example.com", headers=auth_headers)
+
+        response = client.get("/metrics", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        lines = response.text.splitlines()
+        assert "mailserver_storage_emails 1" in lines
+        assert any(line.startswith(
+            'mailserver_http_request_duration_seconds_count{method="GET",'
+            'route="/api/v1/email/{address}"}') for line in lines)
+        assert client.get("/metrics").status_code == 401
+
+        services = client.get("/api/v1/services", headers=auth_headers).json()
+        latency = services["api_server"]["latency_ms"]["GET /api/v1/email/{address}"]
+        assert latency["count"] >= 1
+        assert latency["p50"] <= latency["p95"] <= latency["p99"]
 
     def test_bearer_token_auth(self, client, api_key, sample_email_data):
         """Test Bearer token authentication"""
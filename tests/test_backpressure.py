@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for ingest backpressure
+"""
+
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+from app.config import config
+from app.main import app
+from app.services import backpressure_monitor
+from app.services.backpressure import BackpressureMonitor
+from app.services.message_parser import MessageParserPool
+from app.services.smtp_server import CustomSMTPHandler
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Small high-water marks"""
+    monkeypatch.setattr(type(config), 'BACKPRESSURE_STORAGE_BYTES', 1000)
+    monkeypatch.setattr(type(config), 'BACKPRESSURE_IN_FLIGHT', 10)
+
+
+class TestBackpressureMonitor:
+    """Test high-water marks and hysteresis"""
+
+    def test_storage_high_water(self, limits):
+        """Test storage saturation turns backpressure on and off with hysteresis"""
+        storage = SimpleNamespace(memory_bytes=999)
+        monitor = BackpressureMonitor(storage)
+
+        assert monitor.admit()
+
+        storage.memory_bytes = 1000
+        assert not monitor.admit()
+        assert monitor.reason == 'storage'
+
+        # Still above the resume level
+        storage.memory_bytes = 950
+        assert not monitor.admit()
+
+        storage.memory_bytes = 899
+        assert monitor.admit()
+        assert monitor.get_status()['total_rejected'] == 2
+        assert monitor.get_status()['total_activations'] == 1
+
+    def test_in_flight_high_water(self, limits):
+        """Test a full parse queue turns backpressure on"""
+        monitor = BackpressureMonitor(SimpleNamespace(memory_bytes=0))
+
+        assert monitor.admit(9)
+        assert not monitor.admit(10)
+        assert monitor.reason == 'in_flight'
+
+    def test_disabled_marks(self, monkeypatch):
+        """Test a zero mark never triggers"""
+        monkeypatch.setattr(type(config), 'BACKPRESSURE_STORAGE_BYTES', 0)
+        monkeypatch.setattr(type(config), 'BACKPRESSURE_IN_FLIGHT', 0)
+        monitor = BackpressureMonitor(SimpleNamespace(memory_bytes=10 ** 12))
+
+        assert monitor.admit(10 ** 6)
+
+
+class TestIngestBackpressure:
+    """Test SMTP and health behaviour under backpressure"""
+
+    @pytest.fixture
+    def saturated(self, limits, monkeypatch):
+        """Pretend the parse queue is full"""
+        monkeypatch.setattr(backpressure_monitor, 'in_flight', 0)
+        monkeypatch.setattr(backpressure_monitor, 'active', False)
+        pool = MessageParserPool(mode='inline')
+        pool.in_flight = 10
+        yield CustomSMTPHandler(parser_pool=pool)
+        backpressure_monitor.evaluate(0)
+
+    async def test_rcpt_temporary_failure(self, saturated, clean_storage):
+        """Test RCPT is answered with 452 while saturated"""
+        envelope = SimpleNamespace(rcpt_tos=[])
+
+        reply = await saturated.handle_RCPT(
+            None, None, envelope, f'user@{config.DOMAIN}', [])
+
+        assert reply.startswith('452')
+        assert envelope.rcpt_tos == []
+
+    async def test_health_reports_backpressure(self, saturated):
+        """Test /health answers 503 with the backpressure state"""
+        backpressure_monitor.evaluate(10)
+
+        response = TestClient(app).get("/api/v1/health")
+
+        assert response.status_code == 503
+        data = response.json()
+        assert data['services']['email_storage'] == 'degraded'
+        assert data['backpressure']['active'] is True
+        assert data['backpressure']['reason'] == 'in_flight'
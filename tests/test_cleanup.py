@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the deadline-driven cleanup service
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.config import config
+from app.services import cleanup, email_storage_service
+from app.services.cleanup import CleanupService
+
+
+@pytest.fixture
+def cleanup_service(clean_storage):
+    """Cleanup service on an empty store"""
+    return CleanupService()
+
+
+def _email(address: str, timestamp: float, email_id: str = 'e1'):
+    return {
+        'id': email_id,
+        'from': 'sender@example.com',
+        'to': address,
+        'subject': 'Expiring',
+        'body': 'Body',
+        'headers': {},
+        'received': '2024-01-01T12:00:00',
+        'timestamp': timestamp
+    }
+
+
+class TestCleanupService:
+    """Test CleanupService"""
+
+    def test_sleeps_until_next_deadline(self, cleanup_service):
+        """Test the loop waits for the oldest email, capped by the interval"""
+        interval = config.get_cleanup_interval_seconds()
+        assert cleanup_service._seconds_until_next_expiry() == min(
+            interval, config.get_retention_seconds())
+
+        expires_in = 5.0
+        email_storage_service.add_email(_email(
+            'a@test-mail.example.com',
+            time.time() - config.get_retention_seconds() + expires_in))
+        assert 0 < cleanup_service._seconds_until_next_expiry() <= expires_in
+
+    async def test_next_cleanup_reports_deadline(self, cleanup_service):
+        """Test the reported next cleanup is the oldest email's deadline"""
+        assert cleanup_service.get_next_cleanup_in_seconds() is None
+
+        await cleanup_service.start()
+        try:
+            assert cleanup_service.get_next_cleanup_in_seconds() is None
+            email_storage_service.add_email(
+                _email('a@test-mail.example.com', time.time()))
+            remaining = cleanup_service.get_next_cleanup_in_seconds()
+            retention = config.get_retention_seconds()
+            assert retention - 2 <= remaining <= retention
+        finally:
+            await cleanup_service.stop()
+
+    async def test_loop_expires_in_batches(self, cleanup_service, monkeypatch):
+        """Test the running loop reclaims due mail in batches as it expires"""
+        monkeypatch.setattr(type(config), 'CLEANUP_BATCH_SIZE', 2)
+        monkeypatch.setattr(cleanup, 'EXPIRY_RESOLUTION_SECONDS', 0.01)
+        expired = time.time() - config.get_retention_seconds() - 1
+        for i in range(5):
+            email_storage_service.add_email(
+                _email(f'user{i}@test-mail.example.com', expired, f'e{i}'))
+        email_storage_service.add_email(
+            _email('soon@test-mail.example.com', expired + 1.5))
+        email_storage_service.add_email(
+            _email('later@test-mail.example.com', time.time()))
+
+        await cleanup_service.start()
+        try:
+            await asyncio.sleep(0.1)
+            assert cleanup_service.cleanup_stats['total_emails_cleaned'] == 5
+            assert cleanup_service.cleanup_stats['total_cleanups'] == 3
+            assert 'soon@test-mail.example.com' in email_storage_service.email_storage
+
+            await asyncio.sleep(0.8)
+            storage = email_storage_service.email_storage
+            assert 'soon@test-mail.example.com' not in storage
+            assert list(storage) == ['later@test-mail.example.com']
+        finally:
+            await cleanup_service.stop()
+
+    async def test_force_cleanup_sweeps_everything(self, cleanup_service):
+        """Test a forced cleanup still scans all mailboxes"""
+        email_storage_service.add_email(_email('a@test-mail.example.com', 0.0))
+
+        result = await cleanup_service.force_cleanup()
+
+        assert result['cleaned_emails'] == 1
+        assert cleanup_service.get_status()['stats']['total_cleanups'] == 1
+        assert email_storage_service.get_next_expiry() is None
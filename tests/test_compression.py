@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for API response compression
+"""
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import (CompressedResponseCache, CompressionMiddleware,
+                             compress, negotiate_encoding)
+from app.config import config
+from app.main import app
+from app.services import email_storage_service
+
+
+LARGE = b'{"body":"' + b'x' * 4096 + b'"}'
+
+
+@pytest.fixture
+def small_app():
+    """App with the middleware and a few fixed responses"""
+    test_app = FastAPI()
+    test_app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @test_app.get("/large")
+    async def large():
+        return Response(LARGE, media_type="application/json")
+
+    @test_app.get("/small")
+    async def small():
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    @test_app.get("/encoded")
+    async def encoded():
+        return Response(compress(LARGE, 'gzip'), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    return TestClient(test_app)
+
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation"""
+
+    def test_gzip(self, monkeypatch):
+        """Test gzip is chosen when brotli is not available"""
+        monkeypatch.setattr(compression, 'brotli', None)
+
+        assert negotiate_encoding('gzip, deflate, br') == 'gzip'
+        assert negotiate_encoding('deflate') is None
+        assert negotiate_encoding('gzip;q=0, deflate') is None
+        assert negotiate_encoding(None) is None
+
+    def test_malformed_quality_ignored(self, small_app, monkeypatch):
+        """Test a token with an unparsable q-value is skipped, not a 500"""
+        monkeypatch.setattr(compression, 'brotli', None)
+
+        assert negotiate_encoding('gzip;q=abc') is None
+        assert negotiate_encoding('gzip;q=abc, gzip') == 'gzip'
+
+        response = small_app.get("/large", headers={"Accept-Encoding": "gzip;q=abc"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+    def test_brotli_preferred(self):
+        """Test br wins when installed and accepted"""
+        pytest.importorskip('brotli')
+
+        assert negotiate_encoding('gzip, br') == 'br'
+        assert negotiate_encoding('gzip, br;q=0') == 'gzip'
+
+
+class TestCompressionMiddleware:
+    """Test the middleware"""
+
+    def test_large_response_gzipped(self, small_app):
+        """Test large responses are compressed and small ones are not"""
+        large = small_app.get("/large", headers={"Accept-Encoding": "gzip"})
+        small = small_app.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert large.headers["content-encoding"] == "gzip"
+        assert large.headers["vary"] == "Accept-Encoding"
+        assert int(large.headers["content-length"]) < len(LARGE)
+        assert large.content == LARGE
+        assert "content-encoding" not in small.headers
+
+    def test_identity(self, small_app):
+        """Test nothing is compressed without Accept-Encoding"""
+        response = small_app.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert response.content == LARGE
+
+    def test_precompressed_passthrough(self, small_app):
+        """Test bodies that are already encoded are left alone"""
+        response = small_app.get("/encoded", headers={"Accept-Encoding": "gzip"})
+
+        assert response.content == LARGE
+
+    def test_brotli(self, small_app):
+        """Test br is used when installed"""
+        pytest.importorskip('brotli')
+        response = small_app.get("/large", headers={"Accept-Encoding": "br"})
+
+        assert response.headers["content-encoding"] == "br"
+        assert response.content == LARGE
+
+
+class TestCompressedResponseCache:
+    """Test the compressed body cache"""
+
+    def test_etag_bound(self):
+        """Test entries are only valid for the ETag they were stored with"""
+        cache = CompressedResponseCache(max_entries=1)
+        cache.put('a', 'W/"1"', b'one')
+
+        assert cache.get('a', 'W/"1"') == b'one'
+        assert cache.get('a', 'W/"2"') is None
+
+        cache.put('b', 'W/"1"', b'two')
+        assert cache.get('a', 'W/"1"') is None
+        assert cache.get_stats()['entries'] == 1
+
+    def test_mailbox_reused(self, clean_storage, monkeypatch):
+        """Test unchanged mailboxes are served from the cache"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        compression.compressed_responses.clear()
+        for i in range(20):
+            email_storage_service.add_email({
+                'id': f'compressed-{i}', 'from': 'sender@example.com',
+                'to': f'zip@{config.DOMAIN}', 'subject': f'Subject {i}',
+                'body': 'Hello there ' * 20, 'headers': {},
+                'received': '2024-01-01T12:00:00', 'timestamp': 1704110400.0 + i
+            })
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {config.generate_api_key()}",
+                   "Accept-Encoding": "gzip"}
+        url = f"/api/v1/email/zip@{config.DOMAIN}?limit=50"
+
+        first = client.get(url, headers=headers)
+        hits = compression.compressed_responses.hits
+        second = client.get(url, headers=headers)
+
+        assert first.headers["content-encoding"] == "gzip"
+        assert second.json() == first.json()
+        assert first.json()["count"] == 20
+        assert compression.compressed_responses.hits == hits + 1
+
+    def test_cached_body_echoes_requested_address(self, clean_storage, monkeypatch):
+        """Test differently cased requests do not share a cached body"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        compression.compressed_responses.clear()
+        for i in range(5):
+            email_storage_service.add_email({
+                'id': f'case-{i}', 'from': 'sender@example.com',
+                'to': f'case@{config.DOMAIN}', 'subject': f'Subject {i}',
+                'body': 'Hello there ' * 40, 'headers': {},
+                'received': '2024-01-01T12:00:00', 'timestamp': 1704110400.0 + i
+            })
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {config.generate_api_key()}",
+                   "Accept-Encoding": "gzip"}
+
+        upper = client.get(f"/api/v1/email/CASE@{config.DOMAIN}", headers=headers)
+        lower = client.get(f"/api/v1/email/case@{config.DOMAIN}", headers=headers)
+
+        assert lower.headers["content-encoding"] == "gzip"
+        assert upper.json()["address"] == f"CASE@{config.DOMAIN}"
+        assert lower.json()["address"] == f"case@{config.DOMAIN}"
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for duplicate message suppression
+"""
+
+import time
+
+from app.services.dedupe import DuplicateFilter, message_key
+
+
+class TestDuplicateFilter:
+    """Test the bounded LRU with TTL"""
+
+    def test_recorded_key_is_duplicate(self):
+        """Test only recorded keys are duplicates; checking records nothing"""
+        duplicates = DuplicateFilter(max_entries=10, ttl=60)
+
+        assert not duplicates.contains('a')
+        assert not duplicates.contains('a')
+        duplicates.record('a')
+        assert duplicates.contains('a')
+        assert not duplicates.contains('b')
+        assert duplicates.get_stats()['total_duplicates'] == 1
+
+    def test_bounded(self):
+        """Test the least recently recorded key is evicted first"""
+        duplicates = DuplicateFilter(max_entries=2, ttl=60)
+        for key in ('a', 'b', 'a', 'c'):
+            duplicates.record(key)
+
+        assert duplicates.get_stats()['entries'] == 2
+        assert duplicates.contains('a')
+        assert not duplicates.contains('b')
+
+    def test_ttl(self, monkeypatch):
+        """Test keys expire after the TTL"""
+        now = [1000.0]
+        monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+        duplicates = DuplicateFilter(max_entries=10, ttl=5)
+
+        duplicates.record('a')
+        now[0] += 6
+
+        assert not duplicates.contains('a')
+
+    def test_message_key(self):
+        """Test keys use Message-ID when present, else a content digest"""
+        with_id = message_key('User@Example.com', {'Message-Id': '<1@x>'}, b'one')
+        assert with_id == message_key('user@example.com', {'Message-ID': '<1@x>'},
+                                      b'two')
+
+        assert message_key('a@x', {}, b'one') != message_key('a@x', {}, b'two')
+        assert message_key('a@x', {}, b'one') != message_key('b@x', {}, b'one')
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for recipient domain matching
+"""
+
+from app.services.domains import DomainMatcher, address_domain
+
+
+class TestDomainMatcher:
+    """Test exact and wildcard domain matching"""
+
+    def test_exact_domains(self):
+        """Test exact domains match case-insensitively"""
+        matcher = DomainMatcher(['test-mail.example.com', 'Other.Example'])
+
+        assert matcher.accepts('user@test-mail.example.com')
+        assert matcher.accepts('USER@OTHER.EXAMPLE')
+        assert not matcher.accepts('user@sub.other.example')
+        assert not matcher.accepts('user@example.com')
+
+    def test_wildcard_subdomains(self):
+        """Test *.suffix accepts any depth of subdomain but not the suffix"""
+        matcher = DomainMatcher(['*.qa.example.org'])
+
+        assert matcher.match('a.qa.example.org') == '*.qa.example.org'
+        assert matcher.match('x.y.qa.example.org') == '*.qa.example.org'
+        assert matcher.match('qa.example.org') is None
+        assert matcher.match('evilqa.example.org') is None
+
+    def test_invalid_addresses(self):
+        """Test addresses without a domain are rejected"""
+        matcher = DomainMatcher(['example.com'])
+
+        assert not matcher.accepts('example.com')
+        assert not matcher.accepts('user@')
+
+    def test_patterns_deduplicated(self):
+        """Test patterns are normalized and kept in order"""
+        matcher = DomainMatcher(['B.example', 'a.example', 'b.example', ' '])
+
+        assert matcher.patterns == ['b.example', 'a.example']
+
+    def test_address_domain(self):
+        """Test the domain part is split at the last @"""
+        assert address_domain('"a@b"@Example.COM') == 'example.com'
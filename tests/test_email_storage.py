@@ -3,10 +3,16 @@
 Tests for email storage service
 """
 
+import json
 import pytest
+import threading
 import time
 from datetime import datetime
-from app.services.email_storage import EmailStorageService
+from email.mime.text import MIMEText
+from app.config import config
+from app.services.email_storage import EmailStorageService, estimate_email_size
+from app.services.ids import IdGenerator, id_time
+from app.services.spool import MessageSpool, SpooledPayload
 
 
 class TestEmailStorageService:
@@ -118,6 +124,283 @@ class TestEmailStorageService:
         assert any(addr['address'] == 'user2@test-mail.example.com' for addr in addresses)
         assert all(addr['emailCount'] == 1 for addr in addresses)
 
+    def test_domain_index(self, storage_service, sample_email):
+        """Test mailboxes are indexed and filtered per domain"""
+        storage_service.add_email(sample_email)
+
+        other = sample_email.copy()
+        other['to'] = 'user@Other.Example'
+        storage_service.add_email(other)
+
+        addresses = storage_service.get_all_addresses('other.example')
+        assert [addr['address'] for addr in addresses] == ['user@other.example']
+        assert storage_service.get_all_addresses('missing.example') == []
+        assert len(storage_service.get_domains()) == 2
+
+        storage_service.delete_emails('user@other.example')
+        assert storage_service.get_all_addresses('other.example') == []
+        assert storage_service.get_domains() == [
+            {'domain': 'test-mail.example.com', 'addressCount': 1}]
+
+    def test_total_bytes(self, storage_service, sample_email, monkeypatch):
+        """Test stored bytes follow adds, evictions and deletes"""
+        monkeypatch.setattr(type(config), 'MAX_EMAILS_PER_ADDRESS', 2)
+        size = estimate_email_size(sample_email)
+
+        for _ in range(3):
+            storage_service.add_email(sample_email.copy())
+        assert storage_service.total_bytes == 2 * size
+
+        storage_service.delete_emails('test@test-mail.example.com')
+        assert storage_service.total_bytes == 0
+
+    def test_mailbox_bytes(self, storage_service, sample_email, monkeypatch):
+        """Test per-mailbox bytes follow adds, evictions, caching and cleanup"""
+        monkeypatch.setattr(type(config), 'MAX_EMAILS_PER_ADDRESS', 2)
+        address = 'test@test-mail.example.com'
+        other = 'big@test-mail.example.com'
+
+        for i in range(3):
+            storage_service.add_email(
+                dict(sample_email, id=f'e{i}', timestamp=float(i)))
+        storage_service.add_email(dict(sample_email, to=other, body='x' * 10000))
+        storage_service.get_emails_json(address)
+
+        mailbox = storage_service.email_storage[address]
+        assert storage_service.mailbox_bytes[address] == sum(
+            email['stored_bytes'] for email in mailbox)
+        assert (sum(storage_service.mailbox_bytes.values())
+                == storage_service.total_bytes)
+
+        largest = storage_service.get_statistics()['largest_addresses']
+        assert [entry['address'] for entry in largest] == [other, address]
+        assert largest[0]['bytes'] == storage_service.mailbox_bytes[other]
+
+        monkeypatch.setattr(type(config), 'RETENTION_HOURS', 1)
+        storage_service.email_storage[other][0]['timestamp'] = time.time()
+        storage_service.cleanup_old_emails()
+        assert address not in storage_service.mailbox_bytes
+        assert storage_service.total_bytes == storage_service.mailbox_bytes[other]
+
+        storage_service.delete_emails(other)
+        assert storage_service.mailbox_bytes == {}
+        assert storage_service.total_bytes == 0
+        assert storage_service.cache_bytes == 0
+
+    def test_reads_do_not_change_reported_bytes(self, storage_service, sample_email):
+        """Test caching JSON on read leaves versioned byte counts alone"""
+        address = 'test@test-mail.example.com'
+        storage_service.add_email(dict(sample_email))
+        version = storage_service.get_version(address)
+        listed = storage_service.get_all_addresses()[0]['bytes']
+
+        storage_service.get_emails_json(address)
+
+        assert storage_service.get_version(address) == version
+        assert storage_service.get_all_addresses()[0]['bytes'] == listed
+        assert storage_service.cache_bytes > 0
+
+        storage_service.cleanup_old_emails()
+        storage_service.add_email(dict(sample_email, id='evicts', timestamp=0.0))
+        storage_service.get_emails_json(address)
+        storage_service.expire_due(limit=100)
+        storage_service.delete_emails(address)
+        assert storage_service.cache_bytes == 0
+
+    def test_size_estimate_counts_overhead(self, sample_email):
+        """Test the estimate covers object overhead, not just text"""
+        text = len(sample_email['subject']) + len(sample_email['body'])
+        assert estimate_email_size(sample_email) > text + 1000
+        assert estimate_email_size(dict(sample_email, body='x' * 5000)) == (
+            estimate_email_size(dict(sample_email, body='')) + 5000)
+
+    def test_expire_due(self, storage_service, sample_email):
+        """Test only mailboxes past their deadline are expired, in batches"""
+        retention = config.get_retention_seconds()
+        now = time.time()
+        for i in range(3):
+            storage_service.add_email(dict(
+                sample_email, id=f'old{i}', to=f'old{i}@test-mail.example.com',
+                timestamp=now - retention - 10 + i))
+        storage_service.add_email(
+            dict(sample_email, id='mixed-old', timestamp=now - retention - 1))
+        storage_service.add_email(dict(sample_email, id='mixed-new', timestamp=now))
+
+        assert storage_service.get_next_expiry() == now - 10
+
+        first = storage_service.expire_due(limit=2)
+        assert first['cleaned_emails'] == 2
+        assert first['removed_addresses'] == 2
+
+        rest = storage_service.expire_due(limit=100)
+        assert rest['cleaned_emails'] == 2
+        assert rest['removed_addresses'] == 1
+        assert storage_service.expire_due(limit=100)['cleaned_emails'] == 0
+
+        remaining = storage_service.email_storage['test@test-mail.example.com']
+        assert [email['id'] for email in remaining] == ['mixed-new']
+        assert storage_service.total_emails == 1
+        assert storage_service.get_next_expiry() == now + retention
+
+    def test_expiry_schedule_follows_deletes(self, storage_service, sample_email):
+        """Test deleted mailboxes and older arrivals update the next deadline"""
+        retention = config.get_retention_seconds()
+        storage_service.add_email(dict(sample_email, timestamp=1000.0))
+        storage_service.add_email(dict(sample_email, to='b@test-mail.example.com',
+                                       timestamp=2000.0))
+        storage_service.add_email(dict(sample_email, to='b@test-mail.example.com',
+                                       timestamp=500.0))
+        assert storage_service.get_next_expiry() == 500.0 + retention
+
+        storage_service.delete_emails('b@test-mail.example.com')
+        assert storage_service.get_next_expiry() == 1000.0 + retention
+
+        storage_service.clear_all()
+        assert storage_service.get_next_expiry() is None
+
+    def test_range_queries(self, storage_service, sample_email):
+        """Test cursor and time-range queries over generated ids"""
+        generator = IdGenerator()
+        ids = []
+        for i in range(5):
+            email = dict(sample_email, id=generator.next_id(), subject=f'Email {i}')
+            ids.append(email['id'])
+            storage_service.add_email(email)
+        address = 'test@test-mail.example.com'
+
+        newer = storage_service.get_emails(address, after=ids[2])
+        assert sorted(email['id'] for email in newer) == ids[3:]
+        assert storage_service.get_emails(address, after=ids[-1]) == []
+
+        in_range = storage_service.get_emails(
+            address, since=id_time(ids[0]), until=id_time(ids[-1]))
+        assert len(in_range) == 5
+        assert storage_service.get_emails(address, until=id_time(ids[0]) - 1) == []
+
+    def test_cursor_pages_oldest_first(self, storage_service, sample_email,
+                                       monkeypatch):
+        """Test a cursor returns the first emails after it, so paging by the
+        last id seen skips nothing"""
+        monkeypatch.setattr(type(config), 'MAX_EMAILS_PER_ADDRESS', 100)
+        generator = IdGenerator()
+        ids = []
+        for i in range(30):
+            email = dict(sample_email, id=generator.next_id(),
+                         timestamp=1704110400.0 + i)
+            ids.append(email['id'])
+            storage_service.add_email(email)
+        address = 'test@test-mail.example.com'
+
+        page = storage_service.get_emails(address, limit=10, after=ids[4])
+        assert [email['id'] for email in page] == ids[5:15]
+
+        seen, cursor = [], ids[4]
+        while True:
+            page = storage_service.get_emails_json(address, limit=10, after=cursor)
+            if not page:
+                break
+            page_ids = [json.loads(fragment)['id'] for fragment in page]
+            seen.extend(page_ids)
+            cursor = page_ids[-1]
+        assert seen == ids[5:]
+
+    def test_out_of_order_ids_are_sorted(self, storage_service, sample_email):
+        """Test a late arrival with an older id is inserted in id order"""
+        generator = IdGenerator()
+        older, newer = generator.next_id(), generator.next_id()
+        storage_service.add_email(dict(sample_email, id=newer))
+        storage_service.add_email(dict(sample_email, id=older))
+
+        mailbox = storage_service.email_storage['test@test-mail.example.com']
+        assert [email['id'] for email in mailbox] == [older, newer]
+
+    def test_get_emails_json_cached(self, storage_service, sample_email):
+        """Test emails are serialized once and the bytes are accounted for"""
+        storage_service.add_email(dict(sample_email))
+        before = storage_service.total_bytes
+
+        first = storage_service.get_emails_json('test@test-mail.example.com')
+        second = storage_service.get_emails_json('test@test-mail.example.com')
+
+        assert first[0] is second[0]
+        assert json.loads(first[0]) == storage_service.get_emails(
+            'test@test-mail.example.com')[0]
+        assert storage_service.total_bytes == before
+        assert storage_service.cache_bytes == len(first[0])
+        assert storage_service.memory_bytes == before + len(first[0])
+
+    def test_versions(self, storage_service, sample_email, monkeypatch):
+        """Test mailbox versions change on add, evict, delete and cleanup"""
+        monkeypatch.setattr(type(config), 'MAX_EMAILS_PER_ADDRESS', 1)
+        address = 'test@test-mail.example.com'
+        assert storage_service.get_version(address) is None
+
+        storage_service.add_email(dict(sample_email))
+        added = storage_service.get_version(address)
+        storage_service.add_email(dict(sample_email, id='test-email-2', timestamp=0.0))
+        evicted = storage_service.get_version(address)
+        storage_service.get_emails(address)
+
+        assert added < evicted == storage_service.get_version(address)
+        assert storage_service.get_version() == evicted
+
+        storage_service.cleanup_old_emails()
+        assert storage_service.get_version(address) is None
+        assert storage_service.get_version() > evicted
+
+        storage_service.add_email(dict(sample_email))
+        recreated = storage_service.get_version(address)
+        storage_service.delete_emails(address)
+        assert recreated > evicted
+        assert storage_service.get_version(address) is None
+
+    def test_get_emails_fields(self, storage_service, sample_email):
+        """Test projections return only the requested fields"""
+        storage_service.add_email(dict(sample_email, body='  Hello\n\n   there  '))
+
+        emails = storage_service.get_emails(
+            'test@test-mail.example.com', fields=['id', 'snippet'])
+
+        assert emails == [{'id': 'test-email-1', 'snippet': 'Hello there'}]
+
+    def test_projection_skips_lazy_body(self, storage_service, sample_email):
+        """Test a headers-only email keeps its raw bytes unless the body is needed"""
+        raw = b'Subject: Lazy\r\n\r\n' + b'word ' * 100
+        storage_service.add_email(dict(sample_email, body=None, raw=raw))
+        address = 'test@test-mail.example.com'
+        stored = storage_service.email_storage[address][0]
+
+        storage_service.get_emails(address, fields=['id', 'subject'])
+        assert stored['raw'] == raw
+
+        summary = storage_service.get_emails(address, fields=['id', 'snippet'])
+        assert summary[0]['snippet'].startswith('word word')
+        assert summary[0]['snippet'].endswith('...')
+        assert 'raw' not in stored
+
+    def test_export_json(self, storage_service, sample_email):
+        """Test export yields every email in chunks without caching JSON"""
+        for i in range(5):
+            storage_service.add_email(dict(sample_email, id=f'a-{i}'))
+        storage_service.add_email(
+            dict(sample_email, id='b-0', to='other@test-mail.example.com'))
+        before = storage_service.total_bytes
+
+        export = storage_service.export_json(chunk_size=2)
+        first = next(export)
+        # The lock is not held between chunks
+        storage_service.add_email(
+            dict(sample_email, id='c-0', to='late@test-mail.example.com'))
+        chunks = [first, *export]
+
+        ids = [json.loads(line)['id'] for chunk in chunks for line in chunk]
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1, 1]
+        assert ids == ['a-0', 'a-1', 'a-2', 'a-3', 'a-4', 'b-0']
+        assert storage_service.total_bytes > before
+        assert all('json' not in email
+                   for mailbox in storage_service.email_storage.values()
+                   for email in mailbox)
+
     def test_delete_emails(self, storage_service, sample_email):
         """Test deleting emails for an address"""
         storage_service.add_email(sample_email)
@@ -207,4 +490,73 @@ class TestEmailStorageService:
         with storage_service._lock:
             storage_service.add_email(sample_email)
             emails = storage_service.get_emails('test@test-mail.example.com')
-            assert len(emails) == 1 
\ No newline at end of file
+            assert len(emails) == 1 
+
+    def _add_spooled(self, storage_service, sample_email, tmp_path):
+        """Store an email whose body is spooled to disk"""
+        spool = MessageSpool(directory=str(tmp_path))
+        payload = spool.spill(MIMEText('Spooled body').as_bytes())
+        storage_service.add_email(dict(sample_email, body=None, raw=payload))
+        # The spool must outlive the payload handle
+        return spool
+
+    def test_spooled_read_outside_lock(self, storage_service, sample_email,
+                                       tmp_path, monkeypatch):
+        """Test spooled bodies are read from disk without the lock held"""
+        spool = self._add_spooled(storage_service, sample_email, tmp_path)
+        locked = []
+        read = SpooledPayload.read
+
+        def try_lock():
+            if storage_service._lock.acquire(blocking=False):
+                storage_service._lock.release()
+                locked.append(False)
+            else:
+                locked.append(True)
+
+        def checked_read(payload):
+            # Another thread can take the lock unless it is held here
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return read(payload)
+
+        monkeypatch.setattr(SpooledPayload, 'read', checked_read)
+        address = 'test@test-mail.example.com'
+
+        assert storage_service.get_emails(address)[0]['body'] == 'Spooled body'
+        assert storage_service.get_emails(
+            address, fields=['body'])[0]['body'] == 'Spooled body'
+        fragment = json.loads(storage_service.get_emails_json(address)[0])
+        assert fragment['body'] == 'Spooled body'
+        assert len(list(storage_service.export_json())) == 1
+
+        assert locked == [False] * 4
+        assert spool.get_stats()['files'] == 1
+
+    async def test_spooled_read_off_loop(self, storage_service, sample_email,
+                                         tmp_path, monkeypatch):
+        """Test the event loop variants read spooled bodies in a thread"""
+        spool = self._add_spooled(storage_service, sample_email, tmp_path)
+        storage_service.add_email(dict(sample_email, id='in-memory'))
+        threads = []
+        read = SpooledPayload.read
+
+        def recorded_read(payload):
+            threads.append(threading.current_thread())
+            return read(payload)
+
+        monkeypatch.setattr(SpooledPayload, 'read', recorded_read)
+        address = 'test@test-mail.example.com'
+
+        emails = await storage_service.get_emails_off_loop(address)
+        fragments = await storage_service.get_emails_json_off_loop(address)
+        chunks = [chunk async for chunk in storage_service.export_json_off_loop()]
+
+        assert {email['body'] for email in emails} == {
+            'Spooled body', 'This is a test email body.'}
+        assert len(fragments) == 2
+        assert sum(map(len, chunks)) == 2
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+        assert spool.get_stats()['files'] == 1
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for time-sortable message ids
+"""
+
+import time
+
+from app.services.ids import (ID_LENGTH, SEQUENCE_BITS, IdGenerator, decode_id,
+                              encode_id, id_bound, id_time, is_message_id)
+
+
+class TestMessageIds:
+    """Test id generation and encoding"""
+
+    def test_encode_roundtrip(self):
+        """Test encoding is fixed-width and reversible"""
+        for value in (0, 1, 12345, 2 ** 63 + 7):
+            encoded = encode_id(value)
+            assert len(encoded) == ID_LENGTH
+            assert decode_id(encoded) == value
+            assert decode_id(encoded.lower()) == value
+
+    def test_monotonic(self):
+        """Test ids sort in creation order, also within one millisecond"""
+        generator = IdGenerator(node_id=3)
+        ids = [generator.next_id() for _ in range(10000)]
+
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+        assert all(is_message_id(message_id) for message_id in ids)
+
+    def test_node_id_embedded(self):
+        """Test ids from different nodes never collide"""
+        first = IdGenerator(node_id=1).next_id()
+        second = IdGenerator(node_id=2).next_id()
+
+        assert (decode_id(first) >> SEQUENCE_BITS) & 1023 == 1
+        assert (decode_id(second) >> SEQUENCE_BITS) & 1023 == 2
+        assert first != second
+
+    def test_time_bounds(self):
+        """Test ids fall within the bounds of their creation time"""
+        now = time.time()
+        message_id = IdGenerator().next_id()
+
+        assert abs(id_time(message_id) - now) < 1
+        assert id_bound(now - 1) < message_id < id_bound(now + 1, upper=True)
+
+    def test_clock_going_backwards(self, monkeypatch):
+        """Test ids keep increasing when the clock steps back"""
+        generator = IdGenerator()
+        first = generator.next_id()
+        monkeypatch.setattr(time, 'time', lambda: 1800000000.0 - 3600)
+
+        assert generator.next_id() > first
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched ingest queue
+"""
+
+import asyncio
+from datetime import datetime
+
+from app.services.email_storage import EmailStorageService
+from app.services.ingest import IngestQueue
+
+
+def make_email(to: str, subject: str = 'Test Email') -> dict:
+    """Build stored email data"""
+    timestamp = datetime.now()
+    return {
+        'id': f'{to}-{subject}',
+        'from': 'sender@example.com',
+        'to': to,
+        'subject': subject,
+        'body': 'body',
+        'headers': {'Subject': subject},
+        'received': timestamp.isoformat(),
+        'timestamp': timestamp.timestamp()
+    }
+
+
+class TestIngestQueue:
+    """Test batching of storage writes"""
+
+    async def test_concurrent_submits_share_a_batch(self):
+        """Test messages arriving together are committed in one write"""
+        storage = EmailStorageService()
+        ingest = IngestQueue(storage, batch_size=64, batch_ms=5)
+
+        results = await asyncio.gather(*[
+            ingest.submit([make_email(f'user{i}@example.com'),
+                           make_email(f'other{i}@example.com')])
+            for i in range(10)
+        ])
+
+        assert results == [[True, True]] * 10
+        assert storage.get_statistics()['total_emails'] == 20
+        assert ingest.total_batches == 1
+        assert storage.write_lock_hold.count == 1
+        assert ingest.pending == 0
+
+    async def test_batch_size_limit(self):
+        """Test a batch is committed once it reaches batch_size"""
+        storage = EmailStorageService()
+        ingest = IngestQueue(storage, batch_size=4, batch_ms=5)
+
+        await asyncio.gather(*[
+            ingest.submit([make_email(f'user{i}@example.com')])
+            for i in range(10)
+        ])
+
+        assert ingest.total_emails == 10
+        assert ingest.total_batches == 3
+
+    async def test_unbatched(self):
+        """Test batch_size 1 writes straight to storage"""
+        storage = EmailStorageService()
+        ingest = IngestQueue(storage, batch_size=1)
+
+        stored = await ingest.submit([make_email('user@example.com')])
+
+        assert stored == [True]
+        assert len(storage.get_emails('user@example.com')) == 1
+
+    async def test_failed_email_is_not_counted(self):
+        """Test per-message results when one email cannot be stored"""
+        storage = EmailStorageService()
+        ingest = IngestQueue(storage, batch_size=64, batch_ms=1)
+
+        ok, bad = await asyncio.gather(
+            ingest.submit([make_email('user@example.com')]),
+            ingest.submit([{'subject': 'missing recipient'}]))
+
+        assert (ok, bad) == ([True], [False])
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for metrics primitives
+"""
+
+from app.services.metrics import Histogram, LogHistogram, PrometheusWriter
+
+
+class TestHistogram:
+    """Test fixed-bucket histogram"""
+
+    def test_observe_buckets(self):
+        """Test values land in the first bucket whose bound they don't exceed"""
+        histogram = Histogram((1, 10, 100))
+
+        for value in (0.5, 1, 5, 50, 500):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot['count'] == 5
+        assert snapshot['sum'] == 556.5
+        assert snapshot['buckets'] == {'1': 2, '10': 1, '100': 1, '+Inf': 1}
+
+    def test_add_and_copy(self):
+        """Test merging histograms leaves the copied one unchanged"""
+        histogram = Histogram((1, 10))
+        histogram.observe(3)
+        merged = histogram.copy()
+
+        merged.add(histogram)
+
+        assert merged.snapshot()['buckets'] == {'1': 0, '10': 2, '+Inf': 0}
+        assert merged.snapshot()['sum'] == 6
+        assert histogram.count == 1
+
+    def test_reset(self):
+        """Test reset clears observations"""
+        histogram = Histogram((1, 10))
+        histogram.observe(3)
+
+        histogram.reset()
+
+        assert histogram.snapshot()['count'] == 0
+        assert sum(histogram.counts) == 0
+
+
+class TestLogHistogram:
+    """Test streaming percentiles"""
+
+    def test_percentiles_within_bucket_error(self):
+        """Test percentiles are within one bucket (about 9%) of the truth"""
+        histogram = LogHistogram()
+        for value in range(1, 1001):
+            histogram.observe(float(value))
+
+        for q, expected in ((0.5, 500), (0.95, 950), (0.99, 990)):
+            assert expected <= histogram.percentile(q) <= expected * 1.1
+        assert histogram.summary()['max'] == 1000
+        assert histogram.percentile(1.0) == 1000
+
+    def test_fixed_memory(self):
+        """Test extreme values are clamped into the first and last buckets"""
+        histogram = LogHistogram()
+        size = len(histogram.counts)
+        for value in (0, 1e-9, 1e12):
+            histogram.observe(value)
+
+        assert len(histogram.counts) == size
+        assert histogram.counts[0] == 2
+        assert histogram.counts[-1] == 1
+        assert LogHistogram().percentile(0.5) == 0.0
+
+
+class TestPrometheusWriter:
+    """Test the text exposition format"""
+
+    def test_histogram_cumulative(self):
+        """Test buckets are cumulative and scaled, with sum and count"""
+        histogram = Histogram((1, 10))
+        for value in (0.5, 5, 50):
+            histogram.observe(value)
+        writer = PrometheusWriter()
+
+        writer.histogram('latency_seconds', histogram, 'Latency',
+                         {'route': '/a'}, scale=0.001)
+
+        assert writer.render().splitlines() == [
+            '# HELP latency_seconds Latency',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{route="/a",le="0.001"} 1',
+            'latency_seconds_bucket{route="/a",le="0.01"} 2',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+            'latency_seconds_sum{route="/a"} 0.0555',
+            'latency_seconds_count{route="/a"} 3',
+        ]
+
+    def test_declared_once(self):
+        """Test HELP/TYPE appear once per family and labels are escaped"""
+        writer = PrometheusWriter()
+        writer.counter('rejected_total', 1, 'Rejected', {'reason': 'a"b'})
+        writer.counter('rejected_total', 2, 'Rejected', {'reason': 'c'})
+
+        lines = writer.render().splitlines()
+        assert lines.count('# TYPE rejected_total counter') == 1
+        assert 'rejected_total{reason="a\\"b"} 1' in lines
+
+    def test_large_values_exact(self):
+        """Test samples keep every digit instead of 6 significant ones"""
+        histogram = Histogram((1,))
+        histogram.observe(1234567.5)
+        writer = PrometheusWriter()
+
+        writer.counter('sent_total', 1234567, 'Sent')
+        writer.gauge('stored_bytes', 536870912, 'Stored')
+        writer.gauge('ratio', 0.1 + 0.2, 'Ratio')
+        writer.histogram('size_bytes', histogram, 'Size')
+
+        lines = writer.render().splitlines()
+        assert 'sent_total 1234567' in lines
+        assert 'stored_bytes 536870912' in lines
+        assert 'ratio 0.30000000000000004' in lines
+        assert 'size_bytes_sum 1234567.5' in lines
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-demand profiling service and debug endpoints
+"""
+
+import asyncio
+import cProfile
+import marshal
+import socket
+import threading
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import config
+from app.main import app
+from app.services import profiling as profiling_module
+from app.services.message_parser import MessageParserPool
+from app.services.profiling import ProfilingService, ProfilingError
+from app.services.smtp_server import CustomSMTPHandler, SMTPController, smtp_service
+
+
+def _busy_on_smtp_thread():
+    """Work done on the fake SMTP controller loop"""
+    return sum(range(1000))
+
+
+@pytest.fixture
+def thread_loop():
+    """An event loop running in its own thread, like the SMTP controller"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+@pytest.fixture
+def live_controller(monkeypatch):
+    """A running SMTP controller, installed as the service's controller"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    controller = SMTPController(
+        CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline')),
+        hostname='127.0.0.1',
+        port=port
+    )
+    controller.start()
+    monkeypatch.setattr(smtp_service, 'controller', controller)
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture
+def profiling():
+    """Profiling service, with tracemalloc stopped afterwards"""
+    service = ProfilingService()
+    yield service
+    service.stop_tracemalloc()
+
+
+class TestProfilingService:
+    """Test ProfilingService"""
+
+    async def test_profile_covers_controller_loop(self, profiling, thread_loop,
+                                                  monkeypatch):
+        """Test a capture merges the API loop and SMTP controller thread"""
+        monkeypatch.setattr(profiling, '_smtp_loops', lambda: [thread_loop])
+
+        async def smtp_work():
+            await asyncio.sleep(0.02)
+            thread_loop.call_soon_threadsafe(_busy_on_smtp_thread)
+
+        task = asyncio.create_task(smtp_work())
+        stats = await profiling.profile(0.1)
+        await task
+
+        functions = {name for _, _, name in stats.stats}
+        assert '_busy_on_smtp_thread' in functions
+        assert 'smtp_work' in functions
+        assert profiling.total_profiles == 1
+        assert not profiling.get_status()['profiling']
+
+    async def test_profile_with_live_controller(self, profiling, live_controller):
+        """Test repeated captures with a running SMTP controller thread"""
+        async def smtp_work():
+            await asyncio.sleep(0.02)
+            live_controller.loop.call_soon_threadsafe(_busy_on_smtp_thread)
+
+        for _ in range(2):
+            task = asyncio.create_task(smtp_work())
+            stats = await profiling.profile(0.1)
+            await task
+
+            functions = {name for _, _, name in stats.stats}
+            assert '_busy_on_smtp_thread' in functions
+
+        assert profiling.total_profiles == 2
+        assert not profiling.get_status()['profiling']
+
+    async def test_failed_start_disables_profilers(self, profiling, thread_loop,
+                                                   monkeypatch):
+        """Test profilers already enabled are stopped when another fails"""
+        monkeypatch.setattr(profiling_module, 'PROFILER_SEES_ALL_THREADS', False)
+        monkeypatch.setattr(profiling, '_smtp_loops', lambda: [thread_loop])
+        created = []
+
+        class FailingOnThread(cProfile.Profile):
+            def __init__(self):
+                super().__init__()
+                self.active = False
+                created.append(self)
+
+            def enable(self):
+                if threading.current_thread() is not threading.main_thread():
+                    raise ValueError("Another profiling tool is already active")
+                super().enable()
+                self.active = True
+
+            def disable(self):
+                super().disable()
+                self.active = False
+
+        monkeypatch.setattr(profiling_module.cProfile, 'Profile', FailingOnThread)
+        with pytest.raises(ProfilingError):
+            await profiling.profile(0.01)
+
+        assert len(created) == 2
+        assert not any(profile.active for profile in created)
+        assert not profiling.get_status()['profiling']
+
+        monkeypatch.undo()
+        stats = await profiling.profile(0.01)
+        assert stats.stats
+
+    async def test_one_profile_at_a_time(self, profiling):
+        """Test a second capture is refused while one is running"""
+        first = asyncio.create_task(profiling.profile(0.05))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ProfilingError):
+            await profiling.profile(0.05)
+        await first
+
+    async def test_dump_and_format_stats(self, profiling):
+        """Test stats round-trip through the pstats file format"""
+        stats = await profiling.profile(0.01)
+
+        loaded = marshal.loads(profiling.dump_stats(stats))
+        assert loaded == stats.stats
+        assert 'function calls' in profiling.format_stats(stats, 'tottime', 5)
+
+    def test_snapshot_requires_tracing(self, profiling):
+        """Test snapshots fail until tracemalloc is started"""
+        profiling.stop_tracemalloc()
+        with pytest.raises(ProfilingError):
+            profiling.snapshot_report()
+
+    def test_snapshot_diff(self, profiling):
+        """Test the second snapshot is reported as a diff"""
+        status = profiling.start_tracemalloc(5)
+        assert status['tracing'] and status['frames'] == 5
+
+        first = profiling.snapshot_report(limit=5)
+        assert 'Top 5 allocations' in first
+        assert profiling.get_tracemalloc_status()['has_baseline']
+
+        kept = [bytearray(1024) for _ in range(100)]
+        second = profiling.snapshot_report(limit=5)
+        assert 'changes since the previous snapshot' in second
+        assert 'test_profiling.py' in second
+        del kept
+
+        profiling.stop_tracemalloc()
+        assert not tracemalloc.is_tracing()
+        assert not profiling.get_tracemalloc_status()['has_baseline']
+
+    def test_snapshot_dump_loads(self, profiling, tmp_path):
+        """Test a dumped snapshot can be loaded by tracemalloc"""
+        profiling.start_tracemalloc()
+        path = tmp_path / 'snap'
+        path.write_bytes(profiling.snapshot_dump())
+
+        snapshot = tracemalloc.Snapshot.load(str(path))
+        assert snapshot.traceback_limit == 10
+
+    async def test_dump_stacks(self, profiling, thread_loop, monkeypatch):
+        """Test stacks include threads and event loop tasks"""
+        monkeypatch.setattr(profiling, '_smtp_loops', lambda: [thread_loop])
+
+        text = profiling.dump_stacks()
+
+        assert f'Thread {threading.main_thread().name}' in text
+        assert 'API event loop' in text
+        assert 'SMTP event loop: 0 task(s)' in text
+        assert 'test_dump_stacks' in text
+
+
+class TestDebugAPI:
+    """Test debug endpoints"""
+
+    @pytest.fixture
+    def client(self):
+        """Create test client"""
+        return TestClient(app)
+
+    @pytest.fixture
+    def auth_headers(self):
+        """Authentication headers"""
+        return {"Authorization": f"Bearer {config.generate_api_key()}"}
+
+    @pytest.fixture
+    def enabled(self, monkeypatch):
+        """Enable profiling"""
+        from app.services import profiling_service
+        monkeypatch.setattr(type(config), 'PROFILING_ENABLED', True)
+        yield
+        profiling_service.stop_tracemalloc()
+
+    def test_disabled_by_default(self, client, auth_headers):
+        """Test endpoints are hidden unless enabled"""
+        response = client.get("/api/v1/debug/stacks", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_requires_auth(self, client, enabled):
+        """Test endpoints require the API key"""
+        assert client.get("/api/v1/debug/stacks").status_code == 401
+
+    def test_profile_download(self, client, auth_headers, enabled):
+        """Test a profile is returned as a pstats file"""
+        response = client.post("/api/v1/debug/profile?seconds=0.05",
+                               headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert 'filename="profile-' in response.headers["content-disposition"]
+        assert isinstance(marshal.loads(response.content), dict)
+
+    def test_profile_text(self, client, auth_headers, enabled):
+        """Test a profile as a text report"""
+        response = client.post("/api/v1/debug/profile?seconds=0.05&format=text",
+                               headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "function calls" in response.text
+
+    def test_profile_too_long(self, client, auth_headers, enabled, monkeypatch):
+        """Test captures are limited to PROFILE_MAX_SECONDS"""
+        monkeypatch.setattr(type(config), 'PROFILE_MAX_SECONDS', 1)
+        response = client.post("/api/v1/debug/profile?seconds=2", headers=auth_headers)
+        assert response.status_code == 422
+
+    def test_tracemalloc_flow(self, client, auth_headers, enabled):
+        """Test start, snapshot twice and stop"""
+        url = "/api/v1/debug/tracemalloc"
+        assert client.post(f"{url}/snapshot", headers=auth_headers).status_code == 409
+
+        response = client.post(f"{url}/start", headers=auth_headers)
+        assert response.json()["tracing"] is True
+
+        first = client.post(f"{url}/snapshot", headers=auth_headers)
+        assert first.status_code == 200
+        assert "Top 50 allocations" in first.text
+        second = client.post(f"{url}/snapshot?limit=10", headers=auth_headers)
+        assert "changes since the previous snapshot" in second.text
+        assert 'filename="tracemalloc-' in second.headers["content-disposition"]
+
+        response = client.post(f"{url}/stop", headers=auth_headers)
+        assert response.json()["tracing"] is False
+
+    def test_stacks(self, client, auth_headers, enabled):
+        """Test stacks are returned as a text file"""
+        response = client.get("/api/v1/debug/stacks", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert 'filename="stacks-' in response.headers["content-disposition"]
+        assert "API event loop" in response.text
+        assert "Thread MainThread" in response.text
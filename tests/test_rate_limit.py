@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for per-client SMTP rate limiting
+"""
+
+import time
+
+from app.config import config
+from app.services import rate_limit
+from app.services.rate_limit import RateLimiter, TokenBucketTable
+
+
+class FakeClock:
+    """Settable stand-in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucketTable:
+    """Test token buckets"""
+
+    def test_burst_then_refill(self, monkeypatch):
+        """Test a bucket allows its burst, then refills at the rate"""
+        clock = FakeClock()
+        monkeypatch.setattr(time, 'monotonic', clock)
+        table = TokenBucketTable(rate=2, burst=3, max_buckets=10)
+
+        assert [table.consume('a') for _ in range(4)] == [True, True, True, False]
+        assert table.consume('b')
+
+        clock.now += 0.5
+        assert table.consume('a')
+        assert not table.consume('a')
+
+    def test_has_tokens_does_not_consume(self):
+        """Test checking a bucket leaves it untouched"""
+        table = TokenBucketTable(rate=1, burst=1, max_buckets=10)
+
+        assert table.has_tokens('a')
+        assert table.has_tokens('a')
+        assert table.get_status()['buckets'] == 0
+
+    def test_prune_refilled(self, monkeypatch):
+        """Test the periodic sweep drops buckets that have refilled"""
+        clock = FakeClock()
+        monkeypatch.setattr(time, 'monotonic', clock)
+        table = TokenBucketTable(rate=1, burst=5, max_buckets=10)
+        table.consume('idle')
+
+        clock.now += rate_limit.PRUNE_INTERVAL
+        table.consume('busy')
+
+        status = table.get_status()
+        assert status['buckets'] == 1
+        assert status['most_depleted'][0]['client'] == 'busy'
+
+    def test_max_buckets(self):
+        """Test the least recently used bucket goes first when over the bound"""
+        table = TokenBucketTable(rate=0.001, burst=5, max_buckets=2)
+        for key in ('a', 'b', 'a', 'c'):
+            table.consume(key)
+
+        clients = {entry['client'] for entry in table.get_status()['most_depleted']}
+        assert clients == {'a', 'c'}
+
+    def test_over_capacity_skips_sweep(self, monkeypatch):
+        """Test new clients over the bound evict one bucket, not sweep all"""
+        table = TokenBucketTable(rate=0.001, burst=5, max_buckets=100)
+        sweeps = []
+        monkeypatch.setattr(table, '_prune', sweeps.append)
+
+        for i in range(1000):
+            table.consume(f'spoofed{i}')
+
+        assert sweeps == []
+        assert table.get_status(top=100)['buckets'] == 100
+        assert 'spoofed999' in table._buckets
+        assert 'spoofed899' not in table._buckets
+
+
+class TestRateLimiter:
+    """Test per-peer and per-sender limits"""
+
+    def test_disabled(self, monkeypatch):
+        """Test nothing is limited or tracked when disabled"""
+        monkeypatch.setattr(type(config), 'RATE_LIMIT_ENABLED', False)
+        limiter = RateLimiter()
+        limiter.peers.burst = 1
+
+        assert all(limiter.consume_rcpt('192.0.2.1', 'a@example.com')
+                   for _ in range(5))
+        assert limiter.get_status()['peers']['buckets'] == 0
+
+    def test_sender_limit(self, monkeypatch):
+        """Test a sender is limited across peers, case-insensitively"""
+        monkeypatch.setattr(type(config), 'RATE_LIMIT_ENABLED', True)
+        limiter = RateLimiter()
+        limiter.senders.burst = 2
+
+        assert limiter.consume_rcpt('192.0.2.1', 'a@example.com')
+        assert limiter.consume_rcpt('192.0.2.2', 'A@example.com')
+        assert not limiter.check_mail('192.0.2.3', 'a@example.com')
+        assert not limiter.consume_rcpt('192.0.2.3', 'a@example.com')
+        assert limiter.consume_rcpt('192.0.2.3', 'b@example.com')
+
+    def test_refused_rcpt_charges_nothing(self, monkeypatch):
+        """Test a delivery refused by one bucket does not drain the other"""
+        monkeypatch.setattr(type(config), 'RATE_LIMIT_ENABLED', True)
+        limiter = RateLimiter()
+        limiter.senders.burst = 1
+
+        limiter.consume_rcpt('192.0.2.1', 'a@example.com')
+        limiter.consume_rcpt('192.0.2.1', 'a@example.com')
+
+        status = limiter.get_status()
+        assert status['senders']['total_limited'] == 1
+        most_depleted = status['peers']['most_depleted'][0]
+        assert most_depleted['tokens'] >= limiter.peers.burst - 1.01
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for per-route request latency and the slow request log
+"""
+
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import config
+from app.request_metrics import RequestMetrics, RequestMetricsMiddleware
+
+
+def make_client(metrics: RequestMetrics) -> TestClient:
+    """App with the middleware and one slow parameterised route"""
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str, delay: float = 0):
+        await asyncio.sleep(delay)
+        return {"id": item_id}
+
+    return TestClient(app)
+
+
+class TestRequestMetricsMiddleware:
+    """Test the request metrics middleware"""
+
+    def test_labelled_by_route_template(self):
+        """Test requests are grouped by route template, not raw path"""
+        metrics = RequestMetrics()
+        client = make_client(metrics)
+
+        client.get("/items/a")
+        client.get("/items/b")
+        client.get("/missing")
+
+        percentiles = metrics.get_percentiles()
+        assert percentiles["GET /items/{item_id}"]["count"] == 2
+        assert percentiles["GET unmatched"]["count"] == 1
+        assert metrics.responses[("GET", "/items/{item_id}", 200)] == 2
+
+    def test_slow_request_logged(self, monkeypatch, caplog):
+        """Test slow requests are logged with their parameters, minus the API key"""
+        monkeypatch.setattr(type(config), 'SLOW_REQUEST_MS', 20)
+        metrics = RequestMetrics()
+        client = make_client(metrics)
+
+        with caplog.at_level(logging.WARNING, logger='app.request_metrics'):
+            client.get("/items/fast")
+            client.get("/items/slow?delay=0.05&api_key=secret")
+
+        slow = [record.getMessage() for record in caplog.records
+                if record.getMessage().startswith('Slow request')]
+        assert len(slow) == 1
+        assert "/items/{item_id}" in slow[0]
+        assert "'item_id': 'slow'" in slow[0]
+        assert "secret" not in slow[0]
+        assert metrics.total_slow == 1
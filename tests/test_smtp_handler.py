@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+"""
+Tests for the SMTP handler and message parsing
+"""
+
+import asyncio
+import pytest
+import queue
+import smtplib
+import socket
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+from app.config import config
+from app.services import email_storage_service
+from app.services.backpressure import BackpressureMonitor
+from app.services.message_parser import MessageParserPool, extract_body, parse_message
+from app.services.smtp_server import (CustomSMTPHandler, LMTPController,
+                                      SMTPController, SMTPService)
+from app.services.smtp_workers import (ForwardingSMTPHandler, SharedStorageBytes,
+                                       SMTPWorkerPool, WorkerCounters)
+from app.services.spool import message_spool
+
+
+def make_message(subject: str = 'Test Email', body: str = 'Hello there') -> bytes:
+    """Build raw message bytes"""
+    msg = MIMEText(body)
+    msg['Subject'] = subject
+    msg['From'] = 'sender@example.com'
+    msg['To'] = f'user@{config.DOMAIN}'
+    return msg.as_bytes()
+
+
+def make_envelope(content: bytes, rcpt_tos=None):
+    """Build a minimal aiosmtpd-like envelope"""
+    return SimpleNamespace(
+        mail_from='sender@example.com',
+        rcpt_tos=rcpt_tos or [f'user@{config.DOMAIN}'],
+        content=content
+    )
+
+
+class TestParseMessage:
+    """Test message parsing"""
+
+    def test_parse_simple_message(self):
+        """Test parsing a plain text message"""
+        parsed = parse_message(make_message())
+
+        assert parsed['subject'] == 'Test Email'
+        assert parsed['body'] == 'Hello there'
+        assert parsed['headers']['From'] == 'sender@example.com'
+
+    def test_parse_multipart_message(self):
+        """Test the text/plain part is extracted from multipart mail"""
+        msg = MIMEMultipart()
+        msg['Subject'] = 'Multipart'
+        msg.attach(MIMEText('plain part'))
+        msg.attach(MIMEText('<b>html part</b>', 'html'))
+
+        parsed = parse_message(msg.as_bytes())
+
+        assert parsed['subject'] == 'Multipart'
+        assert parsed['body'] == 'plain part'
+
+    def test_parse_missing_subject(self):
+        """Test default subject"""
+        parsed = parse_message(b'From: a@example.com\r\n\r\nbody\r\n')
+
+        assert parsed['subject'] == 'No Subject'
+
+    def test_parse_declared_charset(self):
+        """Test non-UTF-8 bodies are decoded with their declared charset"""
+        msg = MIMEText('Grüße', 'plain', 'iso-8859-1')
+        msg['Subject'] = 'Latin-1'
+
+        parsed = parse_message(msg.as_bytes())
+
+        assert parsed['body'] == 'Grüße'
+
+    def test_parse_utf8_header(self):
+        """Test raw UTF-8 header bytes survive parsing"""
+        raw = 'Subject: Café\r\n\r\nbody\r\n'.encode('utf-8')
+
+        parsed = parse_message(raw)
+
+        assert parsed['subject'] == 'Café'
+        assert parsed['headers']['Subject'] == 'Café'
+
+    def test_parse_headers_only(self):
+        """Test header-only parsing leaves the body for later"""
+        data = make_message()
+
+        parsed = parse_message(data, headers_only=True)
+
+        assert parsed['subject'] == 'Test Email'
+        assert parsed['body'] is None
+        assert extract_body(data) == 'Hello there'
+
+
+class TestMessageParserPool:
+    """Test parser pool modes"""
+
+    @pytest.mark.parametrize('mode', ['inline', 'thread'])
+    async def test_parse_modes(self, mode):
+        """Test parsing in each in-process mode"""
+        pool = MessageParserPool(mode=mode, workers=1)
+        pool.start()
+        try:
+            parsed = await pool.parse(make_message(subject=mode))
+        finally:
+            pool.stop()
+
+        assert parsed['subject'] == mode
+        assert pool.in_flight == 0
+        assert pool.get_stats()['total_parsed'] == 1
+
+
+class TestCustomSMTPHandler:
+    """Test SMTP handler hooks"""
+
+    @pytest.fixture
+    def handler(self, clean_storage):
+        """Handler with an inline parser"""
+        return CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+
+    async def test_handle_data_stores_email(self, handler):
+        """Test DATA stores mail for valid recipients"""
+        envelope = make_envelope(make_message())
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        status = await handler.handle_DATA(None, session, envelope)
+
+        assert status == '250 OK'
+        emails = email_storage_service.get_emails(f'user@{config.DOMAIN}')
+        assert len(emails) == 1
+        assert emails[0]['subject'] == 'Test Email'
+        assert handler.get_stats()['total_emails_received'] == 1
+
+    async def test_ids_unique_per_recipient(self, handler):
+        """Test each recipient copy gets its own time-sortable id"""
+        rcpts = [f'one@{config.DOMAIN}', f'two@{config.DOMAIN}']
+        envelope = make_envelope(make_message(), rcpts)
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        await handler.handle_DATA(None, session, envelope)
+
+        ids = [email_storage_service.get_emails(rcpt)[0]['id'] for rcpt in rcpts]
+        assert ids[0] < ids[1]
+
+    async def test_duplicates_skipped(self, handler, monkeypatch):
+        """Test a repeated message is accepted but stored once per recipient"""
+        monkeypatch.setattr(type(config), 'DEDUPE_ENABLED', True)
+        first = f'first@{config.DOMAIN}'
+        data = make_message()
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        await handler.handle_DATA(None, session, make_envelope(data, [first]))
+        status = await handler.handle_DATA(None, session, make_envelope(data, [first]))
+        await handler.handle_DATA(
+            None, session, make_envelope(data, [first, f'second@{config.DOMAIN}']))
+
+        assert status == '250 OK'
+        assert len(email_storage_service.get_emails(first)) == 1
+        assert len(email_storage_service.get_emails(f'second@{config.DOMAIN}')) == 1
+        assert handler.get_stats()['dedupe']['total_duplicates'] == 2
+
+    async def test_failed_store_not_deduplicated(self, handler, monkeypatch):
+        """Test a retry after a failed store is stored, not skipped"""
+        monkeypatch.setattr(type(config), 'DEDUPE_ENABLED', True)
+        rcpt = f'retry@{config.DOMAIN}'
+        data = make_message()
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+        store = handler._store_emails
+
+        async def failing_store(emails):
+            return [False] * len(emails)
+
+        monkeypatch.setattr(handler, '_store_emails', failing_store)
+        failed = await handler.handle_DATA(None, session, make_envelope(data, [rcpt]))
+        monkeypatch.setattr(handler, '_store_emails', store)
+        retried = await handler.handle_DATA(None, session, make_envelope(data, [rcpt]))
+
+        assert failed != '250 OK'
+        assert retried == '250 OK'
+        assert len(email_storage_service.get_emails(rcpt)) == 1
+        assert handler.get_stats()['dedupe']['total_duplicates'] == 0
+
+    async def test_rate_limited(self, handler, monkeypatch):
+        """Test deliveries over the burst get 451 at RCPT, then at MAIL"""
+        monkeypatch.setattr(type(config), 'RATE_LIMIT_ENABLED', True)
+        handler.rate_limiter.peers.burst = 2
+        session = SimpleNamespace(peer=('192.0.2.1', 12345))
+        envelope = SimpleNamespace(mail_from=None, rcpt_tos=[])
+        address = f'user@{config.DOMAIN}'
+
+        assert await handler.handle_MAIL(
+            None, session, envelope, 'sender@example.com', []) == '250 OK'
+        replies = [await handler.handle_RCPT(None, session, envelope, address, [])
+                   for _ in range(3)]
+        refused = await handler.handle_MAIL(
+            None, session, envelope, 'sender@example.com', [])
+        other_peer = await handler.handle_MAIL(
+            None, SimpleNamespace(peer=('192.0.2.2', 12345)), envelope,
+            'other@example.com', [])
+
+        assert replies[:2] == ['250 OK', '250 OK']
+        assert replies[2].startswith('451 4.7.1')
+        assert refused.startswith('451 4.7.1')
+        assert other_peer == '250 OK'
+        assert handler.get_stats()['rate_limit']['peers']['total_limited'] == 2
+
+    async def test_command_metrics(self, handler):
+        """Test per-command latency and message size are recorded"""
+        data = make_message()
+        envelope = make_envelope(data)
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        await handler.handle_MAIL(None, session, envelope, 'sender@example.com', [])
+        await handler.handle_DATA(None, session, envelope)
+
+        stats = handler.get_stats()
+        assert stats['command_latency_ms']['MAIL']['count'] == 1
+        assert stats['command_latency_ms']['DATA']['count'] == 1
+        assert stats['command_latency_ms']['RCPT']['count'] == 0
+        assert stats['message_size_bytes']['count'] == 1
+        assert stats['message_size_bytes']['sum'] == len(data)
+
+    def test_session_tracking(self, handler):
+        """Test active connections and session totals"""
+        handler.session_opened()
+        handler.session_opened()
+        handler.session_closed(0.2)
+
+        stats = handler.get_stats()
+        assert stats['connection_count'] == 1
+        assert stats['total_sessions'] == 2
+        assert stats['session_duration_seconds']['count'] == 1
+
+    async def test_handle_data_lazy_body(self, clean_storage):
+        """Test headers-only parsing extracts the body on first read"""
+        handler = CustomSMTPHandler(
+            parser_pool=MessageParserPool(mode='inline', headers_only=True))
+        envelope = make_envelope(make_message(body='Lazy body'))
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        status = await handler.handle_DATA(None, session, envelope)
+
+        assert status == '250 OK'
+        address = f'user@{config.DOMAIN}'
+        assert 'raw' in email_storage_service.email_storage[address][0]
+        emails = email_storage_service.get_emails(address)
+        assert emails[0]['body'] == 'Lazy body'
+        assert 'raw' not in emails[0]
+
+    async def test_handle_data_spills_large_message(self, handler, tmp_path,
+                                                    monkeypatch):
+        """Test oversized messages are spooled to disk and read back"""
+        monkeypatch.setattr(type(config), 'SPILL_THRESHOLD_BYTES', 256)
+        monkeypatch.setattr(message_spool, 'directory', str(tmp_path))
+        body = 'Large body line\n' * 100
+        envelope = make_envelope(make_message(subject='Large', body=body))
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        status = await handler.handle_DATA(None, session, envelope)
+
+        assert status == '250 OK'
+        address = f'user@{config.DOMAIN}'
+        stored = email_storage_service.email_storage[address][0]
+        assert stored['subject'] == 'Large'
+        assert stored['body'] is None
+        assert len(list(tmp_path.iterdir())) == 1
+
+        emails = email_storage_service.get_emails(address)
+        assert emails[0]['body'] == body
+        assert 'raw' not in emails[0]
+        # The body is not cached; the spooled copy stays the only one
+        assert stored['body'] is None
+
+    async def test_handle_rcpt_extra_domains(self, clean_storage, monkeypatch):
+        """Test extra and wildcard domains from MAIL_DOMAINS are accepted"""
+        monkeypatch.setattr(type(config), 'EXTRA_DOMAINS',
+                            ['other.example', '*.qa.example.org'])
+        handler = CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+        envelope = SimpleNamespace(mail_from=None, rcpt_tos=[])
+
+        for address in ('a@other.example', 'b@team.qa.example.org',
+                        f'c@{config.DOMAIN}', 'd@qa.example.org'):
+            await handler.handle_RCPT(None, None, envelope, address, [])
+
+        assert envelope.rcpt_tos == [
+            'a@other.example', 'b@team.qa.example.org', f'c@{config.DOMAIN}']
+
+    async def test_handle_data_foreign_domain(self, handler):
+        """Test DATA rejects mail without local recipients"""
+        envelope = make_envelope(make_message(), ['user@elsewhere.example'])
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        status = await handler.handle_DATA(None, session, envelope)
+
+        assert status.startswith('550')
+
+    async def test_handle_rcpt(self, handler):
+        """Test RCPT accepts only our domain"""
+        envelope = SimpleNamespace(mail_from=None, rcpt_tos=[])
+
+        ok = await handler.handle_RCPT(
+            None, None, envelope, f'user@{config.DOMAIN}', [])
+        rejected = await handler.handle_RCPT(
+            None, None, envelope, 'user@elsewhere.example', [])
+
+        assert ok == '250 OK'
+        assert rejected.startswith('550')
+        assert envelope.rcpt_tos == [f'user@{config.DOMAIN}']
+
+
+class TestSMTPWorkers:
+    """Test forwarding from SMTP worker processes"""
+
+    async def test_forwarding_handler_queues_email(self, clean_storage):
+        """Test worker handlers forward instead of storing"""
+        forward_queue = queue.Queue()
+        handler = ForwardingSMTPHandler(forward_queue)
+        envelope = make_envelope(make_message())
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+
+        status = await handler.handle_DATA(None, session, envelope)
+
+        assert status == '250 OK'
+        assert forward_queue.qsize() == 1
+        assert len(email_storage_service.email_storage) == 0
+
+    def test_drain_stores_forwarded_email(self, clean_storage):
+        """Test the drain thread stores forwarded emails until the sentinel"""
+        handler = CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+        pool = SMTPWorkerPool(handler, workers=1)
+        pool.forward_queue = queue.Queue()
+        email_data = handler._create_email_data(
+            'sender@example.com', f'user@{config.DOMAIN}',
+            parse_message(make_message()), b'', datetime.now())
+        pool.forward_queue.put(email_data)
+        pool.forward_queue.put(None)
+
+        pool._drain()
+
+        assert pool.get_stats()['total_forwarded'] == 1
+        assert handler.total_emails_received == 1
+        assert len(email_storage_service.get_emails(f'user@{config.DOMAIN}')) == 1
+
+    def test_drain_publishes_storage_bytes(self, clean_storage, monkeypatch):
+        """Test workers see the owning process's storage for backpressure"""
+        monkeypatch.setattr(type(config), 'BACKPRESSURE_STORAGE_BYTES', 1000)
+        handler = CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+        pool = SMTPWorkerPool(handler, workers=1)
+        pool.forward_queue = queue.Queue()
+        email_data = handler._create_email_data(
+            'sender@example.com', f'user@{config.DOMAIN}',
+            parse_message(make_message(body='x' * 2000)), b'', datetime.now())
+        pool.forward_queue.put(email_data)
+        pool.forward_queue.put(None)
+
+        pool._drain()
+
+        assert pool.storage_bytes.value == email_storage_service.memory_bytes
+        worker_monitor = BackpressureMonitor(SharedStorageBytes(pool.storage_bytes))
+        assert not worker_monitor.admit()
+        assert worker_monitor.reason == 'storage'
+
+    async def test_worker_counters_aggregated(self, clean_storage):
+        """Test the owning process reports the counters workers publish"""
+        handler = CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline'))
+        handler.session_opened()
+        worker = ForwardingSMTPHandler(queue.Queue())
+        session = SimpleNamespace(peer=('127.0.0.1', 12345))
+        pool = SMTPWorkerPool(handler, workers=1)
+        pool.forward_queue = queue.Queue()
+
+        worker.session_opened()
+        pool.forward_queue.put(WorkerCounters(0, worker.counters()))
+        worker.session_opened()
+        worker.session_closed(0.2)
+        await worker.handle_MAIL(None, session, make_envelope(b''),
+                                 'sender@example.com', [])
+        pool.forward_queue.put(WorkerCounters(0, worker.counters()))
+        pool.forward_queue.put(None)
+        pool._drain()
+
+        stats = handler.get_stats()
+        assert stats['connection_count'] == 2
+        assert stats['total_sessions'] == 3
+        assert stats['session_duration_seconds']['count'] == 1
+        assert stats['command_latency_ms']['MAIL']['count'] == 1
+
+        # Stopped workers' totals are kept, their connections are not
+        pool.stop()
+        stats = handler.get_stats()
+        assert handler.worker_counters == {}
+        assert stats['connection_count'] == 1
+        assert stats['total_sessions'] == 3
+        assert stats['command_latency_ms']['MAIL']['count'] == 1
+
+
+class TestSMTPProtocol:
+    """Test the SMTP protocol over a real socket"""
+
+    @pytest.fixture
+    def smtp_server(self, clean_storage):
+        """Run an SMTP controller on a free port"""
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+
+        controller = SMTPController(
+            CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline')),
+            hostname='127.0.0.1',
+            port=port
+        )
+        controller.start()
+        yield SimpleNamespace(port=port, handler=controller.handler)
+        controller.stop()
+
+    def _exchange(self, port: int, payload: bytes, replies: int) -> list:
+        """Send payload in one write and read the given number of replies"""
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            reader = sock.makefile('rb')
+            reader.readline()  # greeting
+            sock.sendall(payload)
+            lines = []
+            while len(lines) < replies:
+                line = reader.readline().decode().rstrip()
+                if line[3:4] != '-':
+                    lines.append(line)
+            return lines
+
+    def test_ehlo_advertises_extensions(self, smtp_server):
+        """Test PIPELINING and CHUNKING are advertised"""
+        with smtplib.SMTP('127.0.0.1', smtp_server.port) as client:
+            client.ehlo()
+
+            assert client.has_extn('pipelining')
+            assert client.has_extn('chunking')
+
+    def test_ehlo_advertises_size(self, smtp_server):
+        """Test the message size limit is advertised"""
+        with smtplib.SMTP('127.0.0.1', smtp_server.port) as client:
+            client.ehlo()
+
+            assert int(client.esmtp_features['size']) == config.MAX_MESSAGE_SIZE
+
+    def test_oversized_mail_from_rejected(self, smtp_server):
+        """Test MAIL with a declared SIZE above the limit is refused"""
+        with smtplib.SMTP('127.0.0.1', smtp_server.port) as client:
+            client.ehlo()
+            code, _ = client.mail('sender@example.com',
+                                  [f'SIZE={config.MAX_MESSAGE_SIZE + 1}'])
+
+            assert code == 552
+
+    def test_bdat_chunks(self, smtp_server):
+        """Test a pipelined multi-chunk BDAT transaction"""
+        data = make_message(subject='Chunked', body='Sent in chunks')
+        first, rest = data[:40], data[40:]
+        payload = (
+            b'EHLO client\r\n'
+            b'MAIL FROM:<sender@example.com>\r\n'
+            + f'RCPT TO:<user@{config.DOMAIN}>\r\n'.encode()
+            + f'BDAT {len(first)}\r\n'.encode() + first
+            + f'BDAT {len(rest)} LAST\r\n'.encode() + rest
+        )
+
+        replies = self._exchange(smtp_server.port, payload, 5)
+
+        assert [r[:3] for r in replies] == ['250'] * 5
+        emails = email_storage_service.get_emails(f'user@{config.DOMAIN}')
+        assert emails[0]['subject'] == 'Chunked'
+        assert emails[0]['body'] == 'Sent in chunks'
+
+    def test_oversized_bdat_discarded(self, smtp_server, monkeypatch):
+        """Test a BDAT chunk over the size limit is refused without being
+        buffered, and the session carries on"""
+        reads = []
+        original = asyncio.StreamReader.readexactly
+
+        async def readexactly(reader, n):
+            reads.append(n)
+            return await original(reader, n)
+
+        monkeypatch.setattr(asyncio.StreamReader, 'readexactly', readexactly)
+        monkeypatch.setattr(type(config), 'MAX_MESSAGE_SIZE', 1000)
+        size = 200000
+        payload = (
+            b'EHLO client\r\n'
+            b'MAIL FROM:<sender@example.com>\r\n'
+            + f'RCPT TO:<user@{config.DOMAIN}>\r\n'.encode()
+            + f'BDAT {size} LAST\r\n'.encode() + b'x' * size
+            + b'NOOP\r\n'
+        )
+
+        replies = self._exchange(smtp_server.port, payload, 5)
+
+        assert replies[3].startswith('552')
+        assert replies[4].startswith('250')
+        assert all(n < size for n in reads)
+        assert email_storage_service.get_emails(f'user@{config.DOMAIN}') == []
+
+    def test_bdat_without_rcpt(self, smtp_server):
+        """Test BDAT before RCPT is refused after consuming the chunk"""
+        payload = b'EHLO client\r\nBDAT 5 LAST\r\nhelloNOOP\r\n'
+
+        replies = self._exchange(smtp_server.port, payload, 3)
+
+        assert replies[1].startswith('503')
+        assert replies[2].startswith('250')
+
+    def test_many_messages_per_connection(self, smtp_server):
+        """Test several messages over one session"""
+        with smtplib.SMTP('127.0.0.1', smtp_server.port) as client:
+            for i in range(3):
+                client.sendmail('sender@example.com', [f'user@{config.DOMAIN}'],
+                                make_message(subject=f'Message {i}'))
+
+        assert len(email_storage_service.get_emails(f'user@{config.DOMAIN}')) == 3
+
+    def test_sessions_are_counted(self, smtp_server):
+        """Test connections are tracked by the protocol"""
+        sessions_before = smtp_server.handler.total_sessions
+
+        with smtplib.SMTP('127.0.0.1', smtp_server.port) as client:
+            client.noop()
+            assert smtp_server.handler.connection_count >= 1
+
+        deadline = time.time() + 2
+        while smtp_server.handler.connection_count and time.time() < deadline:
+            time.sleep(0.01)
+        assert smtp_server.handler.total_sessions > sessions_before
+        assert smtp_server.handler.connection_count == 0
+
+
+class TestLMTP:
+    """Test the LMTP listener on a Unix socket"""
+
+    @pytest.fixture
+    def lmtp_socket(self, clean_storage, tmp_path):
+        """Run an LMTP controller on a socket in a temp directory"""
+        path = str(tmp_path / 'lmtp.sock')
+        controller = LMTPController(
+            CustomSMTPHandler(parser_pool=MessageParserPool(mode='inline')),
+            unix_socket=path
+        )
+        controller.start()
+        yield path
+        controller.stop()
+
+    def _exchange(self, path: str, payload: bytes, replies: int) -> list:
+        """Send payload in one write and read the given number of replies"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(path)
+            reader = sock.makefile('rb')
+            reader.readline()  # greeting
+            sock.sendall(payload)
+            lines = []
+            while len(lines) < replies:
+                line = reader.readline().decode().rstrip()
+                if line[3:4] != '-':
+                    lines.append(line)
+            return lines
+
+    def test_per_recipient_status(self, lmtp_socket):
+        """Test DATA is answered once per accepted recipient"""
+        data = make_message(subject='Over LMTP').replace(b'\n', b'\r\n')
+        payload = (
+            b'LHLO client\r\n'
+            b'MAIL FROM:<sender@example.com>\r\n'
+            + f'RCPT TO:<one@{config.DOMAIN}>\r\n'.encode()
+            + b'RCPT TO:<user@elsewhere.example>\r\n'
+            + f'RCPT TO:<two@{config.DOMAIN}>\r\n'.encode()
+            + b'DATA\r\n' + data + b'\r\n.\r\n'
+        )
+
+        replies = self._exchange(lmtp_socket, payload, 8)
+
+        assert replies[3].startswith('550')
+        assert replies[6] == f'250 2.1.5 <one@{config.DOMAIN}> OK'
+        assert replies[7] == f'250 2.1.5 <two@{config.DOMAIN}> OK'
+        emails = email_storage_service.get_emails(f'two@{config.DOMAIN}')
+        assert emails[0]['subject'] == 'Over LMTP'
+
+    def test_ehlo_refused(self, lmtp_socket):
+        """Test LMTP only accepts LHLO as greeting"""
+        replies = self._exchange(lmtp_socket, b'EHLO client\r\n', 1)
+
+        assert replies[0].startswith('500')
+
+
+class TestSMTPLoopMode:
+    """Test running SMTP on the application event loop"""
+
+    @pytest.fixture
+    def service(self, clean_storage, monkeypatch):
+        """SMTP service bound to a free port"""
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        monkeypatch.setattr(type(config), 'HOST', '127.0.0.1')
+        monkeypatch.setattr(type(config), 'SMTP_PORT', port)
+
+        service = SMTPService()
+        service.handler = CustomSMTPHandler(
+            parser_pool=MessageParserPool(mode='inline'))
+        yield service
+        service.stop()
+
+    async def test_start_on_loop(self, service):
+        """Test mail is accepted on the running loop with lock-free storage"""
+        assert await service.start_on_loop()
+        assert not hasattr(email_storage_service._lock, 'acquire')
+
+        def send():
+            with smtplib.SMTP('127.0.0.1', config.SMTP_PORT) as client:
+                client.sendmail('sender@example.com', [f'user@{config.DOMAIN}'],
+                                make_message(subject='On the loop'))
+
+        await asyncio.get_running_loop().run_in_executor(None, send)
+
+        emails = email_storage_service.get_emails(f'user@{config.DOMAIN}')
+        assert emails[0]['subject'] == 'On the loop'
+
+        service.stop()
+        assert hasattr(email_storage_service._lock, 'acquire')
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the message spool
+"""
+
+import gc
+import os
+
+import pytest
+
+from app.config import config
+from app.services.spool import MessageSpool
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    """Spool writing into a temp directory with a small threshold"""
+    monkeypatch.setattr(type(config), 'SPILL_THRESHOLD_BYTES', 100)
+    return MessageSpool(directory=str(tmp_path))
+
+
+class TestMessageSpool:
+    """Test spilling payloads to disk"""
+
+    def test_should_spill(self, spool, monkeypatch):
+        """Test only payloads above the threshold are spilled"""
+        assert not spool.should_spill(100)
+        assert spool.should_spill(101)
+
+        monkeypatch.setattr(type(config), 'SPILL_THRESHOLD_BYTES', 0)
+        assert not spool.should_spill(10 ** 9)
+
+    def test_spill_roundtrip(self, spool):
+        """Test spilled data reads back and is counted"""
+        payload = spool.spill(b'x' * 200)
+
+        assert payload.read() == b'x' * 200
+        assert len(payload) == 200
+        stats = spool.get_stats()
+        assert stats['files'] == 1
+        assert stats['bytes'] == 200
+        assert stats['total_spilled'] == 1
+
+    def test_file_removed_with_handle(self, spool):
+        """Test the file goes away once the handle is dropped"""
+        payload = spool.spill(b'x' * 200)
+        path = payload.path
+        assert os.path.exists(path)
+
+        del payload
+        gc.collect()
+
+        assert not os.path.exists(path)
+        assert spool.get_stats()['files'] == 0
+        assert spool.get_stats()['bytes'] == 0
+        assert spool.get_stats()['total_spilled'] == 1
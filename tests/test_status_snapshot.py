@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared status snapshot
+"""
+
+import asyncio
+import time
+
+from app.config import config
+from app.services.email_storage import EmailStorageService
+from app.services.status_snapshot import StatusSnapshotService
+
+
+class CountingStorage(EmailStorageService):
+    """Storage that counts (and slows down) statistics scans"""
+
+    def __init__(self):
+        super().__init__()
+        self.scans = 0
+
+    def get_statistics(self):
+        self.scans += 1
+        time.sleep(0.05)
+        return super().get_statistics()
+
+
+class TestStatusSnapshotService:
+    """Test snapshot reuse and sharing"""
+
+    async def test_reused_within_ttl(self, sample_email, monkeypatch):
+        """Test probes within the TTL get the same snapshot"""
+        monkeypatch.setattr(type(config), 'STATUS_CACHE_MS', 60000)
+        storage = CountingStorage()
+        snapshots = StatusSnapshotService(storage)
+
+        first = await snapshots.get()
+        storage.add_email(dict(sample_email))
+        second = await snapshots.get()
+
+        assert second is first
+        assert storage.scans == 1
+
+    async def test_scan_only_after_change(self, sample_email, monkeypatch):
+        """Test storage is rescanned after the TTL only if it changed"""
+        monkeypatch.setattr(type(config), 'STATUS_CACHE_MS', 0)
+        storage = CountingStorage()
+        snapshots = StatusSnapshotService(storage)
+
+        await snapshots.get()
+        await snapshots.get()
+        assert storage.scans == 1
+
+        storage.add_email(dict(sample_email))
+        snapshot = await snapshots.get()
+        assert storage.scans == 2
+        assert snapshot['storage']['total_emails'] == 1
+
+    async def test_concurrent_probes_share(self, monkeypatch):
+        """Test concurrent probes wait for one computation"""
+        monkeypatch.setattr(type(config), 'STATUS_CACHE_MS', 0)
+        storage = CountingStorage()
+        snapshots = StatusSnapshotService(storage)
+
+        results = await asyncio.gather(*(snapshots.get() for _ in range(5)))
+
+        assert storage.scans == 1
+        assert all(result is results[0] for result in results)
+        assert snapshots.get_stats()['hits'] == 4